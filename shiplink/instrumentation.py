@@ -0,0 +1,245 @@
+"""
+Per-request query and latency instrumentation.
+
+InstrumentationMiddleware installs a query wrapper on every database
+connection once, which charges each query to the request being served: the
+query count, the time spent in the database and how often each SQL
+statement ran, so N+1 patterns show up as duplicated fingerprints. Views
+using InstrumentedViewMixin also report permission and serializer time.
+Latencies feed per-route histograms served to staff by
+InstrumentationStatsView, and each request gets a JSON log line when the
+logger is enabled for INFO. The
+``Server-Timing`` header gives away query counts and timings, so it is only
+sent to staff users unless REQUEST_INSTRUMENTATION_HEADERS is set.
+Streaming responses (exports) are measured until their last chunk is sent;
+their histogram sample and log line are recorded then, and they carry no
+``Server-Timing`` header since headers go out before the body.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger('shiplink.instrumentation')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.timings = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        return {
+            hashlib.md5(sql.encode()).hexdigest()[:12]: count
+            for sql, count in self.statements.most_common()
+            if count > 1
+        }
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def _install_query_counter(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+@contextmanager
+def timed(name):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RouteHistograms:
+    """Bounded per-route samples of (total ms, db ms, queries)."""
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, route, total_ms, db_ms, queries):
+        with self.lock:
+            samples = self.samples.get(route)
+            if samples is None:
+                samples = self.samples[route] = deque(maxlen=self.size)
+            samples.append((total_ms, db_ms, queries))
+
+    def summary(self):
+        with self.lock:
+            snapshot = {route: list(samples) for route, samples in self.samples.items()}
+
+        summary = {}
+        for route, samples in snapshot.items():
+            summary[route] = {'samples': len(samples)}
+            for index, name in enumerate(('total_ms', 'db_ms', 'queries')):
+                ordered = sorted(sample[index] for sample in samples)
+                summary[route][name] = {
+                    'p50': round(_percentile(ordered, 0.50), 2),
+                    'p95': round(_percentile(ordered, 0.95), 2),
+                    'p99': round(_percentile(ordered, 0.99), 2),
+                }
+        return summary
+
+
+histograms = RouteHistograms(getattr(settings, 'REQUEST_INSTRUMENTATION_SAMPLES', 1000))
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Once per connection rather than per request; connections opened
+        # before the middleware loaded are wrapped here.
+        connection_created.connect(_install_query_counter, dispatch_uid='shiplink.instrumentation')
+        for connection in connections.all(initialized_only=True):
+            _install_query_counter(connection)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                request, response, metrics, start, response.streaming_content
+            )
+            return response
+        self.record(request, response, metrics, start, self.show_timings(request))
+        return response
+
+    def measure_stream(self, request, response, metrics, start, content):
+        chunks = iter(content)
+        try:
+            while True:
+                # Set around each chunk only: the stream may be closed from
+                # another context than the one it was iterated in.
+                token = _current.set(metrics)
+                try:
+                    chunk = next(chunks, None)
+                finally:
+                    _current.reset(token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.record(request, response, metrics, start, show_timings=False)
+
+    def record(self, request, response, metrics, start, show_timings):
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = metrics.db_time * 1000
+        match = getattr(request, 'resolver_match', None)
+        route = f'{request.method} {match.view_name if match else "unresolved"}'
+        histograms.record(route, total_ms, db_ms, metrics.queries)
+
+        log = logger.isEnabledFor(logging.INFO)
+        if not (show_timings or log):
+            return
+
+        duplicates = metrics.duplicates()
+        if show_timings:
+            timings = [f'db;dur={db_ms:.1f};desc="{metrics.queries} queries, {len(duplicates)} repeated"']
+            timings += [
+                f'{name};dur={seconds * 1000:.1f}'
+                for name, seconds in metrics.timings.items()
+            ]
+            timings.append(f'total;dur={total_ms:.1f}')
+            response['Server-Timing'] = ', '.join(timings)
+
+        if log:
+            logger.info(json.dumps({
+                'route': route,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'db_ms': round(db_ms, 2),
+                'queries': metrics.queries,
+                'duplicate_queries': duplicates,
+                **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in metrics.timings.items()},
+            }))
+
+    def show_timings(self, request):
+        if getattr(settings, 'REQUEST_INSTRUMENTATION_HEADERS', False):
+            return True
+        # DRF copies the user it authenticated onto the Django request.
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+
+
+def _timed_representation(to_representation):
+    def wrapper(*args, **kwargs):
+        with timed('serialize'):
+            return to_representation(*args, **kwargs)
+    return wrapper
+
+
+class InstrumentedViewMixin:
+    """Report permission checks and serializer rendering to the request metrics."""
+
+    def check_permissions(self, request):
+        with timed('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with timed('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if _current.get() is not None:
+            # .data renders through the top-level to_representation; nested
+            # serializers are separate instances and are not timed twice.
+            serializer.to_representation = _timed_representation(serializer.to_representation)
+        return serializer
+
+
+class InstrumentationStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(histograms.summary())
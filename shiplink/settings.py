@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shiplink.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -110,7 +111,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'shipping.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
@@ -122,8 +123,83 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        # Public tracking lookups, per client IP.
+        'tracking': '120/min',
+    },
+}
+
+# Cache used for API response caching. The local-memory backend is per
+# process; point 'default' at Redis (django.core.cache.backends.redis.RedisCache)
+# to share entries and invalidations between workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 }
+RESPONSE_CACHE_ALIAS = 'default'
+# Also how stale the remaining capacity shown on cached journey list pages
+# may be: bookings only retire the journey's own entries.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Per-request query/latency instrumentation (a JSON log line per request on
+# the 'shiplink.instrumentation' logger and per-route percentiles at
+# /api/v1/metrics/ for staff). Server-Timing headers are sent to staff users
+# only; REQUEST_INSTRUMENTATION_HEADERS = True sends them to every client,
+# which is meant for local development.
+REQUEST_INSTRUMENTATION = True
+REQUEST_INSTRUMENTATION_HEADERS = False
+REQUEST_INSTRUMENTATION_SAMPLES = 1000
+
+# Profile counters (total_deliveries, total_packages, ...). With 0 every
+# increment is an atomic UPDATE on the profile row; with N > 0 increments are
+# spread over N shard rows and folded back by `manage.py fold_counters`.
+COUNTER_SHARDS = 0
+
+# Token -> user/profile cache used by CachedTokenAuthentication: entries live
+# TOKEN_CACHE_TTL seconds in the shared cache and TOKEN_CACHE_LOCAL_TTL
+# seconds in a per-process LRU of TOKEN_CACHE_SIZE tokens. 0 disables it.
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_LOCAL_TTL = 30
+TOKEN_CACHE_SIZE = 10000
+
+# Delta sync feed (/api/v1/changes/). The feed never moves past change log
+# entries younger than SYNC_SETTLE_SECONDS, which must exceed the longest
+# write transaction; `manage.py purge_change_log` drops entries older than
+# SYNC_RETENTION_DAYS, after which older cursors get a 410.
+SYNC_SETTLE_SECONDS = 5
+SYNC_RETENTION_DAYS = 30
+
+# List endpoints render pages from values() rows through compiled serializer
+# plans (shipping/fast_read.py) instead of model instances.
+FAST_READ_SERIALIZERS = True
+
+# Transactional outbox (shipping/outbox.py) drained by `manage.py
+# run_outbox_worker`: a claimed batch is leased for OUTBOX_LEASE_SECONDS and
+# a message failing OUTBOX_MAX_ATTEMPTS times is set aside as FAILED.
+# Notifications go through NOTIFICATION_BACKEND (shipping/notifications.py).
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_MAX_ATTEMPTS = 8
+NOTIFICATION_BACKEND = 'shipping.notifications.LoggingBackend'
+
+# Public tracking projections (shipping/tracking.py) are written through to
+# the response cache on every status change and kept TRACKING_CACHE_TTL
+# seconds; journey and stop point edits drop them.
+TRACKING_CACHE_TTL = 86400
+
+# Writes to packages, journeys and reviews sent with an Idempotency-Key
+# header are answered from the stored response when the key is sent again
+# (shipping/idempotency.py); `manage.py purge_idempotency_keys` drops keys
+# older than IDEMPOTENCY_KEY_TTL_HOURS.
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# `manage.py archive_terminal` moves completed or cancelled journeys and
+# delivered or cancelled packages older than this many days into the
+# archive tables (shipping/archive.py); lookups by id or tracking number
+# still find them.
+ARCHIVE_AFTER_DAYS = 90
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
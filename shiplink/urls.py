@@ -2,9 +2,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from shiplink.instrumentation import InstrumentationStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/v1/metrics/', InstrumentationStatsView.as_view(), name='request-metrics'),
     path('api/v1/', include('shipping.urls')),
     path('api/v1/auth/', include('dj_rest_auth.urls')),
     path('api/v1/auth/registration/', include('dj_rest_auth.registration.urls')),
@@ -0,0 +1,196 @@
+"""
+Hot/cold archival of finished journeys and packages.
+
+Journeys that are completed or cancelled, and packages that are delivered
+or cancelled, stop changing; once they are older than ARCHIVE_AFTER_DAYS
+``archive_terminal`` moves them out of the live tables into
+ArchivedJourney and ArchivedPackage, which keep the original ids, the
+tracking number, a few columns to find them by and the serializer
+rendering at archive time. The live tables, their indexes and every list
+query that scans them stay sized to the work still in flight.
+
+Each batch runs in its own short transaction that locks the rows it moves,
+checks they are still eligible, writes the archive rows, points reviews at
+the archived package and deletes the live rows, so the usual delete signals
+invalidate caches and drop tracking entries. The change feed logs those
+deletes as ARCHIVE, not DELETE. Reviews
+stay in the live table: they feed the rating aggregates. Retrieving a
+journey or package by id, and tracking a package by number, fall back to
+the archive.
+"""
+import json
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.http import Http404
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .changes import archiving, record_changes
+from .eager_loading import eager_load
+from .models import ArchivedJourney, ArchivedPackage, Journey, Package, Review
+from .serializers import JourneySerializer, PackageSerializer
+
+TERMINAL_JOURNEY_STATUSES = ('COMPLETED', 'CANCELLED')
+TERMINAL_PACKAGE_STATUSES = ('DELIVERED', 'CANCELLED')
+
+
+def _to_json(data):
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def _city(stop, default):
+    return stop.city if stop is not None else default
+
+
+def _render(serializer_class, instances):
+    # One list serializer builds the fields once for the whole batch.
+    return _to_json(serializer_class(instances, many=True).data)
+
+
+def _archive_packages(packages):
+    data = _render(PackageSerializer, packages)
+    ArchivedPackage.objects.bulk_create([
+        ArchivedPackage(
+            id=package.pk,
+            tracking_number=package.tracking_number,
+            sender_id=package.sender_id,
+            journey_id=package.journey_id,
+            status=package.status,
+            origin_city=_city(package.origin_stop, package.journey.departure_city),
+            destination_city=_city(package.destination_stop, package.journey.arrival_city),
+            updated_at=package.updated_at,
+            data=rendered,
+        )
+        for package, rendered in zip(packages, data)
+    ])
+    package_ids = [package.pk for package in packages]
+    # Two statements: MySQL assigns left to right within one UPDATE.
+    reviews = Review.objects.filter(package_id__in=package_ids)
+    review_ids = list(reviews.values_list('id', flat=True))
+    reviews.update(archived_package_id=F('package_id'))
+    Review.objects.filter(id__in=review_ids).update(package=None)
+    record_changes(Review, review_ids)
+    with archiving():
+        Package.objects.filter(pk__in=package_ids).delete()
+
+
+def _package_rows(queryset):
+    return list(eager_load(
+        queryset.select_related('origin_stop', 'destination_stop'), PackageSerializer
+    ))
+
+
+def journey_candidates(cutoff):
+    """Terminal journeys that departed before ``cutoff`` with no package still in flight."""
+    open_packages = Package.objects.filter(journey=OuterRef('pk')).exclude(
+        status__in=TERMINAL_PACKAGE_STATUSES
+    )
+    return Journey.objects.filter(
+        status__in=TERMINAL_JOURNEY_STATUSES,
+        departure_date__lt=cutoff
+    ).exclude(Exists(open_packages))
+
+
+def package_candidates(cutoff):
+    """Terminal packages last changed before ``cutoff``."""
+    return Package.objects.filter(
+        status__in=TERMINAL_PACKAGE_STATUSES,
+        updated_at__lt=cutoff
+    )
+
+
+def archive_journey_batch(cutoff, batch_size):
+    """
+    Archive up to ``batch_size`` eligible journeys with their stop points
+    and packages. Returns ``(journeys, packages)`` archived.
+    """
+    with transaction.atomic():
+        journey_ids = list(
+            journey_candidates(cutoff).select_for_update()
+            .order_by('departure_date', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not journey_ids:
+            return 0, 0
+        # A package booked or reopened since the candidate query keeps its
+        # journey live.
+        locked = list(
+            Package.objects.select_for_update()
+            .filter(journey_id__in=journey_ids)
+            .values_list('journey_id', 'status')
+        )
+        blocked = {journey_id for journey_id, status in locked if status not in TERMINAL_PACKAGE_STATUSES}
+        journey_ids = [journey_id for journey_id in journey_ids if journey_id not in blocked]
+        if not journey_ids:
+            return 0, 0
+
+        packages = _package_rows(Package.objects.filter(journey_id__in=journey_ids))
+        journeys = list(eager_load(Journey.objects.filter(pk__in=journey_ids), JourneySerializer))
+        data = _render(JourneySerializer, journeys)
+        ArchivedJourney.objects.bulk_create([
+            ArchivedJourney(
+                id=journey.pk,
+                carrier_id=journey.carrier_id,
+                status=journey.status,
+                departure_city=journey.departure_city,
+                arrival_city=journey.arrival_city,
+                departure_date=journey.departure_date,
+                data=rendered,
+            )
+            for journey, rendered in zip(journeys, data)
+        ])
+        if packages:
+            _archive_packages(packages)
+        # Stop points and route segments go with their journey.
+        with archiving():
+            Journey.objects.filter(pk__in=journey_ids).delete()
+        return len(journeys), len(packages)
+
+
+def archive_package_batch(cutoff, batch_size):
+    """
+    Archive up to ``batch_size`` eligible packages whose journeys are still
+    live. Returns the number archived.
+    """
+    with transaction.atomic():
+        package_ids = list(
+            package_candidates(cutoff).select_for_update()
+            .order_by('updated_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not package_ids:
+            return 0
+        packages = _package_rows(
+            package_candidates(cutoff).filter(pk__in=package_ids)
+        )
+        if packages:
+            _archive_packages(packages)
+        return len(packages)
+
+
+def get_archived(model, pk):
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    return model.objects.filter(pk=pk).first()
+
+
+class ArchiveFallbackMixin:
+    """
+    Answer a retrieve of an archived row with the rendering stored when it
+    was archived, in full: ``?fields=`` and ``?expand=`` do not apply.
+    """
+    archive_model = None
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = get_archived(
+                self.archive_model, self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+            )
+            if archived is None:
+                raise
+            return Response(archived.data)
@@ -0,0 +1,169 @@
+"""
+Token authentication without a database hit per request.
+
+Token lookups are cached at two levels: a bounded in-process LRU with a
+short TTL in front of the shared Django cache. An entry holds the user's
+fields together with the profile ids get_request_identity() would otherwise
+load, so a cached request authenticates and authorizes without touching the
+database. Receivers in models.py evict entries when a token is deleted, a
+user is saved (deactivated, demoted...) or a profile is created or removed.
+Other processes drop their local copy within TOKEN_CACHE_LOCAL_TTL seconds.
+
+An eviction also bumps the token's generation in the shared cache, and
+shared entries are stored with the generation read before the database was,
+so a request that loaded a user just before a deactivation committed cannot
+cache it afterwards: its entry no longer matches on the next read.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .permissions import RequestIdentity
+
+# In User's field order, as Model.from_db() expects.
+USER_FIELDS = ('id', 'is_superuser', 'username', 'first_name', 'last_name',
+               'email', 'is_staff', 'is_active')
+IDENTITY_FIELDS = ('user__userprofile__id', 'user__userprofile__type',
+                   'user__userprofile__carrierprofile__id',
+                   'user__userprofile__senderprofile__id')
+
+
+class LocalTokenCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        # Bumped by every eviction; set() is skipped when an eviction ran
+        # while the entry was being loaded.
+        self.epoch = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, size, epoch=None):
+        with self.lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.epoch += 1
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+
+
+local_cache = LocalTokenCache()
+
+
+def get_shared_cache():
+    return caches[getattr(settings, 'TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _shared_key(token_key):
+    # Raw tokens never leave the process as cache keys.
+    return 'auth:token:' + hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def _generation_key(token_key):
+    return 'auth:generation:' + hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def evict_tokens(token_keys):
+    token_keys = list(token_keys)
+
+    def apply():
+        for token_key in token_keys:
+            local_cache.delete(token_key)
+        shared = get_shared_cache()
+        shared.delete_many([_shared_key(token_key) for token_key in token_keys])
+        # A request that read the database before this commit stores its
+        # entry under the old generation, which no longer matches.
+        shared.set_many(
+            {_generation_key(token_key): uuid.uuid4().hex for token_key in token_keys},
+            getattr(settings, 'TOKEN_CACHE_TTL', 300)
+        )
+
+    # After commit, so the new state is what the next miss loads.
+    transaction.on_commit(apply)
+
+
+def evict_user_tokens(user_ids):
+    from rest_framework.authtoken.models import Token
+    evict_tokens(Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication. ``TOKEN_CACHE_TTL = 0``
+    turns the cache off.
+    """
+
+    def authenticate_credentials(self, key):
+        ttl = getattr(settings, 'TOKEN_CACHE_TTL', 300)
+        if not ttl:
+            return super().authenticate_credentials(key)
+
+        entry = local_cache.get(key)
+        if entry is None:
+            epoch = local_cache.epoch
+            shared = get_shared_cache()
+            entry_key, generation_key = _shared_key(key), _generation_key(key)
+            found = shared.get_many([entry_key, generation_key])
+            generation = found.get(generation_key)
+            cached = found.get(entry_key)
+            if cached is not None and cached[0] == generation:
+                entry = cached[1]
+            else:
+                entry = self.load_entry(key)
+                shared.set(entry_key, (generation, entry), ttl)
+            local_cache.set(
+                key, entry,
+                min(ttl, getattr(settings, 'TOKEN_CACHE_LOCAL_TTL', 30)),
+                getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+                epoch
+            )
+
+        user_values, identity = entry
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, user_values)
+        user._shipping_identity = RequestIdentity(*identity)
+        token = self.get_model()(key=key, user=user)
+        return (user, token)
+
+    def load_entry(self, key):
+        # Unknown and inactive tokens are never cached.
+        row = self.get_model().objects.filter(key=key).values_list(
+            *[f'user__{field}' for field in USER_FIELDS], *IDENTITY_FIELDS
+        ).first()
+        if row is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user_values = row[:len(USER_FIELDS)]
+        if not user_values[USER_FIELDS.index('is_active')]:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user_values, row[len(USER_FIELDS):]
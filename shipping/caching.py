@@ -0,0 +1,247 @@
+"""
+Response cache for read endpoints.
+
+Cached responses are keyed on the view, the normalised query parameters and
+the current *versions* of everything the response depends on: a list
+version per resource ('journeys', 'carriers') and one version per object
+('journey:1', 'carrier:3', 'vehicle:2'). Versions are timestamps stored in
+the shared cache; signals (and the few code paths that write with
+QuerySet.update) bump them on commit, which retires exactly the entries
+that could have changed and doubles as their Last-Modified date.
+
+Capacity is the exception: bookings and cancellations only bump the
+journey's own version. Bumping 'journeys' on every booking would retire
+every cached list page of the marketplace, so list pages may show a
+journey's remaining capacity up to RESPONSE_CACHE_TIMEOUT seconds old.
+Nothing filters lists on capacity, and reservations are checked against
+the database, so a stale page can never overbook a leg. Delivery counters
+change with every delivery too and keep journey list pages the same way;
+they only retire their carriers and the carrier list, which orders on them.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+PREFIX = 'rc'
+STATS = ('hit', 'miss', 'not_modified')
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(name):
+    return f'{PREFIX}:v:{name}'
+
+
+def get_versions(names):
+    cache = get_cache()
+    keys = [_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    for key, value in missing.items():
+        # add() so a concurrent bump is never overwritten with an older stamp.
+        if not cache.add(key, value, timeout=None):
+            value = cache.get(key, value)
+        versions[key] = value
+    return [versions[key] for key in keys]
+
+
+def bump(names):
+    names = list(names)
+
+    def apply():
+        now = time.time()
+        get_cache().set_many({_version_key(name): now for name in names}, timeout=None)
+
+    transaction.on_commit(apply)
+
+
+def invalidate_journeys(journey_ids):
+    bump(['journeys'] + [f'journey:{pk}' for pk in journey_ids])
+
+
+def invalidate_journey_capacity(journey_ids):
+    """Retire the journeys' own entries after a reservation; list pages are kept."""
+    bump([f'journey:{pk}' for pk in journey_ids])
+
+
+def invalidate_vehicles(vehicle_ids):
+    bump(['journeys'] + [f'vehicle:{pk}' for pk in vehicle_ids])
+
+
+def invalidate_carriers(carrier_ids):
+    bump(['journeys', 'carriers'] + [f'carrier:{pk}' for pk in carrier_ids])
+
+
+def invalidate_counters(model, pks):
+    """Retire the profiles' entries after a counter update; journey list pages are kept."""
+    from .models import CarrierProfile
+    if model is CarrierProfile and pks:
+        bump(['carriers'] + [f'carrier:{pk}' for pk in pks])
+
+
+def invalidate_instances(model, pks):
+    """Entry point for code that writes with QuerySet.update()."""
+    from .models import CarrierProfile, Journey
+    if model is Journey:
+        invalidate_journeys(pks)
+    elif model is CarrierProfile:
+        invalidate_carriers(pks)
+
+
+def journey_versions(pk):
+    # A journey's carrier and vehicle never change after creation, so the
+    # mapping can be cached without expiry.
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    cache = get_cache()
+    key = f'{PREFIX}:journey-deps:{pk}'
+    dependencies = cache.get(key)
+    if dependencies is None:
+        from .models import Journey
+        dependencies = Journey.objects.filter(pk=pk).values_list('carrier_id', 'vehicle_id').first()
+        if dependencies is None:
+            return None
+        cache.set(key, dependencies, timeout=None)
+    carrier_id, vehicle_id = dependencies
+    return [f'journey:{pk}', f'carrier:{carrier_id}', f'vehicle:{vehicle_id}']
+
+
+def record(stat):
+    cache = get_cache()
+    key = f'{PREFIX}:stats:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_stats():
+    cache = get_cache()
+    values = cache.get_many([f'{PREFIX}:stats:{stat}' for stat in STATS])
+    stats = {stat: values.get(f'{PREFIX}:stats:{stat}', 0) for stat in STATS}
+    lookups = stats['hit'] + stats['miss'] + stats['not_modified']
+    stats['hit_ratio'] = (stats['hit'] + stats['not_modified']) / lookups if lookups else 0.0
+    return stats
+
+
+def compute_etag(data):
+    payload = json.dumps(data, cls=JSONEncoder, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(payload.encode()).hexdigest())
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+class CachedResponseMixin:
+    """
+    Cache ``list`` and ``retrieve`` responses and answer conditional requests
+    with 304s. Views name the versions a response depends on through
+    ``cache_list_version`` and ``get_object_cache_versions``.
+    """
+    cache_list_version = None
+    cache_extra_params = (
+        'search', 'ordering', 'cursor', 'count', 'page', 'mine', 'fields', 'expand', 'flat'
+    )
+
+    def get_object_cache_versions(self, pk):
+        return None
+
+    def get_cache_scope(self):
+        # Owner-scoped lists (?mine=true) differ per user.
+        from .filters import OwnerFilterBackend
+        from .permissions import get_request_identity
+        if OwnerFilterBackend.is_active(self.request):
+            return get_request_identity(self.request).profile_id
+        return None
+
+    def get_cache_query_params(self):
+        allowed = set(self.cache_extra_params)
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            allowed.update(filterset_class.base_filters)
+        allowed.update(getattr(self, 'filterset_fields', None) or [])
+
+        params = []
+        for name in sorted(allowed):
+            values = sorted(v.strip() for v in self.request.query_params.getlist(name) if v.strip())
+            if values:
+                params.append((name, values))
+        return params
+
+    def cached_response(self, versions, render):
+        if not versions:
+            return render()
+
+        version_values = get_versions(versions)
+        key_source = json.dumps([
+            type(self).__name__,
+            self.action,
+            self.kwargs,
+            self.request.get_host(),
+            self.request.accepted_renderer.format,
+            self.get_cache_query_params(),
+            self.get_cache_scope(),
+            version_values,
+        ], default=str)
+        key = f'{PREFIX}:r:' + hashlib.sha1(key_source.encode()).hexdigest()
+        cache = get_cache()
+
+        entry = cache.get(key)
+        if entry is None:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = {
+                'data': response.data,
+                'etag': compute_etag(response.data),
+                'last_modified': max(version_values),
+            }
+            cache.set(key, entry, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+            outcome = 'miss'
+        else:
+            outcome = 'hit'
+
+        if is_not_modified(self.request, entry['etag'], entry['last_modified']):
+            outcome = 'not_modified'
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry['data'])
+
+        record(outcome)
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        response['X-Cache'] = 'MISS' if outcome == 'miss' else 'HIT'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        versions = [self.cache_list_version] if self.cache_list_version else None
+        return self.cached_response(
+            versions,
+            lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return self.cached_response(
+            self.get_object_cache_versions(lookup),
+            lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
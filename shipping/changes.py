@@ -0,0 +1,157 @@
+"""
+Change log behind the delta sync feed.
+
+Every create, update and delete of a synced row appends a ChangeLogEntry,
+through the model signals or explicitly from code that writes with
+QuerySet.update() or bulk_create(). Rows deleted because they moved to the
+archive are logged as ARCHIVE rather than DELETE: they still exist and can
+be retrieved, they just stopped changing. The entry id is the sync cursor. Ids
+are handed out at insert time, not at commit, so the feed only moves past
+entries older than SYNC_SETTLE_SECONDS: a transaction that commits within
+that window can never be skipped.
+"""
+import contextvars
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .eager_loading import eager_load
+from .models import ChangeLogEntry, Journey, Package, Review, StopPoint, Vehicle
+from .serializers import (
+    JourneySerializer, PackageSerializer, ReviewSerializer,
+    StopPointSerializer, VehicleSerializer
+)
+
+# Stream name -> (model, serializer)
+STREAMS = {
+    'journeys': (Journey, JourneySerializer),
+    'stop_points': (StopPoint, StopPointSerializer),
+    'vehicles': (Vehicle, VehicleSerializer),
+    'packages': (Package, PackageSerializer),
+    'reviews': (Review, ReviewSerializer),
+}
+STREAM_NAMES = {model: name for name, (model, _) in STREAMS.items()}
+
+
+_delete_action = contextvars.ContextVar('delete_action', default='DELETE')
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def record_changes(model, pks, action='UPSERT'):
+    stream = STREAM_NAMES[model]
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(stream=stream, object_id=pk, action=action)
+        for pk in pks
+    ])
+
+
+def record_deletes(model, pks):
+    """Log deleted rows, as ARCHIVE inside ``archiving()``."""
+    record_changes(model, pks, action=_delete_action.get())
+
+
+@contextmanager
+def archiving():
+    """Log the deletes run in this block as moves to the archive."""
+    token = _delete_action.set('ARCHIVE')
+    try:
+        yield
+    finally:
+        _delete_action.reset(token)
+
+
+def get_settle_cutoff():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 5))
+
+
+def current_cursor():
+    """Cursor a client should start from after a full fetch."""
+    latest = ChangeLogEntry.objects.filter(
+        created_at__lte=get_settle_cutoff()
+    ).aggregate(latest=Max('id'))['latest']
+    return latest or 0
+
+
+def read_changes(since, limit, streams):
+    """
+    Return ``(cursor, has_more, upserts, deletes, archived)`` for up to
+    ``limit`` entries after ``since``. ``upserts``, ``deletes`` and
+    ``archived`` map stream names to object ids, keeping only the latest
+    action per object.
+    """
+    bounds = ChangeLogEntry.objects.aggregate(oldest=Min('id'), latest=Max('id'))
+    if bounds['oldest'] is not None and not bounds['oldest'] - 1 <= since <= bounds['latest']:
+        raise CursorExpired
+
+    entries = list(
+        ChangeLogEntry.objects.filter(id__gt=since)
+        .order_by('id')
+        .values_list('id', 'stream', 'object_id', 'action', 'created_at')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Stop at the first unsettled entry so the cursor never passes an id a
+    # still-open transaction may commit later.
+    cutoff = get_settle_cutoff()
+    for index, entry in enumerate(entries):
+        if entry[4] > cutoff:
+            entries = entries[:index]
+            has_more = True
+            break
+
+    latest = {}
+    for entry_id, stream, object_id, action, _ in entries:
+        if stream in streams:
+            latest[(stream, object_id)] = action
+
+    changes = {
+        action: {stream: [] for stream in streams}
+        for action in ('UPSERT', 'DELETE', 'ARCHIVE')
+    }
+    for (stream, object_id), action in latest.items():
+        changes[action][stream].append(object_id)
+
+    cursor = entries[-1][0] if entries else since
+    return cursor, has_more, changes['UPSERT'], changes['DELETE'], changes['ARCHIVE']
+
+
+def serialize_upserts(upserts, scopes, context):
+    """
+    Serialize the current state of changed rows. ``scopes`` maps a stream
+    to a callable restricting its queryset to what the user may see.
+    """
+    data = {}
+    for stream, pks in upserts.items():
+        model, serializer_class = STREAMS[stream]
+        rows = []
+        if pks:
+            queryset = eager_load(model.objects.filter(pk__in=pks), serializer_class, context)
+            if stream in scopes:
+                queryset = scopes[stream](queryset)
+            rows = serializer_class(queryset.order_by('pk'), many=True, context=context).data
+        data[stream] = rows
+    return data
+
+
+def purge_changes(older_than, batch_size=10000):
+    """Delete entries older than ``older_than``, always keeping the newest one."""
+    latest = ChangeLogEntry.objects.aggregate(latest=Max('id'))['latest']
+    if latest is None:
+        return 0
+    purged = 0
+    while True:
+        ids = list(
+            ChangeLogEntry.objects.filter(created_at__lt=older_than, id__lt=latest)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += ChangeLogEntry.objects.filter(id__in=ids).delete()[0]
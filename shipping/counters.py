@@ -0,0 +1,111 @@
+"""
+Contention-free profile counters.
+
+``increment`` applies a delta as a single ``UPDATE ... SET f = f + n``. When
+``COUNTER_SHARDS`` is set, deltas go to one of N CounterShard rows picked at
+random instead, so hot profiles are not a single locked row; ``fold_counters``
+periodically moves the buffered totals back onto the profiles.
+"""
+import random
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Sum, Value, When
+
+from .caching import invalidate_counters
+from .models import CounterShard
+
+
+def _shard_count():
+    return getattr(settings, 'COUNTER_SHARDS', 0)
+
+
+def _apply(model, field, deltas):
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+    invalidate_counters(model, [pk for pks in by_delta.values() for pk in pks])
+
+
+def _increment_shard(model, pk, field, delta):
+    key = {
+        'model': model._meta.label_lower,
+        'object_id': pk,
+        'field': field,
+        'shard': random.randrange(_shard_count()),
+    }
+    if CounterShard.objects.filter(**key).update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            CounterShard.objects.create(value=delta, **key)
+    except IntegrityError:
+        CounterShard.objects.filter(**key).update(value=F('value') + delta)
+
+
+def increment(model, pk, field, delta=1):
+    increment_many(model, field, {pk: delta})
+
+
+def increment_many(model, field, deltas):
+    """Apply ``{pk: delta}`` to ``field`` of ``model`` rows."""
+    if not _shard_count():
+        _apply(model, field, deltas)
+        return
+    for pk, delta in deltas.items():
+        if delta:
+            _increment_shard(model, pk, field, delta)
+
+
+def pending(model, pk, field):
+    return CounterShard.objects.filter(
+        model=model._meta.label_lower,
+        object_id=pk,
+        field=field
+    ).aggregate(total=Sum('value'))['total'] or 0
+
+
+def get_count(instance, field):
+    """Stored value plus increments not folded back yet."""
+    return getattr(instance, field) + pending(type(instance), instance.pk, field)
+
+
+def fold_counters(batch_size=1000):
+    """
+    Move buffered shard values onto their profiles. Shards are decremented by
+    the amount folded rather than reset, so increments racing with the fold
+    are kept. Returns the number of shard rows folded.
+    """
+    folded = 0
+    groups = CounterShard.objects.exclude(value=0).values_list('model', 'field').distinct()
+    for label, field in list(groups):
+        model = apps.get_model(label)
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    CounterShard.objects.select_for_update()
+                    .filter(model=label, field=field)
+                    .exclude(value=0)
+                    .values_list('id', 'object_id', 'value')[:batch_size]
+                )
+                if not rows:
+                    break
+
+                CounterShard.objects.filter(id__in=[row[0] for row in rows]).update(
+                    value=F('value') - Case(
+                        *[When(id=shard_id, then=Value(value)) for shard_id, _, value in rows]
+                    )
+                )
+                totals = defaultdict(int)
+                for _, object_id, value in rows:
+                    totals[object_id] += value
+                _apply(model, field, totals)
+            folded += len(rows)
+            if len(rows) < batch_size:
+                break
+    return folded
@@ -0,0 +1,107 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from .serializers import get_field_spec
+
+
+def _relation_attrs(field):
+    # Attributes along the field's source that must be loaded as related rows
+    # before the field can be rendered.
+    if field.source == '*':
+        return []
+    attrs = field.source_attrs
+    if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+        return attrs
+    if isinstance(field, serializers.RelatedField) and not field.use_pk_only_optimization():
+        return attrs
+    return attrs[:-1]
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _collect(serializer, model, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        current_model = model
+        path = prefix
+        many = in_prefetch
+        resolved = True
+        for attr in _relation_attrs(field):
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                resolved = False
+                break
+            if not model_field.is_relation:
+                resolved = False
+                break
+            path = f'{path}__{attr}' if path else attr
+            many = many or model_field.many_to_many or model_field.one_to_many
+            (prefetch if many else select).add(path)
+            current_model = model_field.related_model
+
+        nested = _nested_serializer(field)
+        if nested is not None and resolved and path != prefix:
+            _collect(nested, current_model, path, many, select, prefetch)
+
+
+def get_related_lookups(serializer):
+    """
+    Walk a serializer tree and return the (select_related, prefetch_related)
+    lookups needed to render it without per-row queries.
+    """
+    serializer = _nested_serializer(serializer)
+    select, prefetch = set(), set()
+    _collect(serializer, serializer.Meta.model, '', False, select, prefetch)
+    # Lookups already implied by a longer path are redundant.
+    select = {p for p in select if not any(o.startswith(p + '__') for o in select)}
+    prefetch = {p for p in prefetch if not any(o.startswith(p + '__') for o in prefetch)}
+    return sorted(select), sorted(prefetch)
+
+
+_plans = {}
+_MAX_PLANS = 512
+
+
+def eager_load(queryset, serializer_class, context=None):
+    """
+    Apply the plan for ``serializer_class`` as it renders with ``context``:
+    relations pruned or flattened by ``?fields=``/``?expand=``/``?flat=``
+    are not loaded.
+    """
+    spec = get_field_spec(context.get('request')) if context else None
+    key = (serializer_class, spec)
+    plan = _plans.get(key)
+    if plan is None:
+        if len(_plans) >= _MAX_PLANS:
+            # Field specs come from clients; keep the cache bounded.
+            _plans.clear()
+        plan = _plans[key] = get_related_lookups(serializer_class(context={'field_spec': spec}))
+    select, prefetch = plan
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class EagerLoadingMixin:
+    """
+    Apply the select/prefetch plan of the viewset's serializer to its queryset,
+    so list endpoints run a fixed number of queries whatever the page size.
+    """
+
+    def get_queryset(self):
+        return eager_load(
+            super().get_queryset(),
+            self.get_serializer_class(),
+            self.get_serializer_context()
+        )
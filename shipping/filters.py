@@ -1,16 +1,33 @@
+from datetime import datetime, time, timedelta
+from django.db.models import Value
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django_filters import rest_framework as filters
-from .models import Journey, Package
+from rest_framework.filters import BaseFilterBackend
+from .models import Journey, Package, RouteSegment
+from .permissions import get_owner_lookup, get_request_identity
+from .routes import normalize_city
 
 class JourneyFilter(filters.FilterSet):
+    departure_city = filters.CharFilter(method='filter_city')
+    arrival_city = filters.CharFilter(method='filter_city')
     min_price = filters.NumberFilter(field_name="price_per_kg", lookup_expr='gte')
     max_price = filters.NumberFilter(field_name="price_per_kg", lookup_expr='lte')
     departure_date_after = filters.DateFilter(field_name="departure_date", lookup_expr='gte')
     departure_date_before = filters.DateFilter(field_name="departure_date", lookup_expr='lte')
+    min_rating = filters.NumberFilter(field_name="carrier__rating", lookup_expr='gte')
 
     class Meta:
         model = Journey
-        fields = ['carrier', 'departure_city', 'arrival_city', 'min_price', 'max_price',
-                 'departure_date_after', 'departure_date_before']
+        fields = ['carrier', 'departure_city', 'arrival_city', 'status', 'min_price',
+                 'max_price', 'departure_date_after', 'departure_date_before', 'min_rating']
+
+    # Case-insensitive, written as UPPER(city) = UPPER(value) rather than
+    # __iexact (a LIKE on SQLite) so both backends use the Upper() indexes.
+    def filter_city(self, queryset, name, value):
+        return queryset.alias(**{f'{name}_upper': Upper(name)}).filter(
+            **{f'{name}_upper': Upper(Value(value))}
+        )
 
 class PackageFilter(filters.FilterSet):
     min_weight = filters.NumberFilter(field_name="weight", lookup_expr='gte')
@@ -21,4 +38,51 @@ class PackageFilter(filters.FilterSet):
     class Meta:
         model = Package
         fields = ['sender', 'journey', 'status', 'size', 'min_weight', 'max_weight',
-                 'created_after', 'created_before']
\ No newline at end of file
+                 'created_after', 'created_before']
+
+class RouteSegmentFilter(filters.FilterSet):
+    origin = filters.CharFilter(method='filter_origin')
+    destination = filters.CharFilter(method='filter_destination')
+    departure_date_after = filters.DateFilter(method='filter_departure_date_after')
+    departure_date_before = filters.DateFilter(method='filter_departure_date_before')
+    min_capacity = filters.NumberFilter(field_name="remaining_capacity", lookup_expr='gte')
+
+    class Meta:
+        model = RouteSegment
+        fields = ['origin', 'destination', 'departure_date_after',
+                 'departure_date_before', 'min_capacity']
+
+    # Dates are turned into aware datetime bounds so the range stays on the
+    # (origin_key, destination_key, departure_date) index.
+    def filter_origin(self, queryset, name, value):
+        return queryset.filter(origin_key=normalize_city(value))
+
+    def filter_destination(self, queryset, name, value):
+        return queryset.filter(destination_key=normalize_city(value))
+
+    def filter_departure_date_after(self, queryset, name, value):
+        start = timezone.make_aware(datetime.combine(value, time.min))
+        return queryset.filter(departure_date__gte=start)
+
+    def filter_departure_date_before(self, queryset, name, value):
+        end = timezone.make_aware(datetime.combine(value + timedelta(days=1), time.min))
+        return queryset.filter(departure_date__lt=end)
+
+class OwnerFilterBackend(BaseFilterBackend):
+    """
+    ``?mine=true`` restricts a list to the requesting user's own rows with a
+    single filter on the owner's foreign key.
+    """
+    query_param = 'mine'
+
+    @classmethod
+    def is_active(cls, request):
+        return request.query_params.get(cls.query_param, '').lower() in ('true', '1')
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.is_active(request):
+            return queryset
+        field, owner_id = get_owner_lookup(queryset.model, get_request_identity(request))
+        if owner_id is None:
+            return queryset.none()
+        return queryset.filter(**{field: owner_id})
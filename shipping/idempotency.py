@@ -0,0 +1,143 @@
+"""
+Idempotency-Key support for write endpoints.
+
+A POST, PUT, PATCH or DELETE sent with an ``Idempotency-Key`` header runs
+in one transaction that first inserts the (user, key) row, then runs the
+view and stores its response on that row. A retry with the same key gets
+the stored response back, flagged with ``Idempotent-Replayed: true``,
+without running the view again. A retry that arrives while the first
+request is still running blocks on the row's unique index until that
+request commits (and then replays) or rolls back (and then runs itself),
+so a key is executed at most once. Reusing a key for a different request
+is a 422. Keys expire after IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+REPLAYED_HEADERS = ('Location',)
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'Idempotency-Key was already used for a different request'
+
+
+class Replay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def _ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def _to_json(data):
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def fingerprint(request):
+    body = json.dumps(request.data, cls=JSONEncoder, sort_keys=True, default=str)
+    payload = f'{request.method} {request.path}\n{body}'
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def claim(user, key, request_fingerprint):
+    """
+    Insert the key, or raise Replay with its stored response. Must run in
+    the transaction that will store the response.
+    """
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=user, key=key, fingerprint=request_fingerprint)
+    except IntegrityError:
+        pass
+
+    stored = IdempotencyKey.objects.select_for_update().get(user=user, key=key)
+    if stored.created_at < timezone.now() - _ttl():
+        stored.delete()
+        return IdempotencyKey.objects.create(user=user, key=key, fingerprint=request_fingerprint)
+    if stored.fingerprint != request_fingerprint:
+        raise KeyReused()
+
+    response = Response(stored.response_body, status=stored.response_status)
+    for name, value in stored.response_headers.items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    raise Replay(response)
+
+
+def store(record, response):
+    record.response_status = response.status_code
+    record.response_body = _to_json(response.data)
+    record.response_headers = {
+        name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)
+    }
+    record.save(update_fields=['response_status', 'response_body', 'response_headers'])
+
+
+def purge_keys(older_than, batch_size=10000):
+    purged = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(created_at__lt=older_than)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+
+class IdempotentWriteMixin:
+    """
+    Honour ``Idempotency-Key`` on the viewset's writes. Responses of 500 and
+    above are not stored: the transaction rolls back and the key stays free
+    for a retry.
+    """
+    idempotency_key_max_length = 255
+
+    def dispatch(self, request, *args, **kwargs):
+        self.idempotency_record = None
+        if request.method not in WRITE_METHODS or HEADER not in request.META:
+            return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+            return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.META.get(HEADER)
+        if key is None or request.method not in WRITE_METHODS:
+            return
+        if not key or len(key) > self.idempotency_key_max_length:
+            raise ParseError(
+                f'Idempotency-Key must be 1 to {self.idempotency_key_max_length} characters'
+            )
+        self.idempotency_record = claim(request.user, key, fingerprint(request))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Replay):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        record = getattr(self, 'idempotency_record', None)
+        if record is not None and response.status_code < 500:
+            store(record, response)
+        return response
@@ -0,0 +1,265 @@
+"""
+Load planning: which pending packages a carrier should approve.
+
+Every package occupies a contiguous range of the journey's legs (see
+reservations.leg_span) and earns ``weight * price_per_kg``. Choosing the
+approvals is a multi-dimensional knapsack over interval items: each leg is
+a capacity constraint, the vehicle's capacity less what approved and
+in-transit packages already hold there.
+
+The planner first prices every leg by subgradient descent on the
+Lagrangian relaxation, which also gives an upper bound on the revenue of
+any plan. It packs greedily by revenue per priced kilogram-leg, so that
+short trips through congested legs lose to trips using idle ones, and
+repairs the packing by swapping an unselected package in for cheaper
+blocking ones. It then restarts from randomly perturbed prices until the
+time budget runs out, keeping the best plan.
+"""
+import random
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from .models import Package, StopPoint
+from .reservations import ReservationError, leg_span, reserved_weight
+
+Candidate = namedtuple('Candidate', ['package_id', 'start', 'end', 'amount', 'value'])
+LoadPlan = namedtuple('LoadPlan', ['selected', 'revenue', 'loads', 'bound', 'rounds'])
+
+COMMITTED_STATUSES = ('APPROVED', 'IN_TRANSIT')
+
+
+def _density(candidate, prices=None):
+    """Revenue per unit of the capacity a candidate occupies, legs weighted by ``prices``."""
+    if prices is None:
+        return candidate.value / (candidate.amount * (candidate.end - candidate.start))
+    return candidate.value / (candidate.amount * sum(prices[candidate.start:candidate.end]))
+
+
+def _fits(loads, capacities, candidate):
+    amount = candidate.amount
+    return all(
+        loads[leg] + amount <= capacities[leg]
+        for leg in range(candidate.start, candidate.end)
+    )
+
+
+def _place(loads, candidate, sign=1):
+    for leg in range(candidate.start, candidate.end):
+        loads[leg] += sign * candidate.amount
+
+
+def _greedy(capacities, order):
+    loads = [0] * len(capacities)
+    selected = set()
+    for candidate in order:
+        if _fits(loads, capacities, candidate):
+            _place(loads, candidate)
+            selected.add(candidate)
+    return selected, loads
+
+
+def _improve(capacities, candidates, selected, loads, prices, deadline):
+    """
+    Swap each unselected package in when evicting the lowest-density selected
+    packages blocking it frees enough room for less revenue than it brings;
+    packages that fit outright are simply added.
+    """
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        # Evictions are tried cheapest first; the ranking is refreshed every pass.
+        ranked = sorted(selected, key=lambda candidate: _density(candidate, prices))
+        for candidate in candidates:
+            if time.perf_counter() >= deadline:
+                break
+            if candidate in selected:
+                continue
+            deficits = {
+                leg: loads[leg] + candidate.amount - capacities[leg]
+                for leg in range(candidate.start, candidate.end)
+                if loads[leg] + candidate.amount > capacities[leg]
+            }
+            if not deficits:
+                _place(loads, candidate)
+                selected.add(candidate)
+                improved = True
+                continue
+
+            first, last = min(deficits), max(deficits)
+            evicted, lost = [], 0
+            for other in ranked:
+                if other.end <= first or other.start > last or other not in selected:
+                    continue
+                hits = [leg for leg in range(other.start, other.end) if deficits.get(leg, 0) > 0]
+                if not hits:
+                    continue
+                evicted.append(other)
+                lost += other.value
+                if lost >= candidate.value:
+                    break
+                for leg in hits:
+                    deficits[leg] -= other.amount
+                if all(need <= 0 for need in deficits.values()):
+                    break
+            if lost >= candidate.value or any(need > 0 for need in deficits.values()):
+                continue
+
+            for other in evicted:
+                _place(loads, other, -1)
+                selected.discard(other)
+            _place(loads, candidate)
+            selected.add(candidate)
+            improved = True
+    return selected, loads
+
+
+def _lagrangian(capacities, spans, prices):
+    """The relaxation's value for leg prices ``prices``, and the load it would put on each leg."""
+    bound = sum(price * capacity for price, capacity in zip(prices, capacities))
+    loads = [0] * len(capacities)
+    for (start, end), members in spans.items():
+        cost = sum(prices[start:end])
+        taken = 0
+        for candidate in members:
+            reduced = candidate.value - candidate.amount * cost
+            if reduced > 0:
+                bound += reduced
+                taken += candidate.amount
+        for leg in range(start, end):
+            loads[leg] += taken
+    return bound, loads
+
+
+def leg_prices(capacities, candidates, iterations=40):
+    """
+    Price every leg's capacity by subgradient descent on the Lagrangian
+    relaxation. Returns ``(prices, bound)``: any plan earns at most
+    ``bound``, and ``prices`` tell how scarce each leg is.
+    """
+    legs = len(capacities)
+    if not candidates:
+        return [0.0] * legs, 0.0
+    mean = sum(candidate.value for candidate in candidates) / sum(
+        candidate.amount for candidate in candidates
+    )
+    # Start by sharing the going rate per kg between the congested legs.
+    demand = [0] * legs
+    for candidate in candidates:
+        _place(demand, candidate)
+    prices = [
+        mean * max(demand[leg] - capacities[leg], 0) / demand[leg] if demand[leg] else 0.0
+        for leg in range(legs)
+    ]
+
+    # Candidates sharing a span share its price; journeys have few distinct spans.
+    spans = defaultdict(list)
+    for candidate in candidates:
+        spans[candidate.start, candidate.end].append(candidate)
+
+    best_bound, best_prices = float('inf'), prices
+    step = mean / 2
+    for _ in range(iterations):
+        bound, loads = _lagrangian(capacities, spans, prices)
+        if bound < best_bound:
+            best_bound, best_prices = bound, prices
+        else:
+            step /= 2
+        gradient = [capacities[leg] - loads[leg] for leg in range(legs)]
+        norm = sum(value * value for value in gradient) ** 0.5
+        if not norm:
+            break
+        prices = [
+            max(price - step * value / norm, 0.0)
+            for price, value in zip(prices, gradient)
+        ]
+    return best_prices, best_bound
+
+
+def plan_load(capacities, candidates, time_budget=0.2, seed=0):
+    """
+    Choose candidates fitting under ``capacities`` (one per leg) for the
+    most revenue within ``time_budget`` seconds. The first greedy pass
+    always completes, whatever the budget.
+    """
+    deadline = time.perf_counter() + time_budget
+    rng = random.Random(seed)
+    candidates = [candidate for candidate in candidates if candidate.amount > 0]
+    total = sum(candidate.value for candidate in candidates)
+    prices, bound = leg_prices(capacities, candidates)
+    bound = min(bound, total)
+    # A leg nobody competes for still costs a little, so shorter trips win ties.
+    floor = 0.01 * (max(prices) or 1.0)
+    prices = [max(price, floor) for price in prices]
+
+    best, best_revenue, best_loads, rounds = set(), -1, [0] * len(capacities), 0
+    # The plain kilogram-leg density first, then the priced one, then perturbations.
+    round_prices = [1.0] * len(capacities)
+    while True:
+        order = sorted(candidates, key=lambda candidate: _density(candidate, round_prices), reverse=True)
+        selected, loads = _greedy(capacities, order)
+        selected, loads = _improve(capacities, order, selected, loads, round_prices, deadline)
+        revenue = sum(candidate.value for candidate in selected)
+        rounds += 1
+        if revenue > best_revenue:
+            best, best_revenue, best_loads = selected, revenue, loads
+        # Stop early once everything fits or the plan is provably optimal.
+        if time.perf_counter() >= deadline or best_revenue >= bound - 1e-6:
+            break
+        if rounds == 1:
+            round_prices = prices
+        else:
+            round_prices = [price * rng.uniform(0.7, 1.3) for price in prices]
+
+    return LoadPlan(
+        selected=sorted(candidate.package_id for candidate in best),
+        revenue=best_revenue,
+        loads=best_loads,
+        bound=bound,
+        rounds=rounds,
+    )
+
+
+def load_journey_problem(journey, capacity=None):
+    """
+    Return ``(stops, capacities, candidates)`` for the journey's pending
+    packages. ``capacity`` (default: the vehicle's) is what the vehicle may
+    carry on each leg before approved and in-transit packages are counted.
+    """
+    stops = list(StopPoint.objects.filter(journey_id=journey.pk).values_list('id', 'city'))
+    stop_ids = [stop_id for stop_id, _ in stops]
+    if capacity is None:
+        capacity = journey.vehicle.capacity
+    capacities = [capacity] * (len(stops) + 1)
+
+    rows = Package.objects.filter(
+        journey_id=journey.pk,
+        status__in=('PENDING',) + COMMITTED_STATUSES
+    ).values_list('id', 'status', 'weight', 'origin_stop_id', 'destination_stop_id')
+
+    candidates = []
+    price_per_kg = journey.price_per_kg
+    for package_id, status, weight, origin_id, destination_id in rows:
+        try:
+            start, end = leg_span(stop_ids, origin_id, destination_id)
+        except ReservationError:
+            continue
+        amount = reserved_weight(weight)
+        if status == 'PENDING':
+            candidates.append(
+                Candidate(package_id, start, end, amount, float(weight * price_per_kg))
+            )
+        else:
+            for leg in range(start, end):
+                capacities[leg] -= amount
+    capacities = [max(leg_capacity, 0) for leg_capacity in capacities]
+    return stops, capacities, candidates
+
+
+def describe_legs(journey, stops):
+    cities = [journey.departure_city] + [city for _, city in stops] + [journey.arrival_city]
+    return list(zip(cities[:-1], cities[1:]))
+
+
+def to_money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
@@ -0,0 +1,60 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shipping.archive import (
+    archive_journey_batch, archive_package_batch, journey_candidates, package_candidates
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Move completed or cancelled journeys and delivered or cancelled packages '
+        'older than --days into the archive tables, one short transaction per batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'ARCHIVE_AFTER_DAYS', 90)
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between batches to leave room for live traffic.'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'{journey_candidates(cutoff).count()} journeys and '
+                f'{package_candidates(cutoff).count()} packages are old enough to archive.'
+            )
+            return
+
+        journeys = packages = 0
+        while True:
+            archived_journeys, archived_packages = archive_journey_batch(cutoff, batch_size)
+            if not archived_journeys:
+                break
+            journeys += archived_journeys
+            packages += archived_packages
+            time.sleep(options['sleep'])
+        while True:
+            archived_packages = archive_package_batch(cutoff, batch_size)
+            if not archived_packages:
+                break
+            packages += archived_packages
+            time.sleep(options['sleep'])
+
+        self.stdout.write(f'Archived {journeys} journeys and {packages} packages.')
@@ -0,0 +1,320 @@
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from shipping.models import Journey, Package, Review, SenderProfile
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+
+class Workload:
+    """
+    Users and rows the scenarios draw from, loaded once before the run. Each
+    scenario returns ``(user, method, url, data)`` for the next request.
+    """
+
+    def __init__(self, pool_size):
+        journeys = list(
+            Journey.objects.filter(status='SCHEDULED', available_capacity__gte=100)
+            .values_list('id', 'departure_city', 'arrival_city')[:pool_size]
+        )
+        if not journeys:
+            raise CommandError('No scheduled journeys found, run generate_marketplace first.')
+        self.journey_ids = [journey_id for journey_id, _, _ in journeys]
+        self.routes = [(origin, destination) for _, origin, destination in journeys]
+        self.cities = sorted({city for route in self.routes for city in route})
+
+        senders = list(
+            SenderProfile.objects.select_related('user_profile__user')
+            .order_by('id')[:pool_size]
+        )
+        self.senders = [sender.user_profile.user for sender in senders]
+
+        # Packages flipped between PENDING and APPROVED by update_status, so
+        # repeated runs leave the dataset as they found it.
+        self.status_pool = list(
+            Package.objects.filter(status__in=['PENDING', 'APPROVED'])
+            .select_related('sender__user_profile__user')
+            .order_by('id')[:pool_size]
+        )
+        self.status_lock = threading.Lock()
+
+
+def journeys_list(workload, rng):
+    return rng.choice(workload.senders), 'get', reverse('journey-list'), {}
+
+
+def journeys_filter(workload, rng):
+    return rng.choice(workload.senders), 'get', reverse('journey-list'), {
+        'departure_city': rng.choice(workload.cities),
+        'status': 'SCHEDULED',
+        'ordering': 'price_per_kg',
+    }
+
+
+def journeys_search(workload, rng):
+    return rng.choice(workload.senders), 'get', reverse('journey-list'), {
+        'search': rng.choice(workload.cities)[:4],
+    }
+
+
+def journeys_routes(workload, rng):
+    origin, destination = rng.choice(workload.routes)
+    return rng.choice(workload.senders), 'get', reverse('journey-routes'), {
+        'origin': origin,
+        'destination': destination,
+    }
+
+
+def packages_list(workload, rng):
+    return rng.choice(workload.senders), 'get', reverse('package-list'), {}
+
+
+def packages_filter(workload, rng):
+    return rng.choice(workload.senders), 'get', reverse('package-list'), {
+        'status': rng.choice(['PENDING', 'APPROVED', 'IN_TRANSIT', 'DELIVERED']),
+        'ordering': '-weight',
+    }
+
+
+def reviews_list(workload, rng):
+    return rng.choice(workload.senders), 'get', reverse('review-list'), {
+        'review_type': 'CARRIER',
+        'ordering': '-rating',
+    }
+
+
+def package_create(workload, rng):
+    return rng.choice(workload.senders), 'post', reverse('package-list'), {
+        'journey': rng.choice(workload.journey_ids),
+        'sender_id_card': 'BENCH',
+        'sender_phone': '+33600000000',
+        'recipient_phone': '+221700000000',
+        'size': 'SMALL',
+        'weight': '15.00',
+        'contents': ['benchmark'],
+    }
+
+
+BULK_BOOKING_SIZE = 50
+
+
+def package_bulk_create(workload, rng):
+    """Books ``BULK_BOOKING_SIZE`` packages per request; compare per package with package_create."""
+    user, _, _, item = package_create(workload, rng)
+    return user, 'post', reverse('package-bulk-book'), [
+        {**item, 'journey': rng.choice(workload.journey_ids)} for _ in range(BULK_BOOKING_SIZE)
+    ]
+
+
+def package_update_status(workload, rng):
+    with workload.status_lock:
+        package = rng.choice(workload.status_pool)
+        package.status = 'APPROVED' if package.status == 'PENDING' else 'PENDING'
+    return (
+        package.sender.user_profile.user, 'post',
+        reverse('package-update-status', args=[package.pk]), {'status': package.status}
+    )
+
+
+SCENARIOS = {
+    'journeys_list': journeys_list,
+    'journeys_filter': journeys_filter,
+    'journeys_search': journeys_search,
+    'journeys_routes': journeys_routes,
+    'packages_list': packages_list,
+    'packages_filter': packages_filter,
+    'reviews_list': reviews_list,
+    'package_create': package_create,
+    'package_bulk_create': package_bulk_create,
+    'package_update_status': package_update_status,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the journey, package and review endpoints with concurrent '
+        'clients and report throughput, latency percentiles and query counts '
+        'as JSON. Run it against data from generate_marketplace.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--pool-size', type=int, default=500)
+        parser.add_argument(
+            '--auth',
+            choices=['force', 'token'],
+            default='force',
+            help='force skips authentication; token sends real token headers.'
+        )
+        parser.add_argument(
+            '--no-token-cache',
+            action='store_true',
+            help='Run with TOKEN_CACHE_TTL = 0 to measure uncached token lookups.'
+        )
+        parser.add_argument(
+            '--no-instrumentation',
+            action='store_true',
+            help='Run with REQUEST_INSTRUMENTATION = False to measure its overhead.'
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        workload = Workload(options['pool_size'])
+        self.tokens = self.get_tokens(workload) if options['auth'] == 'token' else None
+        report = {
+            'meta': self.get_meta(options),
+            'scenarios': {},
+        }
+        token_cache_ttl = 0 if options['no_token_cache'] else settings.TOKEN_CACHE_TTL
+        instrumentation = (
+            not options['no_instrumentation'] and getattr(settings, 'REQUEST_INSTRUMENTATION', False)
+        )
+        with override_settings(TOKEN_CACHE_TTL=token_cache_ttl, REQUEST_INSTRUMENTATION=instrumentation):
+            for name in options['scenario'] or list(SCENARIOS):
+                self.stderr.write(f'Running {name}...')
+                self.run_scenario(name, workload, options['warmup'], 1, options['seed'])
+                report['scenarios'][name] = self.run_scenario(
+                    name, workload, options['requests'], options['concurrency'], options['seed']
+                )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def get_tokens(self, workload):
+        users = workload.senders + [package.sender.user_profile.user for package in workload.status_pool]
+        return {
+            user.pk: Token.objects.get_or_create(user=user)[0].key
+            for user in users
+        }
+
+    def authenticate(self, client, user):
+        if self.tokens is None:
+            client.force_authenticate(user)
+        else:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[user.pk]}')
+
+    def get_meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, cwd=settings.BASE_DIR, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'seed': options['seed'],
+            'auth': options['auth'],
+            'token_cache': not options['no_token_cache'],
+            'instrumentation': not options['no_instrumentation'] and getattr(
+                settings, 'REQUEST_INSTRUMENTATION', False
+            ),
+            'rows': {
+                'journeys': Journey.objects.count(),
+                'packages': Package.objects.count(),
+                'reviews': Review.objects.count(),
+            },
+        }
+
+    def run_scenario(self, name, workload, total, concurrency, seed):
+        build = SCENARIOS[name]
+        counter = iter(range(total))
+        counter_lock = threading.Lock()
+
+        def worker(index):
+            rng = random.Random(f'{seed}:{name}:{index}')
+            client = APIClient(raise_request_exception=False, SERVER_NAME='localhost')
+            samples = []
+            try:
+                while True:
+                    with counter_lock:
+                        if next(counter, None) is None:
+                            break
+                    user, method, url, data = build(workload, rng)
+                    self.authenticate(client, user)
+
+                    start = time.perf_counter()
+                    with CaptureQueriesContext(connection) as queries:
+                        if method == 'get':
+                            response = client.get(url, data)
+                        else:
+                            response = client.generic(
+                                method.upper(), url, json.dumps(data),
+                                content_type='application/json'
+                            )
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    auth_queries = sum(
+                        1 for query in queries.captured_queries
+                        if 'authtoken_token' in query['sql']
+                    )
+                    samples.append((
+                        elapsed_ms,
+                        len(queries.captured_queries),
+                        auth_queries,
+                        response.status_code,
+                        response.get('X-Cache'),
+                    ))
+            finally:
+                connection.close()
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        samples = [sample for result in results for sample in result]
+        latencies = sorted(sample[0] for sample in samples)
+        queries = sorted(sample[1] for sample in samples)
+        auth_queries = sum(sample[2] for sample in samples)
+        statuses = Counter(sample[3] for sample in samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(count for code, count in statuses.items() if code >= 400),
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+            'cache_hits': sum(1 for sample in samples if sample[4] == 'HIT'),
+            'duration_s': round(elapsed, 3),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'max': round(latencies[-1], 2) if latencies else None,
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2) if queries else None,
+                'p50': percentile(queries, 0.50),
+                'max': queries[-1] if queries else None,
+                'auth_mean': round(auth_queries / len(samples), 2) if samples else None,
+            },
+        }
@@ -0,0 +1,83 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shipping.load_planning import (
+    Candidate, _density, _greedy, load_journey_problem, plan_load
+)
+from shipping.models import Journey
+
+
+def generate_problem(rng, packages, stops, capacity, price_per_kg):
+    """A journey with ``stops`` stop points and ``packages`` pending candidates."""
+    legs = stops + 1
+    candidates = []
+    for package_id in range(1, packages + 1):
+        start = rng.randrange(legs)
+        end = rng.randint(start + 1, legs)
+        weight = rng.randint(1500, 6000) / 100
+        candidates.append(Candidate(package_id, start, end, -int(-weight // 1), weight * price_per_kg))
+    return [capacity] * legs, candidates
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the load planner on generated journeys with thousands of '
+        'pending packages (or on a real journey with --journey), reporting '
+        'revenue against the greedy baseline and an upper bound.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=3000, help='Pending packages per journey')
+        parser.add_argument('--stops', type=int, default=8, help='Stop points per journey')
+        parser.add_argument('--capacity', type=int, default=5000, help='Vehicle capacity in kg')
+        parser.add_argument('--price-per-kg', type=float, default=4.5)
+        parser.add_argument('--budget-ms', type=int, action='append',
+                            help='Time budget in milliseconds, repeatable (default: 50, 200, 1000)')
+        parser.add_argument('--runs', type=int, default=3, help='Generated journeys per budget')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--journey', type=int, help='Plan this journey instead of generated ones')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['journey']:
+            journey = Journey.objects.select_related('vehicle').filter(pk=options['journey']).first()
+            if journey is None:
+                raise CommandError(f'Journey {options["journey"]} not found.')
+            _, capacities, candidates = load_journey_problem(journey)
+            problems = [(capacities, candidates)]
+        else:
+            problems = [
+                generate_problem(
+                    rng, options['packages'], options['stops'],
+                    options['capacity'], options['price_per_kg']
+                )
+                for _ in range(options['runs'])
+            ]
+
+        results = []
+        for budget_ms in options['budget_ms'] or [50, 200, 1000]:
+            for index, (capacities, candidates) in enumerate(problems):
+                greedy, _ = _greedy(capacities, sorted(candidates, key=_density, reverse=True))
+                greedy_revenue = sum(candidate.value for candidate in greedy)
+
+                start = time.perf_counter()
+                plan = plan_load(capacities, candidates, budget_ms / 1000, seed=options['seed'])
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                results.append({
+                    'budget_ms': budget_ms,
+                    'problem': index,
+                    'candidates': len(candidates),
+                    'legs': len(capacities),
+                    'elapsed_ms': round(elapsed_ms, 1),
+                    'rounds': plan.rounds,
+                    'approved': len(plan.selected),
+                    'revenue': round(plan.revenue, 2),
+                    'greedy_revenue': round(greedy_revenue, 2),
+                    'upper_bound': round(plan.bound, 2),
+                    'gap_pct': round(max(plan.bound - plan.revenue, 0) * 100 / plan.bound, 2) if plan.bound else 0.0,
+                })
+
+        self.stdout.write(json.dumps(results, indent=2))
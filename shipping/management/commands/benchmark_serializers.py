@@ -0,0 +1,121 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from shipping.eager_loading import eager_load
+from shipping.fast_read import compile_serializer
+from shipping.serializers import (
+    CarrierProfileSerializer, JourneySerializer, PackageSerializer,
+    ReviewSerializer, SenderProfileSerializer, get_field_spec
+)
+
+SERIALIZERS = {
+    'journeys': JourneySerializer,
+    'packages': PackageSerializer,
+    'reviews': ReviewSerializer,
+    'carriers': CarrierProfileSerializer,
+    'senders': SenderProfileSerializer,
+}
+
+# Query strings each serializer is rendered with.
+SPECS = ['', 'flat=true', 'expand=journey', 'fields=id,status,journey.departure_city']
+
+
+class Command(BaseCommand):
+    help = (
+        'Render pages through the DRF serializers and their compiled fast '
+        'read plans, check both produce the same bytes and compare timings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--serializer', action='append', choices=list(SERIALIZERS),
+                            help='Serializer to run, repeatable (default: all)')
+        parser.add_argument('--spec', action='append',
+                            help='Query string such as "flat=true", repeatable')
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Renders per path, the median is reported')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        results = []
+        mismatches = []
+        for name in options['serializer'] or list(SERIALIZERS):
+            serializer_class = SERIALIZERS[name]
+            for query in options['spec'] or SPECS:
+                request = Request(factory.get('/', QueryDict(query)))
+                plan = compile_serializer(serializer_class, get_field_spec(request))
+                if plan is None:
+                    results.append({'serializer': name, 'spec': query, 'supported': False})
+                    continue
+
+                drf, drf_body = self.measure(
+                    lambda: self.render_drf(serializer_class, request, options['rows']),
+                    options['repeat']
+                )
+                fast, fast_body = self.measure(
+                    lambda: self.render_fast(serializer_class, plan, request, options['rows']),
+                    options['repeat']
+                )
+                identical = drf_body == fast_body
+                if not identical:
+                    mismatches.append(f'{name}?{query}')
+                results.append({
+                    'serializer': name,
+                    'spec': query,
+                    'supported': True,
+                    'rows': options['rows'],
+                    'identical': identical,
+                    'drf': drf,
+                    'fast': fast,
+                    'page_speedup': self.speedup(drf['page_ms'], fast['page_ms']),
+                    'serialize_speedup': self.speedup(drf['serialize_ms'], fast['serialize_ms']),
+                })
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if mismatches:
+            raise CommandError(f'Fast read output differs for: {", ".join(mismatches)}')
+
+    def measure(self, render, repeat):
+        """
+        Median time of the whole page (queries, serialization, JSON
+        rendering) and of serialization alone.
+        """
+        pages, serializations = [], []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            body, serialize_seconds = render()
+            pages.append(time.perf_counter() - start)
+            serializations.append(serialize_seconds)
+        return {
+            'page_ms': round(statistics.median(pages) * 1000, 2),
+            'serialize_ms': round(statistics.median(serializations) * 1000, 2),
+        }, body
+
+    def speedup(self, drf_ms, fast_ms):
+        return round(drf_ms / fast_ms, 1) if fast_ms else None
+
+    def render_drf(self, serializer_class, request, rows):
+        context = {'request': request}
+        model = serializer_class.Meta.model
+        instances = list(eager_load(model.objects.order_by('id'), serializer_class, context)[:rows])
+        start = time.perf_counter()
+        data = serializer_class(instances, many=True, context=context).data
+        serialize_seconds = time.perf_counter() - start
+        return JSONRenderer().render(data), serialize_seconds
+
+    def render_fast(self, serializer_class, plan, request, rows):
+        model = serializer_class.Meta.model
+        values = list(model.objects.order_by('id').values(*plan.columns)[:rows])
+        # Includes the queries of nested many relations, which the DRF
+        # path ran as prefetches above.
+        start = time.perf_counter()
+        data = plan.render_many(values, request)
+        serialize_seconds = time.perf_counter() - start
+        return JSONRenderer().render(data), serialize_seconds
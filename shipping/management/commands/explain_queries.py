@@ -0,0 +1,123 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from shipping.filters import JourneyFilter, PackageFilter, RouteSegmentFilter
+from shipping.models import ChangeLogEntry, Journey, Package, Review, RouteSegment, StopPoint
+from shipping.tracking import PROJECTION
+
+PAGE = 11
+
+
+def journeys(query, ordering=('departure_date', 'id')):
+    return JourneyFilter(QueryDict(query), queryset=Journey.objects.all()).qs.order_by(*ordering)[:PAGE]
+
+
+def packages(query, ordering=('-created_at', '-id'), **scope):
+    queryset = Package.objects.filter(**scope)
+    return PackageFilter(QueryDict(query), queryset=queryset).qs.order_by(*ordering)[:PAGE]
+
+
+# The filter and ordering combinations the viewsets expose, with the keyset
+# pagination's (field, id) ordering and page size.
+QUERY_SHAPES = [
+    ('journeys by date', lambda: journeys('')),
+    ('journeys by route', lambda: journeys('departure_city=paris&arrival_city=DAKAR')),
+    ('journeys by arrival city', lambda: journeys('arrival_city=dakar')),
+    ('scheduled journeys by date', lambda: journeys('status=SCHEDULED')),
+    ('scheduled journeys by price', lambda: journeys('status=SCHEDULED', ('price_per_kg', 'id'))),
+    ('journeys by status', lambda: journeys('status=COMPLETED')),
+    ('journeys of a carrier (mine)', lambda: journeys('carrier=1')),
+    ('journeys in a price range', lambda: journeys('min_price=2&max_price=5', ('price_per_kg', 'id'))),
+    ('journeys in a date window', lambda: journeys(
+        'departure_date_after=2030-01-01&departure_date_before=2030-02-01'
+    )),
+    ('packages by creation', lambda: packages('')),
+    ('packages by status', lambda: packages('status=PENDING')),
+    ('packages of a sender (mine)', lambda: packages('sender=1')),
+    ('packages in a weight range', lambda: packages('min_weight=20&max_weight=40', ('weight', 'id'))),
+    ('packages of a carrier', lambda: packages('', journey__carrier_id=1)),
+    ('packages of a journey by status', lambda: Package.objects.filter(
+        journey_id=1, status__in=['PENDING', 'APPROVED']
+    )),
+    ('reviews of a profile', lambda: Review.objects.filter(
+        reviewed_id=1
+    ).order_by('-created_at', '-id')[:PAGE]),
+    ('reviews by a profile (mine)', lambda: Review.objects.filter(
+        reviewer_id=1
+    ).order_by('-created_at', '-id')[:PAGE]),
+    ('stop points of journeys', lambda: StopPoint.objects.filter(journey_id__in=[1, 2, 3])),
+    # Served from package_tracking_cover_idx without reading package rows.
+    ('tracking lookup', lambda: Package.objects.filter(
+        tracking_number__in=['A1', 'B2']
+    ).values_list(*PROJECTION)),
+    ('route segments', lambda: RouteSegmentFilter(
+        QueryDict('origin=paris&destination=dakar&departure_date_after=2030-01-01'),
+        queryset=RouteSegment.objects.order_by('departure_date', 'id')
+    ).qs[:PAGE]),
+    # current_cursor() takes the MAX() of these ids.
+    ('change feed cursor', lambda: ChangeLogEntry.objects.filter(
+        created_at__lte=timezone.now()
+    ).values_list('id', flat=True)),
+    ('change log purge', lambda: ChangeLogEntry.objects.filter(
+        created_at__lt=timezone.now(), id__lt=1000
+    ).order_by('id').values_list('id', flat=True)[:10000]),
+]
+
+# Lines of a plan reading a whole table rather than an index.
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)\S+(?!.*\bUSING\b)'),
+    'postgresql': re.compile(r'\bSeq Scan on \S+'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN every documented journey, package and review query shape '
+        'and fail if any of them reads a whole table (SQLite and PostgreSQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Refresh planner statistics first; without them SQLite ignores partial indexes'
+        )
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Unsupported database: {connection.vendor}')
+
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # On small tables a sequential scan is cheaper and would be
+                # chosen anyway; the check is whether an index can serve.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, build in QUERY_SHAPES:
+                plan = build().explain()
+                scans = [line.strip() for line in plan.splitlines() if pattern.search(line)]
+                if scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'FULL SCAN  {name}'))
+                    for line in scans:
+                        self.stdout.write(f'    {line}')
+                else:
+                    self.stdout.write(f'ok         {name}')
+                if options['verbose_plans']:
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    | {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} query shapes read a whole table.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(QUERY_SHAPES)} query shapes use an index.'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipping.counters import fold_counters
+
+
+class Command(BaseCommand):
+    help = 'Fold buffered counter shards back into profile counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, folding every INTERVAL seconds.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            folded = fold_counters(batch_size=options['batch_size'])
+            self.stdout.write(f'Folded {folded} counter shards.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,266 @@
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from shipping.caching import bump
+from shipping.models import (
+    UserProfile, CarrierProfile, SenderProfile, Vehicle,
+    Journey, StopPoint, Package, Review
+)
+from shipping.reservations import reserved_weight
+from shipping.ratings import PROFILE_MODELS, rebuild_ratings
+from shipping.routes import rebuild_index
+
+CITIES = [
+    'Paris', 'Lyon', 'Marseille', 'Toulouse', 'Bordeaux', 'Madrid', 'Barcelona',
+    'Valencia', 'Algeciras', 'Tanger', 'Casablanca', 'Rabat', 'Marrakech',
+    'Agadir', 'Dakhla', 'Nouakchott', 'Dakar', 'Tunis', 'Alger', 'Oran',
+]
+VEHICLE_TYPES = [('Van', 1200), ('Truck', 8000), ('Car', 400)]
+STATUSES = [status for status, _ in Package.STATUS_CHOICES]
+SIZES = [size for size, _ in Package.SIZE_CHOICES]
+CONTENTS = ['clothes', 'food', 'documents', 'electronics', 'spare parts', 'cosmetics']
+CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible synthetic marketplace (carriers, vehicles, '
+        'journeys with stop points, senders, packages in every status and '
+        'reviews) with bulk inserts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--carriers', type=int, default=100)
+        parser.add_argument('--senders', type=int, default=1000)
+        parser.add_argument('--journeys', type=int, default=2000)
+        parser.add_argument('--packages', type=int, default=20000)
+        parser.add_argument('--max-stops', type=int, default=3)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--base-date',
+            type=datetime.fromisoformat,
+            help='Dates are spread around this day (default: today), pin it to reproduce a dataset exactly.'
+        )
+        parser.add_argument(
+            '--skip-index',
+            action='store_true',
+            help='Do not rebuild the route index and rating aggregates afterwards.'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f"s{options['seed']}"
+        base_date = options['base_date'] or timezone.localtime().replace(tzinfo=None)
+        self.now = timezone.make_aware(base_date.replace(hour=0, minute=0, second=0, microsecond=0))
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            carriers = self.create_profiles('carrier', 'CARRIER', options['carriers'])
+            senders = self.create_profiles('sender', 'SENDER', options['senders'])
+            vehicles = self.create_vehicles(carriers)
+            journeys = self.create_journeys(vehicles, options['journeys'], options['max_stops'])
+            self.create_packages(senders, journeys, options['packages'])
+            # bulk_create bypasses the cache invalidation receivers.
+            bump(['journeys', 'carriers'])
+
+        if not options['skip_index']:
+            rebuild_index(batch_size=self.batch_size)
+            for review_type in PROFILE_MODELS:
+                rebuild_ratings(review_type)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated marketplace in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.stdout.write(f'  {model.__name__}: {len(created)}')
+        return created
+
+    def create_profiles(self, name, user_type, count):
+        password = make_password(None)
+        users = self.bulk(User, [
+            User(
+                username=f'{self.prefix}-{name}-{i}',
+                email=f'{self.prefix}-{name}-{i}@example.com',
+                first_name=name.title(),
+                last_name=str(i),
+                password=password,
+            )
+            for i in range(count)
+        ])
+        # bulk_create skips the post_save receiver that creates the specific
+        # profile, so both levels are inserted here.
+        user_profiles = self.bulk(UserProfile, [
+            UserProfile(user=user, type=user_type, phone=f'+336{self.rng.randrange(10 ** 8):08d}')
+            for user in users
+        ])
+        if user_type == 'CARRIER':
+            return self.bulk(CarrierProfile, [
+                CarrierProfile(
+                    user_profile=profile,
+                    company_name=f'{profile.user.username} Transport',
+                    business_registration=f'REG{profile.pk}',
+                    verified=self.rng.random() < 0.6,
+                )
+                for profile in user_profiles
+            ])
+        return self.bulk(SenderProfile, [
+            SenderProfile(user_profile=profile) for profile in user_profiles
+        ])
+
+    def create_vehicles(self, carriers):
+        vehicles = []
+        for carrier in carriers:
+            for i in range(self.rng.randint(1, 3)):
+                vehicle_type, capacity = self.rng.choice(VEHICLE_TYPES)
+                vehicles.append(Vehicle(
+                    carrier=carrier,
+                    license_plate=f'{self.prefix.upper()}-{carrier.pk}-{i}',
+                    type=vehicle_type,
+                    brand=self.rng.choice(['Mercedes', 'Renault', 'Iveco', 'Ford']),
+                    capacity=capacity,
+                ))
+        return self.bulk(Vehicle, vehicles)
+
+    def create_journeys(self, vehicles, count, max_stops):
+        journeys, stop_cities = [], []
+        for _ in range(count):
+            vehicle = self.rng.choice(vehicles)
+            cities = self.rng.sample(CITIES, 2 + self.rng.randint(0, max_stops))
+            departure = self.now + timedelta(hours=self.rng.randint(-24 * 60, 24 * 90))
+            journeys.append(Journey(
+                carrier_id=vehicle.carrier_id,
+                vehicle=vehicle,
+                departure_city=cities[0],
+                arrival_city=cities[-1],
+                departure_date=departure,
+                collection_date=departure - timedelta(days=1),
+                collection_address=f'1 rue du Depot, {cities[0]}',
+                price_per_kg=Decimal(self.rng.randint(200, 1500)) / 100,
+                available_capacity=vehicle.capacity,
+                status='SCHEDULED' if departure > self.now else self.rng.choice(
+                    ['IN_PROGRESS', 'COMPLETED', 'COMPLETED', 'CANCELLED']
+                ),
+            ))
+            stop_cities.append(cities[1:-1])
+        journeys = self.bulk(Journey, journeys)
+
+        self.bulk(StopPoint, [
+            StopPoint(
+                journey=journey,
+                city=city,
+                address=f'Zone logistique, {city}',
+                collection_date=journey.departure_date + timedelta(hours=12 * (index + 1)),
+                available_capacity=journey.available_capacity,
+            )
+            for journey, cities in zip(journeys, stop_cities)
+            for index, city in enumerate(cities)
+        ])
+        return journeys
+
+    def create_packages(self, senders, journeys, count):
+        # Packages travel the whole route; capacity is tracked in memory so the
+        # generated data respects the same limits as live reservations. Rows
+        # are built and inserted one batch at a time to keep memory flat.
+        remaining = {journey.pk: journey.available_capacity for journey in journeys}
+        carrier_profiles = {
+            vehicle.carrier_id: vehicle.carrier.user_profile_id
+            for vehicle in {journey.vehicle for journey in journeys}
+        }
+        deliveries, sent = Counter(), Counter()
+        created = reviews = 0
+
+        for offset in range(0, count, self.batch_size):
+            packages = []
+            for i in range(offset, min(offset + self.batch_size, count)):
+                journey = self.rng.choice(journeys)
+                weight = Decimal(self.rng.randint(1500, 6000)) / 100
+                status = STATUSES[i % len(STATUSES)]
+                if status != 'CANCELLED':
+                    reserved = reserved_weight(weight)
+                    if remaining[journey.pk] < reserved:
+                        continue
+                    remaining[journey.pk] -= reserved
+                sender = self.rng.choice(senders)
+                packages.append(Package(
+                    sender=sender,
+                    journey=journey,
+                    sender_id_card=f'ID{sender.pk:08d}',
+                    sender_phone=f'+336{self.rng.randrange(10 ** 8):08d}',
+                    recipient_phone=f'+221{self.rng.randrange(10 ** 9):09d}',
+                    size=self.rng.choice(SIZES),
+                    weight=weight,
+                    contents=self.rng.sample(CONTENTS, self.rng.randint(1, 3)),
+                    status=status,
+                    tracking_number=f'{self.prefix.upper()}{i:012d}',
+                    pickup_code=''.join(self.rng.choices(CODE_ALPHABET, k=6)),
+                    delivery_code=''.join(self.rng.choices(CODE_ALPHABET, k=6)),
+                ))
+            packages = Package.objects.bulk_create(packages, batch_size=self.batch_size)
+            created += len(packages)
+
+            delivered = [package for package in packages if package.status == 'DELIVERED']
+            for package in delivered:
+                deliveries[package.journey.carrier_id] += 1
+                sent[package.sender_id] += 1
+            reviews += self.create_reviews(delivered, carrier_profiles)
+
+        self.stdout.write(f'  Package: {created}')
+        self.stdout.write(f'  Review: {reviews}')
+
+        for journey in journeys:
+            journey.available_capacity = remaining[journey.pk]
+        Journey.objects.bulk_update(journeys, ['available_capacity'], batch_size=self.batch_size)
+        StopPoint.objects.filter(
+            journey__pk__range=(journeys[0].pk, journeys[-1].pk)
+        ).update(available_capacity=Subquery(
+            Journey.objects.filter(pk=OuterRef('journey_id')).values('available_capacity')
+        ))
+
+        CarrierProfile.objects.bulk_update(
+            [CarrierProfile(pk=pk, total_deliveries=total) for pk, total in deliveries.items()],
+            ['total_deliveries'],
+            batch_size=self.batch_size
+        )
+        SenderProfile.objects.bulk_update(
+            [SenderProfile(pk=pk, total_packages=total) for pk, total in sent.items()],
+            ['total_packages'],
+            batch_size=self.batch_size
+        )
+
+    def create_reviews(self, packages, carrier_profiles):
+        reviews = []
+        for package in packages:
+            carrier_profile = carrier_profiles[package.journey.carrier_id]
+            sender_profile = package.sender.user_profile_id
+            reviews.append(Review(
+                reviewer_id=sender_profile,
+                reviewed_id=carrier_profile,
+                package=package,
+                rating=self.rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 8, 12])[0],
+                comment='Synthetic review',
+                review_type='CARRIER',
+            ))
+            if self.rng.random() < 0.5:
+                reviews.append(Review(
+                    reviewer_id=carrier_profile,
+                    reviewed_id=sender_profile,
+                    package=package,
+                    rating=self.rng.choices([3, 4, 5], weights=[1, 3, 6])[0],
+                    comment='Synthetic review',
+                    review_type='SENDER',
+                ))
+        return len(Review.objects.bulk_create(reviews, batch_size=self.batch_size))
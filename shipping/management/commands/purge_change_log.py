@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shipping.changes import purge_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete sync change log entries older than the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'SYNC_RETENTION_DAYS', 30)
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        purged = purge_changes(
+            timezone.now() - timedelta(days=options['days']),
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(f'Purged {purged} change log entries.')
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shipping.idempotency import purge_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete idempotency keys older than their time to live.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24)
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        purged = purge_keys(
+            timezone.now() - timedelta(hours=options['hours']),
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(f'Purged {purged} idempotency keys.')
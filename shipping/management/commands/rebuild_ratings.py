@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shipping.ratings import PROFILE_MODELS, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute carrier and sender rating aggregates from the Review table, '
+        'reporting and fixing any drift.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift; exit with an error if any is found.'
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['check']
+        total = 0
+        for review_type in PROFILE_MODELS:
+            drifted = rebuild_ratings(review_type, fix=fix)
+            total += len(drifted)
+            for profile, expected_sum, expected_count in drifted:
+                self.stdout.write(
+                    f'{review_type} profile {profile.pk}: stored '
+                    f'{profile.rating_sum}/{profile.review_count}, '
+                    f'expected {expected_sum}/{expected_count}'
+                )
+
+        if options['check'] and total:
+            raise CommandError(f'{total} profiles have drifted rating aggregates.')
+        verb = 'Checked' if options['check'] else 'Rebuilt'
+        self.stdout.write(self.style.SUCCESS(f'{verb} ratings; {total} profiles drifted.'))
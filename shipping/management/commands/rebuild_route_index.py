@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from shipping.models import RouteSegment
+from shipping.routes import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the route segment index from scheduled journeys and their stop points.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {RouteSegment.objects.count()} route segments.'
+        ))
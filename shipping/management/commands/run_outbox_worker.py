@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipping.models import OutboxMessage
+from shipping.outbox import drain
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver outbox messages (notifications, delivery counters, rating '
+        'aggregates) with a pool of worker threads, retrying failures.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1,
+            help='Seconds to wait when the outbox is empty.'
+        )
+        parser.add_argument('--once', action='store_true', help='Drain due messages and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            outcomes = drain(threads=options['threads'], batch_size=options['batch_size'])
+            if outcomes or options['once']:
+                summary = ', '.join(f'{count} {outcome.lower()}' for outcome, count in sorted(outcomes.items()))
+                self.stdout.write(f'Processed outbox messages: {summary or "none due"}.')
+            if options['once']:
+                failed = OutboxMessage.objects.filter(status='FAILED').count()
+                if failed:
+                    self.stdout.write(self.style.WARNING(f'{failed} messages have failed for good.'))
+                break
+            if not outcomes:
+                time.sleep(options['interval'])
@@ -0,0 +1,74 @@
+"""
+Ranked journey matchmaking.
+
+Candidates are the route segments of the requested origin -> destination
+with room for the package, read in a single range scan of the
+(origin_key, destination_key, departure_date) index. Every feature a score
+needs (price, carrier rating and verified flag, departure date, remaining
+capacity) is stored on the segment itself, so candidates are streamed in
+chunks and pushed through a bounded heap of the k best: memory is O(k) and
+nothing is sorted however many journeys match.
+"""
+import heapq
+
+from django.db.models import Min
+
+# Relative importance of each feature, all scored between 0 and 1.
+DEFAULT_WEIGHTS = {
+    'price': 0.35,
+    'rating': 0.25,
+    'date': 0.2,
+    'verified': 0.1,
+    'capacity': 0.1,
+}
+SECONDS_PER_DAY = 86400
+
+CANDIDATE_FIELDS = (
+    'journey_id', 'carrier_id', 'origin_city', 'destination_city',
+    'departure_date', 'remaining_capacity', 'price_per_kg',
+    'carrier_rating', 'carrier_verified'
+)
+
+
+def make_scorer(cheapest_price, weight, target_date, weights=DEFAULT_WEIGHTS):
+    """
+    Return ``score(candidate)`` for rows of CANDIDATE_FIELDS:
+
+    - price: cheapest candidate price / price
+    - rating: carrier rating / 5
+    - date: 1 / (1 + days between departure and ``target_date``)
+    - verified: 1 for verified carriers
+    - capacity: share of the remaining capacity left after the package
+    """
+    cheapest = float(cheapest_price)
+    weight = float(weight)
+    target = target_date.timestamp()
+    w_price, w_rating, w_date = weights['price'], weights['rating'], weights['date']
+    w_verified, w_capacity = weights['verified'], weights['capacity']
+
+    def score(candidate):
+        _, _, _, _, departure_date, remaining, price, rating, verified = candidate
+        price = float(price)
+        days = abs(departure_date.timestamp() - target) / SECONDS_PER_DAY
+        return (
+            w_price * (cheapest / price if price else 1.0) +
+            w_rating * float(rating) / 5 +
+            w_date / (1 + days) +
+            (w_verified if verified else 0.0) +
+            w_capacity * (1 - weight / remaining if remaining else 0.0)
+        )
+    return score
+
+
+def top_matches(candidates, weight, target_date, k, chunk_size=2000):
+    """
+    Return the ``k`` best ``(score, candidate)`` pairs of the ``candidates``
+    queryset of route segments, best first.
+    """
+    cheapest = candidates.aggregate(cheapest=Min('price_per_kg'))['cheapest']
+    if cheapest is None:
+        return []
+
+    score = make_scorer(cheapest, weight, target_date)
+    rows = candidates.order_by().values_list(*CANDIDATE_FIELDS).iterator(chunk_size=chunk_size)
+    return heapq.nlargest(k, ((score(row), row) for row in rows), key=lambda pair: pair[0])
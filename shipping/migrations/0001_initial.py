@@ -0,0 +1,142 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarrierProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_name', models.CharField(max_length=100)),
+                ('business_registration', models.CharField(max_length=50)),
+                ('rating', models.DecimalField(decimal_places=2, default=5.0, max_digits=3)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('preferred_routes', models.JSONField(blank=True, default=list)),
+                ('special_rates', models.JSONField(blank=True, default=dict)),
+                ('verified', models.BooleanField(default=False)),
+                ('insurance_info', models.JSONField(blank=True, default=dict)),
+                ('total_deliveries', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Journey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure_city', models.CharField(max_length=100)),
+                ('arrival_city', models.CharField(max_length=100)),
+                ('departure_date', models.DateTimeField()),
+                ('collection_date', models.DateTimeField()),
+                ('collection_address', models.TextField()),
+                ('price_per_kg', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('available_capacity', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('SCHEDULED', 'Scheduled'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], default='SCHEDULED', max_length=20)),
+                ('carrier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='shipping.carrierprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SenderProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shipping_addresses', models.JSONField(blank=True, default=list)),
+                ('total_packages', models.PositiveIntegerField(default=0)),
+                ('rating', models.DecimalField(decimal_places=2, default=5.0, max_digits=3)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('preferred_carriers', models.ManyToManyField(blank=True, to='shipping.carrierprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Package',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sender_id_card', models.CharField(max_length=50)),
+                ('sender_phone', models.CharField(max_length=20)),
+                ('recipient_phone', models.CharField(max_length=20)),
+                ('size', models.CharField(choices=[('SMALL', 'Small'), ('MEDIUM', 'Medium'), ('LARGE', 'Large')], max_length=6)),
+                ('weight', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(15)])),
+                ('contents', models.JSONField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('IN_TRANSIT', 'In Transit'), ('DELIVERED', 'Delivered'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=10)),
+                ('tracking_number', models.CharField(max_length=50, unique=True)),
+                ('pickup_code', models.CharField(max_length=6)),
+                ('delivery_code', models.CharField(max_length=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('journey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='shipping.journey')),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='shipping.senderprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StopPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=100)),
+                ('address', models.TextField()),
+                ('collection_date', models.DateTimeField()),
+                ('available_capacity', models.PositiveIntegerField()),
+                ('journey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stop_points', to='shipping.journey')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('CARRIER', 'Carrier'), ('SENDER', 'Sender')], max_length=7)),
+                ('phone', models.CharField(max_length=20)),
+                ('profile_image', models.ImageField(blank=True, null=True, upload_to='profiles/')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='senderprofile',
+            name='user_profile',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='shipping.userprofile'),
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('comment', models.TextField()),
+                ('review_type', models.CharField(choices=[('CARRIER', 'Carrier Review'), ('SENDER', 'Sender Review')], max_length=7)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='shipping.package')),
+                ('reviewed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews_received', to='shipping.userprofile')),
+                ('reviewer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews_given', to='shipping.userprofile')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='carrierprofile',
+            name='user_profile',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='shipping.userprofile'),
+        ),
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('license_plate', models.CharField(max_length=20)),
+                ('type', models.CharField(max_length=50)),
+                ('brand', models.CharField(max_length=50)),
+                ('capacity', models.PositiveIntegerField()),
+                ('documents', models.JSONField(blank=True, default=dict)),
+                ('active', models.BooleanField(default=True)),
+                ('carrier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='shipping.carrierprofile')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='journey',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='shipping.vehicle'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='stoppoint',
+            options={'ordering': ['collection_date', 'id']},
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='destination_stop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='alighting_packages', to='shipping.stoppoint'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='origin_stop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='boarding_packages', to='shipping.stoppoint'),
+        ),
+    ]
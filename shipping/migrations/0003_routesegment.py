@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0002_stoppoint_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_city', models.CharField(max_length=100)),
+                ('destination_city', models.CharField(max_length=100)),
+                ('origin_key', models.CharField(max_length=100)),
+                ('destination_key', models.CharField(max_length=100)),
+                ('departure_date', models.DateTimeField()),
+                ('remaining_capacity', models.PositiveIntegerField()),
+                ('price_per_kg', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('destination_stop', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipping.stoppoint')),
+                ('journey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='route_segments', to='shipping.journey')),
+                ('origin_stop', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipping.stoppoint')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['origin_key', 'destination_key', 'departure_date'], name='route_segment_lookup_idx')],
+            },
+        ),
+    ]
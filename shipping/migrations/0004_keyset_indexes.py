@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0003_routesegment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['departure_date', 'id'], name='journey_date_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['price_per_kg', 'id'], name='journey_price_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['created_at', 'id'], name='package_created_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['weight', 'id'], name='package_weight_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['rating', 'id'], name='review_rating_keyset_idx'),
+        ),
+    ]
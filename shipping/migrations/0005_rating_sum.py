@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrierprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='senderprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
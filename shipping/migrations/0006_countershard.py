@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0005_rating_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field', models.CharField(max_length=50)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='countershard',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id', 'field', 'shard'), name='counter_shard_unique'),
+        ),
+    ]
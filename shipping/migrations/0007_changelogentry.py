@@ -0,0 +1,24 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0006_countershard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stream', models.CharField(max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('action', models.CharField(choices=[('UPSERT', 'Created or updated'), ('DELETE', 'Deleted')], default='UPSERT', max_length=6)),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+        ),
+    ]
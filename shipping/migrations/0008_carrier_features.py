@@ -0,0 +1,55 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_carrier_features(apps, schema_editor):
+    # Existing segments take their journey's carrier; rebuild_route_index
+    # would produce the same rows.
+    RouteSegment = apps.get_model('shipping', 'RouteSegment')
+    CarrierProfile = apps.get_model('shipping', 'CarrierProfile')
+    Journey = apps.get_model('shipping', 'Journey')
+    carrier = CarrierProfile.objects.filter(
+        pk=models.OuterRef('carrier_id')
+    )
+    RouteSegment.objects.update(
+        carrier_id=models.Subquery(
+            Journey.objects.filter(pk=models.OuterRef('journey_id')).values('carrier_id')[:1]
+        )
+    )
+    RouteSegment.objects.update(
+        carrier_rating=models.Subquery(carrier.values('rating')[:1]),
+        carrier_verified=models.Subquery(carrier.values('verified')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0007_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routesegment',
+            name='carrier',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipping.carrierprofile'),
+        ),
+        migrations.AddField(
+            model_name='routesegment',
+            name='carrier_rating',
+            field=models.DecimalField(decimal_places=2, default=5.0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='routesegment',
+            name='carrier_verified',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(copy_carrier_features, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='routesegment',
+            name='carrier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipping.carrierprofile'),
+        ),
+    ]
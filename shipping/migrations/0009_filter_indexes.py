@@ -0,0 +1,54 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0008_carrier_features'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(django.db.models.functions.text.Upper('departure_city'), django.db.models.functions.text.Upper('arrival_city'), models.F('departure_date'), name='journey_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(django.db.models.functions.text.Upper('arrival_city'), models.F('departure_date'), name='journey_arrival_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['status', 'departure_date', 'id'], name='journey_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(condition=models.Q(('status', 'SCHEDULED')), fields=['price_per_kg', 'id'], name='journey_scheduled_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['carrier', 'departure_date', 'id'], name='journey_carrier_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['journey', 'status'], name='package_journey_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='package_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['sender', 'created_at', 'id'], name='package_sender_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['reviewed', 'created_at', 'id'], name='review_reviewed_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['reviewer', 'created_at', 'id'], name='review_reviewer_created_idx'),
+        ),
+    ]
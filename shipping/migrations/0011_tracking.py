@@ -0,0 +1,17 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0010_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['tracking_number', 'status', 'updated_at', 'journey', 'origin_stop', 'destination_stop'], name='package_tracking_cover_idx'),
+        ),
+    ]
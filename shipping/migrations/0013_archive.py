@@ -0,0 +1,53 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='package',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='shipping.package'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedJourney',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(max_length=20)),
+                ('departure_city', models.CharField(max_length=100)),
+                ('arrival_city', models.CharField(max_length=100)),
+                ('departure_date', models.DateTimeField()),
+                ('data', models.JSONField()),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('carrier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipping.carrierprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPackage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tracking_number', models.CharField(max_length=50, unique=True)),
+                ('journey_id', models.BigIntegerField(db_index=True)),
+                ('status', models.CharField(max_length=10)),
+                ('origin_city', models.CharField(max_length=100)),
+                ('destination_city', models.CharField(max_length=100)),
+                ('updated_at', models.DateTimeField()),
+                ('data', models.JSONField()),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipping.senderprofile')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='archived_package',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='shipping.archivedpackage'),
+        ),
+    ]
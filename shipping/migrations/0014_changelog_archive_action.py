@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0013_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changelogentry',
+            name='action',
+            field=models.CharField(choices=[('UPSERT', 'Created or updated'), ('DELETE', 'Deleted'), ('ARCHIVE', 'Moved to the archive')], default='UPSERT', max_length=7),
+        ),
+    ]
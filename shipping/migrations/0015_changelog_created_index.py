@@ -0,0 +1,17 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0014_changelog_archive_action'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ),
+    ]
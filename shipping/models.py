@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from django.db.models.signals import post_save
+from django.db.models.functions import Now, Upper
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 class UserProfile(models.Model):
@@ -24,6 +25,7 @@ class CarrierProfile(models.Model):
     business_registration = models.CharField(max_length=50)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=5.00)
     review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
     preferred_routes = models.JSONField(default=list, blank=True)
     special_rates = models.JSONField(default=dict, blank=True)
     verified = models.BooleanField(default=False)
@@ -40,6 +42,7 @@ class SenderProfile(models.Model):
     total_packages = models.PositiveIntegerField(default=0)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=5.00)
     review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return f"{self.user_profile.user.get_full_name()}"
@@ -51,6 +54,10 @@ def create_specific_profile(sender, instance, created, **kwargs):
             CarrierProfile.objects.create(user_profile=instance)
         else:
             SenderProfile.objects.create(user_profile=instance)
+        # The profile above is needed by the very next request; the welcome
+        # message is not.
+        from .outbox import enqueue
+        enqueue('profile.created', {'user_profile': instance.pk})
 
 class Vehicle(models.Model):
     carrier = models.ForeignKey(CarrierProfile, on_delete=models.CASCADE)
@@ -86,6 +93,28 @@ class Journey(models.Model):
         default='SCHEDULED'
     )
 
+    class Meta:
+        # Each index serves query shapes listed in explain_queries.
+        indexes = [
+            models.Index(fields=['departure_date', 'id'], name='journey_date_keyset_idx'),
+            models.Index(fields=['price_per_kg', 'id'], name='journey_price_keyset_idx'),
+            # City filters compare UPPER(city) = UPPER(value).
+            models.Index(
+                Upper('departure_city'), Upper('arrival_city'), 'departure_date',
+                name='journey_route_idx'
+            ),
+            models.Index(Upper('arrival_city'), 'departure_date', name='journey_arrival_idx'),
+            models.Index(fields=['status', 'departure_date', 'id'], name='journey_status_date_idx'),
+            # Bookable journeys browsed by price; the other statuses are
+            # rarely sorted by price.
+            models.Index(
+                fields=['price_per_kg', 'id'],
+                condition=models.Q(status='SCHEDULED'),
+                name='journey_scheduled_price_idx'
+            ),
+            models.Index(fields=['carrier', 'departure_date', 'id'], name='journey_carrier_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.departure_city} → {self.arrival_city} ({self.departure_date})"
 
@@ -96,6 +125,9 @@ class StopPoint(models.Model):
     collection_date = models.DateTimeField()
     available_capacity = models.PositiveIntegerField()
 
+    class Meta:
+        ordering = ['collection_date', 'id']
+
     def __str__(self):
         return f"{self.city} - {self.collection_date}"
 
@@ -116,6 +148,21 @@ class Package(models.Model):
 
     sender = models.ForeignKey(SenderProfile, on_delete=models.CASCADE)
     journey = models.ForeignKey(Journey, on_delete=models.CASCADE)
+    # Boarding and drop-off stops; null means the journey's departure/arrival city.
+    origin_stop = models.ForeignKey(
+        StopPoint,
+        null=True,
+        blank=True,
+        on_delete=models.RESTRICT,
+        related_name='boarding_packages'
+    )
+    destination_stop = models.ForeignKey(
+        StopPoint,
+        null=True,
+        blank=True,
+        on_delete=models.RESTRICT,
+        related_name='alighting_packages'
+    )
     sender_id_card = models.CharField(max_length=50)
     sender_phone = models.CharField(max_length=20)
     recipient_phone = models.CharField(max_length=20)
@@ -137,6 +184,21 @@ class Package(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='package_created_keyset_idx'),
+            models.Index(fields=['weight', 'id'], name='package_weight_keyset_idx'),
+            models.Index(fields=['journey', 'status'], name='package_journey_status_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='package_status_created_idx'),
+            models.Index(fields=['sender', 'created_at', 'id'], name='package_sender_created_idx'),
+            # Covers the public tracking projection so lookups never read the row.
+            models.Index(
+                fields=['tracking_number', 'status', 'updated_at', 'journey',
+                        'origin_stop', 'destination_stop'],
+                name='package_tracking_cover_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"Package {self.tracking_number} - {self.sender.user_profile.user.get_full_name()}"
 
@@ -156,11 +218,368 @@ class Review(models.Model):
         on_delete=models.CASCADE,
         related_name='reviews_received'
     )
-    package = models.ForeignKey(Package, on_delete=models.CASCADE)
+    # Null once the package is archived; archived_package then points at it.
+    package = models.ForeignKey(Package, null=True, on_delete=models.CASCADE)
+    archived_package = models.ForeignKey(
+        'ArchivedPackage',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='reviews'
+    )
     rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
     comment = models.TextField()
     review_type = models.CharField(max_length=7, choices=REVIEW_TYPE_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='review_created_keyset_idx'),
+            models.Index(fields=['rating', 'id'], name='review_rating_keyset_idx'),
+            models.Index(
+                fields=['reviewed', 'created_at', 'id'],
+                name='review_reviewed_created_idx'
+            ),
+            models.Index(
+                fields=['reviewer', 'created_at', 'id'],
+                name='review_reviewer_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Review by {self.reviewer} for {self.reviewed}"
+
+class RouteSegment(models.Model):
+    """
+    One bookable origin -> destination pair of a scheduled journey, covering
+    the departure city, every stop point and the arrival city in order.
+    """
+    journey = models.ForeignKey(
+        Journey,
+        related_name='route_segments',
+        on_delete=models.CASCADE
+    )
+    # Copied from the journey's carrier so matchmaking scores segments
+    # without joins; kept in sync by routes.sync_carrier_features().
+    carrier = models.ForeignKey(
+        CarrierProfile,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    carrier_rating = models.DecimalField(max_digits=3, decimal_places=2, default=5.00)
+    carrier_verified = models.BooleanField(default=False)
+    origin_stop = models.ForeignKey(
+        StopPoint,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    destination_stop = models.ForeignKey(
+        StopPoint,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    origin_city = models.CharField(max_length=100)
+    destination_city = models.CharField(max_length=100)
+    origin_key = models.CharField(max_length=100)
+    destination_key = models.CharField(max_length=100)
+    departure_date = models.DateTimeField()
+    remaining_capacity = models.PositiveIntegerField()
+    price_per_kg = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['origin_key', 'destination_key', 'departure_date'],
+                name='route_segment_lookup_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_city} → {self.destination_city} ({self.departure_date})"
+
+class CounterShard(models.Model):
+    """
+    Buffered increments for a profile counter such as
+    CarrierProfile.total_deliveries, folded back by fold_counters.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    field = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model', 'object_id', 'field', 'shard'],
+                name='counter_shard_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}.{self.field}[{self.shard}] = {self.value}"
+
+class ChangeLogEntry(models.Model):
+    """
+    One create/update or delete of a synced row. The auto-incremented id is
+    the cursor of the delta sync feed.
+    """
+    ACTION_CHOICES = [
+        ('UPSERT', 'Created or updated'),
+        ('DELETE', 'Deleted'),
+        ('ARCHIVE', 'Moved to the archive'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    stream = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=7, choices=ACTION_CHOICES, default='UPSERT')
+    # Taken from the database clock so every worker agrees on the settle window.
+    created_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        indexes = [
+            # current_cursor() and purge_changes() select by age.
+            models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.stream}:{self.object_id}"
+
+class OutboxMessage(models.Model):
+    """
+    Follow-up work (notifications, counters, rating aggregates) written in
+    the same transaction as the state change that causes it and carried
+    out later by `manage.py run_outbox_worker`. Delivered messages are
+    deleted; FAILED ones are kept for inspection.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('FAILED', 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not claimable before this time: the retry backoff, or the lease of
+    # the worker that claimed it.
+    available_at = models.DateTimeField(db_default=Now())
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_claim_idx'),
+        ]
+
     def __str__(self):
-        return f"Review by {self.reviewer} for {self.reviewed}"
\ No newline at end of file
+        return f"#{self.id} {self.topic} ({self.status})"
+
+class ArchivedJourney(models.Model):
+    """
+    A completed or cancelled journey moved out of the live tables by
+    archive_terminal, keeping its id. ``data`` is the JourneySerializer
+    rendering at archive time, stop points included.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    carrier = models.ForeignKey(CarrierProfile, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20)
+    departure_city = models.CharField(max_length=100)
+    arrival_city = models.CharField(max_length=100)
+    departure_date = models.DateTimeField()
+    data = models.JSONField()
+    archived_at = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"{self.departure_city} → {self.arrival_city} ({self.departure_date}, archived)"
+
+class ArchivedPackage(models.Model):
+    """
+    A delivered or cancelled package moved out of the live tables by
+    archive_terminal, keeping its id and tracking number. ``data`` is the
+    PackageSerializer rendering at archive time.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    tracking_number = models.CharField(max_length=50, unique=True)
+    sender = models.ForeignKey(SenderProfile, on_delete=models.CASCADE, related_name='+')
+    # The journey may be live or archived.
+    journey_id = models.BigIntegerField(db_index=True)
+    status = models.CharField(max_length=10)
+    origin_city = models.CharField(max_length=100)
+    destination_city = models.CharField(max_length=100)
+    updated_at = models.DateTimeField()
+    data = models.JSONField()
+    archived_at = models.DateTimeField(db_default=Now())
+
+    def __str__(self):
+        return f"{self.tracking_number} ({self.status}, archived)"
+
+class IdempotencyKey(models.Model):
+    """
+    The response to a write sent with an ``Idempotency-Key`` header, replayed
+    when the same user sends the key again; see shipping/idempotency.py.
+    Purged after IDEMPOTENCY_KEY_TTL_HOURS by purge_idempotency_keys.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    # SHA-256 of the method, path and body the key was first used with.
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True)
+    response_headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_key_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} -> {self.response_status}"
+
+@receiver(post_save, sender=Journey)
+def reindex_journey_routes(sender, instance, **kwargs):
+    from .routes import schedule_reindex
+    schedule_reindex(instance.pk)
+
+@receiver(post_save, sender=StopPoint)
+@receiver(post_delete, sender=StopPoint)
+def reindex_stop_point_routes(sender, instance, **kwargs):
+    from .routes import schedule_reindex
+    schedule_reindex(instance.journey_id)
+
+@receiver(post_save, sender=Journey)
+@receiver(post_delete, sender=Journey)
+def invalidate_journey_cache(sender, instance, **kwargs):
+    from .caching import invalidate_journeys
+    invalidate_journeys([instance.pk])
+
+@receiver(post_save, sender=StopPoint)
+@receiver(post_delete, sender=StopPoint)
+def invalidate_stop_point_cache(sender, instance, **kwargs):
+    from .caching import invalidate_journeys
+    invalidate_journeys([instance.journey_id])
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def invalidate_vehicle_cache(sender, instance, **kwargs):
+    from .caching import invalidate_vehicles
+    invalidate_vehicles([instance.pk])
+
+@receiver(post_save, sender=CarrierProfile)
+@receiver(post_delete, sender=CarrierProfile)
+def invalidate_carrier_cache(sender, instance, **kwargs):
+    from .caching import invalidate_carriers
+    invalidate_carriers([instance.pk])
+
+@receiver(post_save, sender=User)
+def invalidate_user_carrier_cache(sender, instance, update_fields=None, **kwargs):
+    # Carrier and journey payloads embed the carrier's user fields; logins
+    # only touch last_login, which they do not.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    from .caching import invalidate_carriers
+    carrier_ids = list(
+        CarrierProfile.objects.filter(user_profile__user_id=instance.pk).values_list('pk', flat=True)
+    )
+    if carrier_ids:
+        invalidate_carriers(carrier_ids)
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_user_profile_carrier_cache(sender, instance, **kwargs):
+    # Their phone and profile image too; deletes cascade to CarrierProfile.
+    from .caching import invalidate_carriers
+    carrier_ids = list(
+        CarrierProfile.objects.filter(user_profile_id=instance.pk).values_list('pk', flat=True)
+    )
+    if carrier_ids:
+        invalidate_carriers(carrier_ids)
+
+@receiver(post_save, sender=CarrierProfile)
+def sync_carrier_route_features(sender, instance, created, **kwargs):
+    if not created:
+        from .routes import sync_carrier_features
+        sync_carrier_features([instance.pk])
+
+@receiver(post_save, sender='authtoken.Token')
+@receiver(post_delete, sender='authtoken.Token')
+def evict_cached_token(sender, instance, **kwargs):
+    from .authentication import evict_tokens
+    evict_tokens([instance.key])
+
+@receiver(post_save, sender=User)
+def evict_cached_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which cached entries do not hold.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    from .authentication import evict_user_tokens
+    evict_user_tokens([instance.pk])
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def evict_cached_profile_tokens(sender, instance, **kwargs):
+    from .authentication import evict_user_tokens
+    evict_user_tokens([instance.user_id])
+
+@receiver(post_save, sender=CarrierProfile)
+@receiver(post_save, sender=SenderProfile)
+@receiver(post_delete, sender=CarrierProfile)
+@receiver(post_delete, sender=SenderProfile)
+def evict_cached_specific_profile_tokens(sender, instance, created=True, **kwargs):
+    # Only creation and deletion change the cached profile ids.
+    if not created:
+        return
+    from .authentication import evict_user_tokens
+    evict_user_tokens(
+        UserProfile.objects.filter(pk=instance.user_profile_id).values_list('user_id', flat=True)
+    )
+
+@receiver(post_save, sender=Journey)
+@receiver(post_save, sender=StopPoint)
+@receiver(post_save, sender=Vehicle)
+@receiver(post_save, sender=Package)
+@receiver(post_save, sender=Review)
+def log_synced_save(sender, instance, **kwargs):
+    from .changes import record_changes
+    record_changes(sender, [instance.pk])
+
+@receiver(post_delete, sender=Journey)
+@receiver(post_delete, sender=StopPoint)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_delete, sender=Package)
+@receiver(post_delete, sender=Review)
+def log_synced_delete(sender, instance, **kwargs):
+    from .changes import record_deletes
+    record_deletes(sender, [instance.pk])
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    # Also runs for reviews deleted along with their package, journey or
+    # reviewer, so the rating aggregates never keep them.
+    from .ratings import remove_review
+    remove_review(instance)
+
+@receiver(post_save, sender=Package)
+def refresh_package_tracking(sender, instance, **kwargs):
+    from .tracking import refresh_tracking
+    refresh_tracking([instance.pk])
+
+@receiver(post_delete, sender=Package)
+def forget_package_tracking(sender, instance, **kwargs):
+    from .tracking import forget_tracking
+    forget_tracking([instance.tracking_number])
+
+@receiver(post_save, sender=Journey)
+@receiver(post_save, sender=StopPoint)
+def forget_journey_tracking(sender, instance, **kwargs):
+    # Route cities may have changed; entries refill on the next lookup.
+    from .tracking import forget_tracking
+    forget_tracking(journey_id=instance.pk if sender is Journey else instance.journey_id)
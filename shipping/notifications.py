@@ -0,0 +1,49 @@
+"""
+Text notifications to senders, recipients and new users.
+
+Messages go through the backend named by ``NOTIFICATION_BACKEND``; the
+default one only logs them on the 'shiplink.notifications' logger. Every
+message carries an idempotency key that stays the same when the outbox
+retries it, for gateways that drop duplicates.
+"""
+import logging
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('shiplink.notifications')
+
+STATUS_TEXT = {
+    'PENDING': 'Package {tracking_number} is booked and awaits the carrier\'s approval.',
+    'APPROVED': 'Package {tracking_number} was approved by the carrier.',
+    'IN_TRANSIT': 'Package {tracking_number} was picked up and is on its way.',
+    'DELIVERED': 'Package {tracking_number} was delivered.',
+    'CANCELLED': 'Package {tracking_number} was cancelled.',
+}
+
+WELCOME_TEXT = 'Welcome to ShipLink! Your {type} account is ready.'
+
+
+class LoggingBackend:
+    def send(self, phone, text, key):
+        logger.info('SMS to %s [%s]: %s', phone, key, text)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'NOTIFICATION_BACKEND', 'shipping.notifications.LoggingBackend')
+        _backend = import_string(path)()
+    return _backend
+
+
+def send(phone, text, key):
+    if phone:
+        get_backend().send(phone, text, key)
+
+
+def status_text(tracking_number, status):
+    return STATUS_TEXT[status].format(tracking_number=tracking_number)
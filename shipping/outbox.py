@@ -0,0 +1,207 @@
+"""
+Transactional outbox for the side effects of state changes.
+
+Code that changes state calls ``enqueue`` inside its own transaction, so a
+message exists exactly when the change committed, and returns without
+doing the follow-up work. ``run_outbox_worker`` claims messages in
+batches under a lease and hands each topic's batch to its handler.
+
+A batch is deleted in the transaction that applies its handler, and only
+while the worker still holds the lease, so database effects such as
+counter increments happen exactly once. Notifications leave the database
+and can be sent again if that transaction fails; they carry the message
+id as idempotency key. Failed messages are retried with exponential
+backoff and set aside as FAILED after OUTBOX_MAX_ATTEMPTS attempts.
+"""
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .counters import increment_many
+from .models import CarrierProfile, OutboxMessage, Package, SenderProfile, UserProfile
+from .notifications import WELCOME_TEXT, send, status_text
+from .ratings import apply_delta
+
+HANDLERS = {}
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def handles(topic):
+    def register(handler):
+        HANDLERS[topic] = handler
+        return handler
+    return register
+
+
+def enqueue(topic, payload):
+    enqueue_many(topic, [payload])
+
+
+def enqueue_many(topic, payloads):
+    if topic not in HANDLERS:
+        raise ValueError(f'No outbox handler for {topic!r}')
+    OutboxMessage.objects.bulk_create([
+        OutboxMessage(topic=topic, payload=payload) for payload in payloads
+    ])
+
+
+def claim(batch_size, lease_seconds=None):
+    """Lease up to ``batch_size`` due messages; returns ``(token, messages)``."""
+    if lease_seconds is None:
+        lease_seconds = getattr(settings, 'OUTBOX_LEASE_SECONDS', 60)
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    due = OutboxMessage.objects.filter(status='PENDING', available_at__lte=now).order_by('id')
+    lease = {
+        'claimed_by': token,
+        'available_at': now + timedelta(seconds=lease_seconds),
+        'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size])
+            if ids:
+                due.filter(pk__in=ids).update(**lease)
+    else:
+        # Without row locks, the availability check in the UPDATE decides
+        # which of several workers reading the same ids gets each message.
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        if ids:
+            due.filter(pk__in=ids).update(**lease)
+    if not ids:
+        return token, []
+    return token, list(OutboxMessage.objects.filter(claimed_by=token).order_by('id'))
+
+
+def _handle(token, topic, messages):
+    with transaction.atomic():
+        handler = HANDLERS.get(topic)
+        if handler is None:
+            raise LookupError(f'No outbox handler for {topic!r}')
+        handler(messages)
+        deleted, _ = OutboxMessage.objects.filter(
+            pk__in=[message.pk for message in messages],
+            claimed_by=token
+        ).delete()
+        if deleted != len(messages):
+            raise LeaseLost(topic)
+
+
+def _fail(token, message, error):
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+    update = {'last_error': f'{type(error).__name__}: {error}'[:2000], 'claimed_by': ''}
+    if message.attempts >= max_attempts:
+        update['status'] = 'FAILED'
+    else:
+        backoff = min(2 ** message.attempts, 3600)
+        update['available_at'] = timezone.now() + timedelta(seconds=backoff)
+    OutboxMessage.objects.filter(pk=message.pk, claimed_by=token).update(**update)
+    return update.get('status', 'RETRY')
+
+
+def process(token, messages):
+    """Handle claimed messages topic by topic; returns counts per outcome."""
+    outcomes = Counter()
+    by_topic = defaultdict(list)
+    for message in messages:
+        by_topic[message.topic].append(message)
+
+    for topic, batch in by_topic.items():
+        try:
+            _handle(token, topic, batch)
+            outcomes['DONE'] += len(batch)
+            continue
+        except LeaseLost:
+            outcomes['LEASE_LOST'] += len(batch)
+            continue
+        except Exception as exc:
+            if len(batch) == 1:
+                outcomes[_fail(token, batch[0], exc)] += 1
+                continue
+        # One bad message must not hold back the rest of its batch.
+        for message in batch:
+            try:
+                _handle(token, topic, [message])
+                outcomes['DONE'] += 1
+            except LeaseLost:
+                outcomes['LEASE_LOST'] += 1
+            except Exception as exc:
+                outcomes[_fail(token, message, exc)] += 1
+    return outcomes
+
+
+def drain_batches(batch_size):
+    """Claim and process batches until none is due; runs on a worker thread."""
+    outcomes = Counter()
+    try:
+        while True:
+            token, messages = claim(batch_size)
+            if not messages:
+                return outcomes
+            outcomes.update(process(token, messages))
+    finally:
+        connection.close()
+
+
+def drain(threads=4, batch_size=100):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(drain_batches, [batch_size] * threads))
+    return sum(results, Counter())
+
+
+@handles('package.status')
+def notify_status_changes(messages):
+    packages = {
+        row['id']: row
+        for row in Package.objects.filter(
+            pk__in={message.payload['package'] for message in messages}
+        ).values('id', 'tracking_number', 'sender_phone', 'recipient_phone')
+    }
+    for message in messages:
+        row = packages.get(message.payload['package'])
+        if row is None:
+            continue
+        text = status_text(row['tracking_number'], message.payload['status'])
+        for phone in {row['sender_phone'], row['recipient_phone']}:
+            send(phone, text, f'outbox-{message.pk}-{phone}')
+
+
+@handles('profile.deliveries')
+def count_deliveries(messages):
+    senders, carriers = Counter(), Counter()
+    for message in messages:
+        senders.update(message.payload['senders'])
+        carriers[message.payload['carrier']] += len(message.payload['senders'])
+    increment_many(SenderProfile, 'total_packages', senders)
+    increment_many(CarrierProfile, 'total_deliveries', carriers)
+
+
+@handles('profile.ratings')
+def apply_rating_deltas(messages):
+    deltas = defaultdict(lambda: [0, 0])
+    for message in messages:
+        delta = deltas[message.payload['review_type'], message.payload['reviewed']]
+        delta[0] += message.payload['rating_sum']
+        delta[1] += message.payload['review_count']
+    for (review_type, user_profile_id), (sum_delta, count_delta) in deltas.items():
+        if sum_delta or count_delta:
+            apply_delta(review_type, user_profile_id, sum_delta, count_delta)
+
+
+@handles('profile.created')
+def welcome_new_users(messages):
+    profiles = UserProfile.objects.filter(
+        pk__in=[message.payload['user_profile'] for message in messages]
+    ).values_list('id', 'phone', 'type')
+    pks = {message.payload['user_profile']: message.pk for message in messages}
+    for profile_id, phone, profile_type in profiles:
+        send(phone, WELCOME_TEXT.format(type=profile_type.lower()), f'outbox-{pks[profile_id]}-{phone}')
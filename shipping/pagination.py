@@ -0,0 +1,128 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def resolve_model_field(model, path):
+    parts = path.split('__')
+    for part in parts[:-1]:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(parts[-1])
+
+
+def get_row_value(row, path):
+    if isinstance(row, dict):
+        return row[path]
+    for attr in path.split('__'):
+        row = getattr(row, attr)
+    return row
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (ordering field, id).
+
+    The first field of the requested ``ordering`` (restricted to the view's
+    ``ordering_fields``, falling back to ``view.ordering``) is paired with the
+    primary key as a tie-breaker, and each page starts strictly after the last
+    row of the previous one, so deep pages cost the same as the first.
+    The total count costs a scan of the whole filtered set and is only
+    returned with ``count=true``.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering_param = api_settings.ORDERING_PARAM
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, view):
+        requested = request.query_params.get(self.ordering_param)
+        if requested:
+            first = requested.split(',')[0].strip()
+            if first.lstrip('-') in getattr(view, 'ordering_fields', []):
+                return first
+
+        default = getattr(view, 'ordering', None) or ['-id']
+        if isinstance(default, str):
+            default = [default]
+        return default[0]
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('true', '1')
+
+    def encode_cursor(self, row):
+        value = get_row_value(row, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif value is not None:
+            value = str(value)
+        payload = json.dumps([self.ordering, value, get_row_value(row, 'id')])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            ordering, value, pk = json.loads(base64.urlsafe_b64decode(padded))
+            if ordering != self.ordering:
+                raise ValueError
+            return resolve_model_field(model, self.field).to_python(value), int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request, view)
+        self.field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+
+        queryset = queryset.order_by(self.ordering, '-id' if descending else 'id')
+        self.count = queryset.count() if self.include_count(request) else None
+
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            value, pk = cursor
+            after = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{after}': value}) |
+                Q(**{self.field: value, f'id__{after}': pk})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
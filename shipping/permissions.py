@@ -1,35 +1,97 @@
+from collections import namedtuple
+
 from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+from .models import UserProfile, CarrierProfile, SenderProfile, Vehicle, Journey, Package, Review
+
+RequestIdentity = namedtuple('RequestIdentity', ['profile_id', 'type', 'carrier_id', 'sender_id'])
+ANONYMOUS = RequestIdentity(None, None, None, None)
+
+# Model -> (field holding the owner's id, matching RequestIdentity attribute)
+OWNER_FIELDS = {
+    UserProfile: ('id', 'profile_id'),
+    CarrierProfile: ('id', 'carrier_id'),
+    SenderProfile: ('id', 'sender_id'),
+    Vehicle: ('carrier_id', 'carrier_id'),
+    Journey: ('carrier_id', 'carrier_id'),
+    Package: ('sender_id', 'sender_id'),
+    Review: ('reviewer_id', 'profile_id'),
+}
+
+def get_request_identity(request):
+    """
+    Profile ids of the requesting user, resolved with one query and cached
+    on the user object for the rest of the request.
+    """
+    user = request.user
+    if not user or not user.is_authenticated:
+        return ANONYMOUS
+
+    identity = getattr(user, '_shipping_identity', None)
+    if identity is None:
+        row = UserProfile.objects.filter(user_id=user.pk).values_list(
+            'id', 'type', 'carrierprofile__id', 'senderprofile__id'
+        ).first()
+        identity = RequestIdentity(*row) if row else ANONYMOUS
+        user._shipping_identity = identity
+    return identity
+
+def get_owner_lookup(model, identity):
+    """Return ``(field, id)`` identifying the rows of ``model`` owned by ``identity``."""
+    field, attr = OWNER_FIELDS[model]
+    return field, getattr(identity, attr)
+
+def scope_packages(queryset, request):
+    """
+    Packages a user may bulk-read: staff everything, carriers the packages on
+    their journeys, senders their own.
+    """
+    if request.user.is_staff:
+        return queryset
+    identity = get_request_identity(request)
+    if identity.carrier_id is not None:
+        return queryset.filter(journey__carrier_id=identity.carrier_id)
+    if identity.sender_id is not None:
+        return queryset.filter(sender_id=identity.sender_id)
+    return queryset.none()
+
+def require_carrier_id(request):
+    carrier_id = get_request_identity(request).carrier_id
+    if carrier_id is None:
+        raise NotFound('No carrier profile for this user')
+    return carrier_id
+
+def require_sender_id(request):
+    sender_id = get_request_identity(request).sender_id
+    if sender_id is None:
+        raise NotFound('No sender profile for this user')
+    return sender_id
+
+def is_owner(request, obj):
+    """Whether the requesting user owns ``obj``, compared by foreign key."""
+    if type(obj) not in OWNER_FIELDS:
+        return False
+    field, owner_id = get_owner_lookup(type(obj), get_request_identity(request))
+    return owner_id is not None and getattr(obj, field) == owner_id
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        
-        # Check if the object has a user_profile attribute
-        if hasattr(obj, 'user_profile'):
-            return obj.user_profile.user == request.user
-        
-        # Check if the object has a carrier attribute
-        elif hasattr(obj, 'carrier'):
-            return obj.carrier.user_profile.user == request.user
-        
-        # Check if the object has a sender attribute
-        elif hasattr(obj, 'sender'):
-            return obj.sender.user_profile.user == request.user
-        
-        # Check if the object is a review
-        elif hasattr(obj, 'reviewer'):
-            return obj.reviewer.user == request.user
-        
-        return False
+
+        return is_owner(request, obj)
 
 class IsCarrierOrReadOnly(permissions.BasePermission):
+    """Carriers create vehicles and journeys and change only their own."""
+
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
-        
-        return (
-            request.user.is_authenticated and
-            hasattr(request.user, 'userprofile') and
-            request.user.userprofile.type == 'CARRIER'
-        )
\ No newline at end of file
+
+        return get_request_identity(request).type == 'CARRIER'
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+
+        return is_owner(request, obj)
@@ -0,0 +1,197 @@
+"""
+Price quotes from the carriers' rate rules.
+
+A carrier's ``special_rates`` and ``preferred_routes`` are compiled into a
+RateCard held in process memory. Cards are checked against the carrier's
+response cache version ('carrier:<id>'), which is bumped whenever the
+profile is saved, so every process recompiles a card the first time it is
+used after a save. ``special_rates`` understands:
+
+    {
+        "weight_brackets": [{"min_weight": 50, "multiplier": 0.9}, ...],
+        "sizes": {"LARGE": 15},              # flat surcharge per package
+        "routes": {"Paris - Tunis": 3.5},    # price per kg on that route
+        "preferred_route_multiplier": 0.95,  # on preferred_routes
+        "minimum_charge": 25,
+        "Electronics": 2.0                   # any other number: a multiplier
+    }                                        # for that kind of contents
+
+Malformed entries are ignored. Quoting a batch of route segments resolves
+the per-carrier factors for the requested weight and size once, then
+prices every segment with a dictionary lookup and a multiplication.
+"""
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from .caching import get_versions
+from .models import CarrierProfile
+from .routes import normalize_city
+
+CENT = Decimal('0.01')
+ONE = Decimal(1)
+ZERO = Decimal(0)
+
+RateCard = namedtuple('RateCard', [
+    'bracket_weights', 'bracket_multipliers', 'sizes', 'routes',
+    'preferred_routes', 'preferred_multiplier', 'categories', 'minimum_charge'
+])
+
+# 'Paris - Tunis', 'Paris -> Tunis', 'Paris → Tunis'; a bare hyphen is part
+# of names such as Aix-en-Provence.
+ROUTE_SEPARATOR = re.compile(r'\s+-\s+|\s*->\s*|\s*→\s*')
+STRUCTURED_KEYS = {
+    'weight_brackets', 'sizes', 'routes', 'preferred_route_multiplier', 'minimum_charge'
+}
+
+
+def _decimal(value, default=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return default
+    try:
+        value = Decimal(str(value))
+    except InvalidOperation:
+        return default
+    return value if value.is_finite() and value >= 0 else default
+
+
+def _category_key(name):
+    return ' '.join(str(name).split()).casefold()
+
+
+def parse_route(route):
+    if not isinstance(route, str):
+        return None
+    cities = ROUTE_SEPARATOR.split(route.strip())
+    if len(cities) != 2 or not all(cities):
+        return None
+    return normalize_city(cities[0]), normalize_city(cities[1])
+
+
+def compile_rate_card(special_rates, preferred_routes):
+    rates = special_rates if isinstance(special_rates, dict) else {}
+
+    brackets = []
+    for bracket in rates.get('weight_brackets') or []:
+        if isinstance(bracket, dict):
+            min_weight = _decimal(bracket.get('min_weight'))
+            multiplier = _decimal(bracket.get('multiplier'))
+            if min_weight is not None and multiplier is not None:
+                brackets.append((min_weight, multiplier))
+    brackets.sort()
+
+    sizes = rates.get('sizes') if isinstance(rates.get('sizes'), dict) else {}
+    sizes = {
+        str(size).upper(): surcharge
+        for size, surcharge in ((size, _decimal(value)) for size, value in sizes.items())
+        if surcharge is not None
+    }
+
+    routes = {}
+    route_rates = rates.get('routes') if isinstance(rates.get('routes'), dict) else {}
+    for route, value in route_rates.items():
+        key, price_per_kg = parse_route(route), _decimal(value)
+        if key is not None and price_per_kg is not None:
+            routes[key] = price_per_kg
+
+    categories = {
+        _category_key(name): multiplier
+        for name, multiplier in ((name, _decimal(value)) for name, value in rates.items())
+        if name not in STRUCTURED_KEYS and multiplier is not None
+    }
+
+    return RateCard(
+        bracket_weights=[min_weight for min_weight, _ in brackets],
+        bracket_multipliers=[multiplier for _, multiplier in brackets],
+        sizes=sizes,
+        routes=routes,
+        preferred_routes={
+            key for key in map(parse_route, preferred_routes or []) if key is not None
+        },
+        preferred_multiplier=_decimal(rates.get('preferred_route_multiplier'), ONE),
+        categories=categories,
+        minimum_charge=_decimal(rates.get('minimum_charge'), ZERO),
+    )
+
+
+# carrier id -> (cache version, RateCard)
+_cards = {}
+_MAX_CARDS = 10000
+
+
+def get_rate_cards(carrier_ids):
+    carrier_ids = list(carrier_ids)
+    versions = dict(zip(
+        carrier_ids,
+        get_versions([f'carrier:{carrier_id}' for carrier_id in carrier_ids])
+    ))
+    stale = [
+        carrier_id for carrier_id in carrier_ids
+        if _cards.get(carrier_id, (None,))[0] != versions[carrier_id]
+    ]
+    if stale:
+        if len(_cards) + len(stale) > _MAX_CARDS:
+            _cards.clear()
+        rows = CarrierProfile.objects.filter(pk__in=stale).values_list(
+            'id', 'special_rates', 'preferred_routes'
+        )
+        for carrier_id, special_rates, preferred_routes in rows:
+            _cards[carrier_id] = (
+                versions[carrier_id],
+                compile_rate_card(special_rates, preferred_routes)
+            )
+    return {
+        carrier_id: _cards[carrier_id][1]
+        for carrier_id in carrier_ids if carrier_id in _cards
+    }
+
+
+def carrier_factors(card, weight, size, categories):
+    """
+    ``(billable weight, surcharge)`` of a package on every route of the
+    carrier: the weight scaled by the bracket and contents multipliers, and
+    the size surcharge.
+    """
+    multiplier = ONE
+    index = bisect_right(card.bracket_weights, weight)
+    if index:
+        multiplier = card.bracket_multipliers[index - 1]
+    category_multipliers = [
+        card.categories[category] for category in categories if category in card.categories
+    ]
+    if category_multipliers:
+        multiplier *= max(category_multipliers)
+    return weight * multiplier, card.sizes.get(size, ZERO)
+
+
+def quote_segments(segments, weight, size, categories=()):
+    """
+    Price ``segments``, tuples starting with ``(carrier_id, origin_key,
+    destination_key, price_per_kg)``, for one package. Returns a list of
+    ``(total, price_per_kg, segment)`` in input order; segments of unknown
+    carriers are dropped.
+    """
+    categories = [_category_key(category) for category in categories]
+    cards = get_rate_cards({segment[0] for segment in segments})
+    factors = {
+        carrier_id: carrier_factors(card, weight, size, categories)
+        for carrier_id, card in cards.items()
+    }
+
+    quotes = []
+    for segment in segments:
+        carrier_id, origin_key, destination_key, price_per_kg = segment[:4]
+        card = cards.get(carrier_id)
+        if card is None:
+            continue
+        route = (origin_key, destination_key)
+        rate = card.routes.get(route)
+        if rate is None:
+            rate = price_per_kg
+            if route in card.preferred_routes:
+                rate *= card.preferred_multiplier
+        weight_factor, surcharge = factors[carrier_id]
+        total = max(rate * weight_factor + surcharge, card.minimum_charge)
+        quotes.append((total.quantize(CENT), rate.quantize(CENT), segment))
+    return quotes
@@ -0,0 +1,142 @@
+"""
+Rating aggregates for carrier and sender profiles.
+
+Each profile keeps ``rating_sum`` and ``review_count`` next to the displayed
+``rating``, so reads never touch the Review table. Review writes enqueue
+a 'profile.ratings' outbox message carrying their ``rating_sum`` and
+``review_count`` deltas, and the worker applies them with a single
+F()-based UPDATE per profile, independent of how many reviews the profile
+has. The outbox applies a batch exactly once, in the transaction that
+deletes it, so deltas are never lost or counted twice. rebuild_ratings
+recomputes the aggregates from the Review table, to repair drift only.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .caching import invalidate_instances
+from .models import CarrierProfile, SenderProfile, Review
+from .routes import sync_carrier_features
+
+DEFAULT_RATING = Decimal('5.00')
+
+PROFILE_MODELS = {
+    'CARRIER': CarrierProfile,
+    'SENDER': SenderProfile,
+}
+
+
+def compute_rating(rating_sum, review_count):
+    if not review_count:
+        return DEFAULT_RATING
+    return (Decimal(rating_sum) / review_count).quantize(Decimal('0.01'))
+
+
+def apply_delta(review_type, user_profile_id, sum_delta, count_delta):
+    model = PROFILE_MODELS[review_type]
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('review_count') + count_delta
+    profiles = model.objects.filter(user_profile_id=user_profile_id)
+    profiles.update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        rating=Case(
+            When(review_count__lte=-count_delta, then=Value(DEFAULT_RATING)),
+            default=Cast(
+                Cast(new_sum, FloatField()) / Cast(new_count, FloatField()),
+                DecimalField(max_digits=3, decimal_places=2)
+            ),
+            output_field=DecimalField(max_digits=3, decimal_places=2)
+        )
+    )
+    pks = list(profiles.values_list('pk', flat=True))
+    invalidate_instances(model, pks)
+    if model is CarrierProfile:
+        sync_carrier_features(pks)
+
+
+def _enqueue_delta(review, sum_delta, count_delta):
+    from .outbox import enqueue
+    enqueue('profile.ratings', {
+        'review_type': review.review_type,
+        'reviewed': review.reviewed_id,
+        'rating_sum': sum_delta,
+        'review_count': count_delta,
+    })
+
+
+def record_review(review):
+    """Call in the transaction that creates ``review``."""
+    _enqueue_delta(review, review.rating, 1)
+
+
+def change_review_rating(review, old_rating):
+    """Call in the transaction that saves ``review``."""
+    if review.rating != old_rating:
+        _enqueue_delta(review, review.rating - old_rating, 0)
+
+
+def remove_review(review):
+    """Run by Review's post_delete receiver, for cascaded deletes too."""
+    _enqueue_delta(review, -review.rating, -1)
+
+
+def find_drift(review_type, lock=False, user_profile_ids=None):
+    """
+    Return ``(profile, expected_sum, expected_count)`` for every profile whose
+    stored aggregates differ from the Review table.
+    """
+    profiles = PROFILE_MODELS[review_type].objects.only(
+        'id', 'user_profile_id', 'rating', 'rating_sum', 'review_count'
+    )
+    reviews = Review.objects.filter(review_type=review_type)
+    if user_profile_ids is not None:
+        profiles = profiles.filter(user_profile_id__in=user_profile_ids)
+        reviews = reviews.filter(reviewed_id__in=user_profile_ids)
+    if lock:
+        # Lock profiles before summing reviews: a concurrent review either
+        # committed already and is counted, or is recounted after us.
+        profiles = profiles.select_for_update()
+    profiles = list(profiles)
+
+    totals = {
+        row['reviewed_id']: (row['total'], row['count'])
+        for row in reviews.values('reviewed_id')
+        .annotate(total=Sum('rating'), count=Count('id'))
+    }
+
+    drifted = []
+    for profile in profiles:
+        expected_sum, expected_count = totals.get(profile.user_profile_id, (0, 0))
+        if (profile.rating_sum != expected_sum or
+                profile.review_count != expected_count or
+                profile.rating != compute_rating(expected_sum, expected_count)):
+            drifted.append((profile, expected_sum, expected_count))
+    return drifted
+
+
+def rebuild_ratings(review_type, fix=True, user_profile_ids=None):
+    with transaction.atomic():
+        drifted = find_drift(review_type, lock=fix, user_profile_ids=user_profile_ids)
+        if fix:
+            model = PROFILE_MODELS[review_type]
+            model.objects.bulk_update(
+                [
+                    model(
+                        pk=profile.pk,
+                        rating_sum=expected_sum,
+                        review_count=expected_count,
+                        rating=compute_rating(expected_sum, expected_count)
+                    )
+                    for profile, expected_sum, expected_count in drifted
+                ],
+                ['rating_sum', 'review_count', 'rating'],
+                batch_size=500
+            )
+            pks = [profile.pk for profile, _, _ in drifted]
+            invalidate_instances(model, pks)
+            if model is CarrierProfile:
+                sync_carrier_features(pks)
+    return drifted
@@ -0,0 +1,318 @@
+"""
+Capacity reservations along the legs of a journey.
+
+A journey with stop points s1..sn is travelled in legs: the first leg leaves
+the departure city and its remaining capacity is ``Journey.available_capacity``;
+every following leg leaves a stop point and its remaining capacity is that
+``StopPoint.available_capacity``. A package occupies each leg between its
+boarding and drop-off points, and reserving it decrements all of them with
+conditional UPDATEs so concurrent bookings can never overbook a leg.
+"""
+from collections import defaultdict
+from math import ceil
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import Journey, StopPoint, Package
+from .caching import invalidate_journey_capacity
+from .changes import record_changes
+from .routes import schedule_reindex, schedule_reindex_many
+from .tracking import refresh_tracking
+
+
+class ReservationError(Exception):
+    pass
+
+
+def reserved_weight(weight):
+    # Capacities are tracked in whole kilograms; a started kilo takes a full one.
+    return ceil(weight)
+
+
+def _pk(value):
+    return getattr(value, 'pk', value)
+
+
+def leg_span(stops, origin_id, destination_id):
+    """
+    Return ``(start, end)``: the package travels legs ``start`` to ``end - 1``,
+    leg 0 leaving the departure city and leg i the i-th of ``stops``.
+    """
+    for stop_id in (origin_id, destination_id):
+        if stop_id is not None and stop_id not in stops:
+            raise ReservationError('Stop point does not belong to this journey')
+
+    start = 0 if origin_id is None else stops.index(origin_id) + 1
+    end = len(stops) + 1 if destination_id is None else stops.index(destination_id) + 1
+    if start >= end:
+        raise ReservationError('Destination stop must come after the origin stop')
+    return start, end
+
+
+def _slice_legs(stops, origin_id, destination_id):
+    start, end = leg_span(stops, origin_id, destination_id)
+    return start == 0, stops[max(start, 1) - 1:end - 1]
+
+
+def get_legs(journey_id, origin_stop=None, destination_stop=None):
+    """
+    Return ``(uses_departure_leg, stop_ids)`` for the legs travelled between
+    ``origin_stop`` and ``destination_stop`` (None meaning the journey's
+    departure and arrival cities).
+    """
+    stops = list(
+        StopPoint.objects.filter(journey_id=journey_id).values_list('id', flat=True)
+    )
+    return _slice_legs(stops, _pk(origin_stop), _pk(destination_stop))
+
+
+def reserve_capacity(journey_id, weight, origin_stop=None, destination_stop=None):
+    amount = reserved_weight(weight)
+    uses_departure_leg, stop_ids = get_legs(journey_id, origin_stop, destination_stop)
+
+    with transaction.atomic():
+        if uses_departure_leg:
+            updated = Journey.objects.filter(
+                pk=journey_id,
+                available_capacity__gte=amount
+            ).update(available_capacity=F('available_capacity') - amount)
+            if not updated:
+                raise ReservationError('Package weight exceeds available capacity')
+
+        if stop_ids:
+            updated = StopPoint.objects.filter(
+                pk__in=stop_ids,
+                available_capacity__gte=amount
+            ).update(available_capacity=F('available_capacity') - amount)
+            if updated != len(stop_ids):
+                raise ReservationError('Package weight exceeds available capacity')
+
+        _log_capacity_changes([journey_id] if uses_departure_leg else [], stop_ids)
+
+    schedule_reindex(journey_id)
+    invalidate_journey_capacity([journey_id])
+
+
+def reserve_many(bookings):
+    """
+    Reserve a batch of ``(journey_id, weight, origin_stop, destination_stop)``
+    bookings. Journeys and their stop points are locked once, bookings are
+    accepted in order while their journey is still scheduled and every leg
+    they travel has room, and the accepted weight is applied with one UPDATE
+    for journeys and one for stop points. Returns one error message per
+    booking, None when it was reserved.
+    """
+    journey_ids = {journey_id for journey_id, _, _, _ in bookings}
+    errors = []
+
+    with transaction.atomic():
+        journey_capacity, journey_status = {}, {}
+        journey_rows = (
+            Journey.objects.select_for_update()
+            .filter(pk__in=journey_ids)
+            .values_list('id', 'available_capacity', 'status')
+        )
+        for journey_id, capacity, journey_state in journey_rows:
+            journey_capacity[journey_id] = capacity
+            journey_status[journey_id] = journey_state
+        stops, stop_capacity = defaultdict(list), {}
+        stop_rows = (
+            StopPoint.objects.select_for_update()
+            .filter(journey_id__in=journey_ids)
+            .order_by('collection_date', 'id')
+            .values_list('journey_id', 'id', 'available_capacity')
+        )
+        for journey_id, stop_id, capacity in stop_rows:
+            stops[journey_id].append(stop_id)
+            stop_capacity[stop_id] = capacity
+
+        journey_taken, stop_taken = defaultdict(int), defaultdict(int)
+        for journey_id, weight, origin_stop, destination_stop in bookings:
+            if journey_id not in journey_capacity:
+                errors.append('Journey not found')
+                continue
+            if journey_status[journey_id] != 'SCHEDULED':
+                errors.append('Journey is not open for booking')
+                continue
+            try:
+                uses_departure_leg, stop_ids = _slice_legs(
+                    stops[journey_id], _pk(origin_stop), _pk(destination_stop)
+                )
+            except ReservationError as exc:
+                errors.append(str(exc))
+                continue
+
+            amount = reserved_weight(weight)
+            fits = all(
+                stop_capacity[stop_id] - stop_taken[stop_id] >= amount
+                for stop_id in stop_ids
+            )
+            if uses_departure_leg:
+                fits = fits and journey_capacity[journey_id] - journey_taken[journey_id] >= amount
+            if not fits:
+                errors.append('Package weight exceeds available capacity')
+                continue
+
+            if uses_departure_leg:
+                journey_taken[journey_id] += amount
+            for stop_id in stop_ids:
+                stop_taken[stop_id] += amount
+            errors.append(None)
+
+        _add(Journey, journey_taken, -1)
+        _add(StopPoint, stop_taken, -1)
+        _log_capacity_changes(journey_taken, stop_taken)
+
+    schedule_reindex_many(journey_ids & set(journey_capacity))
+    invalidate_journey_capacity(journey_ids & set(journey_capacity))
+    return errors
+
+
+def release_many(packages):
+    """
+    Give back the capacity of several packages with one UPDATE for journeys
+    and one for stop points. The caller must already have moved them out of
+    their reserving status.
+    """
+    journey_ids = {package.journey_id for package in packages}
+    stops = defaultdict(list)
+    stop_rows = (
+        StopPoint.objects.filter(journey_id__in=journey_ids)
+        .order_by('collection_date', 'id')
+        .values_list('journey_id', 'id')
+    )
+    for journey_id, stop_id in stop_rows:
+        stops[journey_id].append(stop_id)
+
+    journey_freed, stop_freed = defaultdict(int), defaultdict(int)
+    for package in packages:
+        uses_departure_leg, stop_ids = _slice_legs(
+            stops[package.journey_id], package.origin_stop_id, package.destination_stop_id
+        )
+        amount = reserved_weight(package.weight)
+        if uses_departure_leg:
+            journey_freed[package.journey_id] += amount
+        for stop_id in stop_ids:
+            stop_freed[stop_id] += amount
+
+    with transaction.atomic():
+        _add(Journey, journey_freed, 1)
+        _add(StopPoint, stop_freed, 1)
+        _log_capacity_changes(journey_freed, stop_freed)
+
+    schedule_reindex_many(journey_ids)
+    invalidate_journey_capacity(journey_ids)
+
+
+def _log_capacity_changes(journey_ids, stop_ids):
+    record_changes(Journey, journey_ids)
+    record_changes(StopPoint, stop_ids)
+
+
+def _add(model, amounts, sign):
+    if amounts:
+        model.objects.filter(pk__in=amounts).update(
+            available_capacity=F('available_capacity') + sign * Case(
+                *[When(pk=pk, then=Value(amount)) for pk, amount in amounts.items()]
+            )
+        )
+
+
+def release_capacity(journey_id, weight, origin_stop=None, destination_stop=None):
+    amount = reserved_weight(weight)
+    uses_departure_leg, stop_ids = get_legs(journey_id, origin_stop, destination_stop)
+
+    with transaction.atomic():
+        if uses_departure_leg:
+            Journey.objects.filter(pk=journey_id).update(
+                available_capacity=F('available_capacity') + amount
+            )
+        if stop_ids:
+            StopPoint.objects.filter(pk__in=stop_ids).update(
+                available_capacity=F('available_capacity') + amount
+            )
+        _log_capacity_changes([journey_id] if uses_departure_leg else [], stop_ids)
+
+    schedule_reindex(journey_id)
+    invalidate_journey_capacity([journey_id])
+
+
+def _lock_reservation(package_id):
+    """
+    Lock the package row and return ``(status, journey_id, weight,
+    origin_stop_id, destination_stop_id)``, or None if it is gone. Reading
+    them under the lock releases exactly what is held, even when another
+    request changed the weight or stops in between.
+    """
+    return (
+        Package.objects.select_for_update()
+        .filter(pk=package_id)
+        .values_list('status', 'journey_id', 'weight', 'origin_stop_id', 'destination_stop_id')
+        .first()
+    )
+
+
+def cancel_package(package):
+    """
+    Cancel a package and give its weight back to the legs it reserved.
+    Returns False if the package was already cancelled.
+    """
+    with transaction.atomic():
+        held = _lock_reservation(package.pk)
+        cancelled = held is not None and held[0] != 'CANCELLED'
+        if cancelled:
+            Package.objects.filter(pk=package.pk).update(status='CANCELLED', updated_at=timezone.now())
+            record_changes(Package, [package.pk])
+            refresh_tracking([package.pk])
+            release_capacity(*held[1:])
+    package.status = 'CANCELLED'
+    return cancelled
+
+
+def restore_package(package, new_status):
+    """Move a cancelled package back to ``new_status``, reserving its legs again."""
+    with transaction.atomic():
+        held = _lock_reservation(package.pk)
+        restored = held is not None and held[0] == 'CANCELLED'
+        if restored:
+            Package.objects.filter(pk=package.pk).update(status=new_status, updated_at=timezone.now())
+            record_changes(Package, [package.pk])
+            refresh_tracking([package.pk])
+            reserve_capacity(*held[1:])
+    package.status = new_status
+    return restored
+
+
+def change_reservation(package, weight, origin_stop=None, destination_stop=None):
+    """
+    Move the reservation of ``package`` to a new weight and boarding and
+    drop-off stops: the legs it held are released and the new ones reserved
+    in one transaction, so a change that does not fit leaves the old
+    reservation in place and raises ReservationError. A cancelled package
+    holds nothing; its new stops are only checked against the journey.
+    """
+    origin_id, destination_id = _pk(origin_stop), _pk(destination_stop)
+    with transaction.atomic():
+        held = _lock_reservation(package.pk)
+        if held is None:
+            return
+        status, journey_id, held_weight, held_origin, held_destination = held
+        if status == 'CANCELLED':
+            get_legs(journey_id, origin_id, destination_id)
+            return
+        if (reserved_weight(held_weight), held_origin, held_destination) == (
+                reserved_weight(weight), origin_id, destination_id):
+            return
+        release_capacity(journey_id, held_weight, held_origin, held_destination)
+        reserve_capacity(journey_id, weight, origin_id, destination_id)
+
+
+def delete_package(package):
+    """Delete a package, giving back the capacity it holds unless it was cancelled."""
+    with transaction.atomic():
+        held = _lock_reservation(package.pk)
+        if held is not None and held[0] != 'CANCELLED':
+            release_capacity(*held[1:])
+        package.delete()
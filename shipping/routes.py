@@ -0,0 +1,104 @@
+"""
+Precomputed route index over scheduled journeys.
+
+Every scheduled journey is expanded into one RouteSegment per ordered pair of
+its points (departure city, stop points, arrival city), carrying the date the
+package is collected at the origin, the capacity left on all legs in between
+and the journey's price, along with the carrier's rating and verified flag
+used to rank matches. Searches are then a single range scan on
+(origin_key, destination_key, departure_date).
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import CarrierProfile, Journey, RouteSegment
+
+
+def normalize_city(name):
+    return ' '.join(name.split()).casefold()
+
+
+def build_segments(journey, stop_points):
+    carrier = journey.carrier
+    points = [(journey.departure_city, journey.departure_date, None, journey.available_capacity)]
+    points += [
+        (stop.city, stop.collection_date, stop, stop.available_capacity)
+        for stop in stop_points
+    ]
+    points.append((journey.arrival_city, None, None, None))
+
+    segments = []
+    for i, (origin_city, departure_date, origin_stop, capacity) in enumerate(points[:-1]):
+        remaining = capacity
+        for destination_city, _, destination_stop, next_capacity in points[i + 1:]:
+            segments.append(RouteSegment(
+                journey=journey,
+                carrier_id=carrier.pk,
+                carrier_rating=carrier.rating,
+                carrier_verified=carrier.verified,
+                origin_stop=origin_stop,
+                destination_stop=destination_stop,
+                origin_city=origin_city,
+                destination_city=destination_city,
+                origin_key=normalize_city(origin_city),
+                destination_key=normalize_city(destination_city),
+                departure_date=departure_date,
+                remaining_capacity=remaining,
+                price_per_kg=journey.price_per_kg,
+            ))
+            if next_capacity is not None:
+                remaining = min(remaining, next_capacity)
+    return segments
+
+
+def index_journeys(journey_ids):
+    journey_ids = list(journey_ids)
+    with transaction.atomic():
+        RouteSegment.objects.filter(journey_id__in=journey_ids).delete()
+        journeys = (
+            Journey.objects.filter(pk__in=journey_ids, status='SCHEDULED')
+            .select_related('carrier')
+            .prefetch_related('stop_points')
+        )
+        RouteSegment.objects.bulk_create([
+            segment for journey in journeys
+            for segment in build_segments(journey, journey.stop_points.all())
+        ])
+
+
+def schedule_reindex(journey_id):
+    schedule_reindex_many([journey_id])
+
+
+def schedule_reindex_many(journey_ids):
+    # Deferred to commit so a journey being deleted, or a batch of stop
+    # points being created, is indexed once in its final state.
+    journey_ids = list(journey_ids)
+    if journey_ids:
+        transaction.on_commit(lambda: index_journeys(journey_ids))
+
+
+def rebuild_index(batch_size=500):
+    journeys = (
+        Journey.objects.filter(status='SCHEDULED')
+        .select_related('carrier')
+        .prefetch_related('stop_points')
+        .order_by('id')
+    )
+    # Searches keep seeing the old index until the new one is complete.
+    with transaction.atomic():
+        RouteSegment.objects.all().delete()
+        for journey in journeys.iterator(chunk_size=batch_size):
+            RouteSegment.objects.bulk_create(
+                build_segments(journey, journey.stop_points.all()),
+                batch_size=batch_size
+            )
+
+
+def sync_carrier_features(carrier_ids):
+    """Copy the carriers' current rating and verified flag onto their segments."""
+    carrier = CarrierProfile.objects.filter(pk=OuterRef('carrier_id'))
+    RouteSegment.objects.filter(carrier_id__in=list(carrier_ids)).update(
+        carrier_rating=Subquery(carrier.values('rating')[:1]),
+        carrier_verified=Subquery(carrier.values('verified')[:1])
+    )
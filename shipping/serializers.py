@@ -2,16 +2,92 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
     UserProfile, CarrierProfile, SenderProfile, Vehicle,
-    Journey, StopPoint, Package, Review
+    Journey, StopPoint, Package, Review, RouteSegment
 )
 
-class UserSerializer(serializers.ModelSerializer):
+def _normalize_paths(value):
+    return ','.join(sorted({path.strip() for path in value.split(',') if path.strip()}))
+
+def _parse_paths(value):
+    # 'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}
+    tree = {}
+    for path in value.split(',') if value else []:
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+def get_field_spec(request):
+    """
+    Hashable ``(fields, expand, flat)`` read from ``?fields=``, ``?expand=``
+    and ``?flat=`` on safe requests, or None when none of them is given.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    params = request.query_params
+    fields = _normalize_paths(params.get('fields', ''))
+    expand = _normalize_paths(params.get('expand', ''))
+    flat = params.get('flat', '').lower() in ('true', '1')
+    if not (fields or expand or flat):
+        return None
+    # Asking for expansions implies every other relation is flattened.
+    return (fields or None, expand, flat or bool(expand))
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and flat representations for read requests.
+
+    ``?fields=tracking_number,status,journey.departure_city`` keeps only the
+    listed fields (dotted paths reach into nested serializers).
+    ``?flat=true`` renders nested relations as primary keys, and
+    ``?expand=journey,journey.carrier`` keeps the listed relations nested
+    while flattening all the others. The spec comes from
+    ``context['field_spec']`` or the request; nested serializers receive
+    their part of it from the parent.
+    """
+
+    def get_field_spec(self):
+        if hasattr(self, '_field_spec'):
+            return self._field_spec
+        spec = self.context.get('field_spec')
+        if spec is None:
+            spec = get_field_spec(self.context.get('request'))
+        if spec is None:
+            return None
+        fields, expand, flat = spec
+        return (_parse_paths(fields) if fields else None, _parse_paths(expand), flat)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = self.get_field_spec()
+        only, expand, flat = spec if spec is not None else (None, {}, False)
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+
+        for name, field in list(fields.items()):
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if flat and name not in expand:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    source=field.source, many=many, read_only=True
+                )
+            elif isinstance(nested, DynamicFieldsMixin):
+                nested._field_spec = None if spec is None else (
+                    (only or {}).get(name) or None,
+                    expand.get(name, {}),
+                    flat
+                )
+        return fields
+
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name')
         read_only_fields = ('id',)
 
-class CarrierProfileSerializer(serializers.ModelSerializer):
+class CarrierProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(source='user_profile.user', read_only=True)
     phone = serializers.CharField(source='user_profile.phone')
     profile_image = serializers.ImageField(source='user_profile.profile_image')
@@ -19,9 +95,11 @@ class CarrierProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = CarrierProfile
         fields = '__all__'
-        read_only_fields = ('user', 'rating', 'review_count', 'total_deliveries', 'verified')
+        read_only_fields = (
+            'user', 'rating', 'review_count', 'rating_sum', 'total_deliveries', 'verified'
+        )
 
-class SenderProfileSerializer(serializers.ModelSerializer):
+class SenderProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(source='user_profile.user', read_only=True)
     phone = serializers.CharField(source='user_profile.phone')
     profile_image = serializers.ImageField(source='user_profile.profile_image')
@@ -29,21 +107,21 @@ class SenderProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = SenderProfile
         fields = '__all__'
-        read_only_fields = ('user', 'rating', 'review_count', 'total_packages')
+        read_only_fields = ('user', 'rating', 'review_count', 'rating_sum', 'total_packages')
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vehicle
         fields = '__all__'
         read_only_fields = ('carrier',)
 
-class StopPointSerializer(serializers.ModelSerializer):
+class StopPointSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = StopPoint
         fields = '__all__'
         read_only_fields = ('journey', 'available_capacity')
 
-class JourneySerializer(serializers.ModelSerializer):
+class JourneySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     stop_points = StopPointSerializer(many=True, read_only=True)
     carrier = CarrierProfileSerializer(read_only=True)
     vehicle = VehicleSerializer(read_only=True)
@@ -66,7 +144,17 @@ class JourneySerializer(serializers.ModelSerializer):
         
         return journey
 
-class PackageSerializer(serializers.ModelSerializer):
+class RouteSegmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = RouteSegment
+        fields = (
+            'journey', 'origin_stop', 'destination_stop', 'origin_city',
+            'destination_city', 'departure_date', 'remaining_capacity',
+            'price_per_kg'
+        )
+        read_only_fields = fields
+
+class PackageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     sender = SenderProfileSerializer(read_only=True)
     journey = JourneySerializer(read_only=True)
 
@@ -78,11 +166,21 @@ class PackageSerializer(serializers.ModelSerializer):
             'delivery_code', 'status'
         )
 
-class ReviewSerializer(serializers.ModelSerializer):
+class BulkPackageSerializer(PackageSerializer):
+    """
+    Validates the items of a bulk booking without touching the database:
+    the journey and stops are plain ids, checked for the whole batch at once
+    when the capacity is reserved.
+    """
+    journey = serializers.IntegerField(min_value=1)
+    origin_stop = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    destination_stop = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+class ReviewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     reviewer = UserSerializer(source='reviewer.user', read_only=True)
     reviewed = UserSerializer(source='reviewed.user', read_only=True)
 
     class Meta:
         model = Review
         fields = '__all__'
-        read_only_fields = ('reviewer', 'reviewed', 'review_type')
\ No newline at end of file
+        read_only_fields = ('reviewer', 'reviewed', 'review_type', 'archived_package')
\ No newline at end of file
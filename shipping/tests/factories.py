@@ -0,0 +1,103 @@
+from datetime import timedelta
+from decimal import Decimal
+from itertools import count
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from shipping.models import Journey, Package, Review, StopPoint, UserProfile, Vehicle
+
+_sequence = count(1)
+
+
+def make_profile(type_, **fields):
+    """A user with its UserProfile; returns the Carrier- or SenderProfile."""
+    n = next(_sequence)
+    user = User.objects.create_user(
+        f'{type_.lower()}{n}', f'{type_.lower()}{n}@example.com',
+        first_name=type_.title(), last_name=str(n), **fields
+    )
+    profile = UserProfile.objects.create(user=user, type=type_, phone=f'+3360000{n:04d}')
+    return profile.carrierprofile if type_ == 'CARRIER' else profile.senderprofile
+
+
+def make_carrier(**fields):
+    return make_profile('CARRIER', **fields)
+
+
+def make_sender(**fields):
+    return make_profile('SENDER', **fields)
+
+
+def make_journey(carrier, stops=('Lyon', 'Madrid'), capacity=100, days=1, **fields):
+    vehicle = Vehicle.objects.create(
+        carrier=carrier, license_plate=f'AB-{next(_sequence)}', type='Van',
+        brand='Renault', capacity=capacity
+    )
+    departure = timezone.now() + timedelta(days=days)
+    journey = Journey.objects.create(**{
+        'carrier': carrier,
+        'vehicle': vehicle,
+        'departure_city': 'Paris',
+        'arrival_city': 'Dakar',
+        'departure_date': departure,
+        'collection_date': departure - timedelta(hours=4),
+        'collection_address': '1 rue de Rivoli',
+        'price_per_kg': Decimal('5.00'),
+        'available_capacity': capacity,
+        **fields,
+    })
+    for hours, city in enumerate(stops, start=1):
+        StopPoint.objects.create(
+            journey=journey, city=city, address=f'{city} depot',
+            collection_date=departure + timedelta(hours=hours),
+            available_capacity=capacity
+        )
+    return journey
+
+
+def make_package(sender, journey, weight=20, **fields):
+    n = next(_sequence)
+    return Package.objects.create(**{
+        'sender': sender,
+        'journey': journey,
+        'sender_id_card': 'ID123',
+        'sender_phone': '+33611111111',
+        'recipient_phone': '+221700000000',
+        'size': 'SMALL',
+        'weight': Decimal(weight),
+        'contents': ['clothes'],
+        'tracking_number': f'TN{n:08d}',
+        'pickup_code': 'PICK01',
+        'delivery_code': 'DROP01',
+        **fields,
+    })
+
+
+def make_review(package, rating=4):
+    return Review.objects.create(
+        reviewer=package.sender.user_profile,
+        reviewed=package.journey.carrier.user_profile,
+        package=package,
+        rating=rating,
+        comment='Fine',
+        review_type='CARRIER'
+    )
+
+
+BOOKING = {
+    'sender_id_card': 'ID123',
+    'sender_phone': '+33611111111',
+    'recipient_phone': '+221700000000',
+    'size': 'SMALL',
+    'contents': ['clothes'],
+}
+
+
+def book(client, journey, weight, **fields):
+    return client.post(
+        reverse('package-list'),
+        {**BOOKING, 'journey': journey.pk, 'weight': weight, **fields},
+        format='json'
+    )
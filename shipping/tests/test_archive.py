@@ -0,0 +1,75 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shipping.archive import archive_journey_batch, archive_package_batch
+from shipping.models import ArchivedPackage, Journey, Package
+
+from .factories import book, make_carrier, make_journey, make_package, make_sender
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class ArchiveChangeFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = make_sender()
+        self.journey = make_journey(make_carrier())
+        self.package = make_package(self.sender, self.journey, status='DELIVERED')
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+        self.since = self.client.get(reverse('changes')).data['cursor']
+
+    def changes(self):
+        response = self.client.get(reverse('changes'), {'since': self.since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def tomorrow(self):
+        return timezone.now() + timedelta(days=1)
+
+    def test_archived_packages_are_not_reported_deleted(self):
+        self.assertEqual(archive_package_batch(self.tomorrow(), 10), 1)
+        data = self.changes()
+        self.assertEqual(data['archived']['packages'], [self.package.pk])
+        self.assertEqual(data['deleted']['packages'], [])
+
+    def test_archived_journeys_are_not_reported_deleted(self):
+        Journey.objects.filter(pk=self.journey.pk).update(
+            status='COMPLETED', departure_date=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(archive_journey_batch(timezone.now(), 10), (1, 1))
+        data = self.changes()
+        self.assertEqual(data['archived']['journeys'], [self.journey.pk])
+        self.assertEqual(data['archived']['packages'], [self.package.pk])
+        self.assertEqual(len(data['archived']['stop_points']), 2)
+        self.assertEqual(data['deleted'], {stream: [] for stream in data['deleted']})
+
+    def test_deletes_are_still_reported(self):
+        Package.objects.filter(pk=self.package.pk).delete()
+        data = self.changes()
+        self.assertEqual(data['deleted']['packages'], [self.package.pk])
+        self.assertEqual(data['archived']['packages'], [])
+
+
+class TrackingNumberTests(TestCase):
+    def test_numbers_of_archived_packages_are_not_reused(self):
+        journey = make_journey(make_carrier())
+        sender = make_sender()
+        client = APIClient()
+        client.force_authenticate(sender.user_profile.user)
+        taken, fresh = uuid.uuid4(), uuid.uuid4()
+        ArchivedPackage.objects.create(
+            id=10 ** 6, tracking_number=taken.hex[:10].upper(), sender=sender, journey_id=0,
+            status='DELIVERED', origin_city='Paris', destination_city='Dakar',
+            updated_at=timezone.now(), data={}
+        )
+        with mock.patch('shipping.views.uuid.uuid4', side_effect=[taken, fresh]):
+            response = book(client, journey, 20)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Package.objects.get().tracking_number, fresh.hex[:10].upper())
@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from shipping.authentication import CachedTokenAuthentication, local_cache
+from shipping.models import UserProfile
+
+from .factories import make_carrier, make_sender
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.sender = make_sender()
+        self.user = self.sender.user_profile.user
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.auth.authenticate_credentials(self.token.key)
+
+    def save_user(self, **fields):
+        for name, value in fields.items():
+            setattr(self.user, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+    def test_cached_tokens_authenticate_without_queries(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user._shipping_identity.sender_id, self.sender.pk)
+
+        # The shared entry serves a process whose local copy expired.
+        local_cache.entries.clear()
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+        response = APIClient().get(
+            reverse('package-list'), HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_changes_evict_the_entry(self):
+        self.authenticate()
+        self.save_user(is_staff=True)
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        self.assertTrue(user.is_staff)
+
+        self.save_user(is_active=False)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_token_and_profile_changes_evict_the_entry(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.get(user=self.user).delete()
+        user, _ = self.authenticate()
+        self.assertIsNone(user._shipping_identity.sender_id)
+
+        key = self.token.key
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_load_racing_a_deactivation_is_not_served(self):
+        load_entry = self.auth.load_entry
+
+        def load_then_deactivate(key):
+            # The user is read before the deactivation commits and its
+            # eviction runs, and cached after.
+            entry = load_entry(key)
+            self.save_user(is_active=False)
+            return entry
+
+        self.auth.load_entry = load_then_deactivate
+        self.authenticate()
+        self.auth.load_entry = load_entry
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+        local_cache.entries.clear()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_demotion_racing_a_load_is_not_served(self):
+        carrier = make_carrier()
+        token = Token.objects.create(user=carrier.user_profile.user)
+        load_entry = self.auth.load_entry
+
+        def load_then_demote(key):
+            entry = load_entry(key)
+            with self.captureOnCommitCallbacks(execute=True):
+                carrier.user_profile.delete()
+            return entry
+
+        self.auth.load_entry = load_then_demote
+        self.auth.authenticate_credentials(token.key)
+        self.auth.load_entry = load_entry
+
+        local_cache.entries.clear()
+        user, _ = self.auth.authenticate_credentials(token.key)
+        self.assertIsNone(user._shipping_identity.carrier_id)
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_zero_ttl_disables_the_cache(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                user, _ = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(local_cache.entries, {})
+
+        self.save_user(is_active=False)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.counters import increment_many
+from shipping.models import CarrierProfile
+
+from .factories import book, make_carrier, make_journey, make_sender
+
+
+class JourneyCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.journey = make_journey(make_carrier(), capacity=100)
+        self.other = make_journey(make_carrier(), capacity=100)
+        self.client = APIClient()
+        self.client.force_authenticate(make_sender().user_profile.user)
+        self.list_url = reverse('journey-list')
+        self.detail_url = reverse('journey-detail', args=[self.journey.pk])
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def warm(self):
+        for url in (self.list_url, self.detail_url):
+            self.get(url)
+            self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+
+    def test_booking_keeps_list_pages_and_retires_the_journey(self):
+        self.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(book(self.client, self.journey, 20).status_code, 201)
+
+        self.assertEqual(self.get(self.list_url)['X-Cache'], 'HIT')
+        detail = self.get(self.detail_url)
+        self.assertEqual(detail['X-Cache'], 'MISS')
+        self.assertEqual(detail.data['available_capacity'], 80)
+
+    def test_journey_edit_retires_list_pages(self):
+        self.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.journey.price_per_kg = Decimal('7.50')
+            self.journey.save()
+
+        response = self.get(self.list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        prices = {row['id']: row['price_per_kg'] for row in response.data['results']}
+        self.assertEqual(prices[self.journey.pk], '7.50')
+
+    def test_carrier_user_and_profile_edits_retire_list_pages(self):
+        carrier = self.journey.carrier
+        profile = carrier.user_profile
+        for obj, field, value in ((profile.user, 'first_name', 'Renamed'),
+                                  (profile, 'phone', '+33699999999')):
+            self.warm()
+            with self.captureOnCommitCallbacks(execute=True):
+                setattr(obj, field, value)
+                obj.save()
+
+            response = self.get(self.list_url)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            row = next(row for row in response.data['results'] if row['id'] == self.journey.pk)
+            self.assertEqual(row['carrier']['user']['first_name'], profile.user.first_name)
+            self.assertEqual(row['carrier']['phone'], profile.phone)
+            self.assertEqual(self.get(self.detail_url)['X-Cache'], 'MISS')
+
+    def test_sender_edits_and_logins_keep_list_pages(self):
+        sender = make_sender()
+        self.warm()
+        with self.captureOnCommitCallbacks(execute=True):
+            sender.user_profile.phone = '+33699999999'
+            sender.user_profile.save()
+            carrier_user = self.journey.carrier.user_profile.user
+            carrier_user.save(update_fields=['last_login'])
+        self.assertEqual(self.get(self.list_url)['X-Cache'], 'HIT')
+
+    def test_delivery_counters_keep_list_pages_and_retire_the_carrier(self):
+        carrier = self.journey.carrier
+        carriers_url = reverse('carrierprofile-list')
+        self.warm()
+        self.get(carriers_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            increment_many(CarrierProfile, 'total_deliveries', {carrier.pk: 3})
+
+        self.assertEqual(self.get(self.list_url)['X-Cache'], 'HIT')
+        detail = self.get(self.detail_url)
+        self.assertEqual(detail['X-Cache'], 'MISS')
+        self.assertEqual(detail.data['carrier']['total_deliveries'], 3)
+        self.assertEqual(self.get(carriers_url)['X-Cache'], 'MISS')
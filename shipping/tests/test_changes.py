@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shipping.changes import current_cursor, purge_changes
+from shipping.models import ChangeLogEntry, Package
+
+from .factories import make_carrier, make_journey, make_package, make_sender
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = make_sender()
+        self.journey = make_journey(make_carrier())
+        self.package = make_package(self.sender, self.journey)
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+        self.cursor = self.feed()['cursor']
+
+    def feed(self, status_code=200, **params):
+        response = self.client.get(reverse('changes'), params)
+        self.assertEqual(response.status_code, status_code)
+        return response.data
+
+    def test_updates_and_deletes_after_the_cursor(self):
+        self.assertEqual(self.cursor, str(ChangeLogEntry.objects.latest('id').pk))
+        other = make_package(self.sender, self.journey)
+        other_pk = other.pk
+        self.package.weight = 30
+        self.package.save()
+        other.delete()
+
+        data = self.feed(since=self.cursor, streams='packages')
+        self.assertFalse(data['has_more'])
+        self.assertEqual([row['id'] for row in data['changes']['packages']], [self.package.pk])
+        self.assertEqual(data['changes']['packages'][0]['weight'], '30.00')
+        self.assertEqual(data['deleted'], {'packages': [other_pk]})
+        self.assertEqual(self.feed(since=data['cursor'], streams='packages')['changes'],
+                         {'packages': []})
+
+    def test_pages_follow_the_limit(self):
+        for _ in range(3):
+            make_package(self.sender, self.journey)
+        seen, cursor = [], self.cursor
+        while True:
+            data = self.feed(since=cursor, streams='packages', limit=1)
+            seen += [row['id'] for row in data['changes']['packages']]
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(sorted(seen), list(
+            Package.objects.exclude(pk=self.package.pk).order_by('pk').values_list('pk', flat=True)
+        ))
+
+    def test_packages_are_scoped_to_the_user(self):
+        make_package(make_sender(), self.journey)
+        data = self.feed(since=self.cursor, streams='packages')
+        self.assertEqual(data['changes'], {'packages': []})
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_unsettled_entries_are_held_back(self):
+        make_package(self.sender, self.journey)
+        data = self.feed(since=self.cursor)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(data['cursor'], self.cursor)
+        self.assertEqual(current_cursor(), 0)
+
+    def test_purged_cursors_expire(self):
+        make_package(self.sender, self.journey)
+        latest = ChangeLogEntry.objects.latest('id').pk
+        purged = purge_changes(timezone.now() + timedelta(seconds=1))
+        self.assertEqual(purged, int(self.cursor))
+        self.assertEqual(list(ChangeLogEntry.objects.values_list('id', flat=True)), [latest])
+
+        self.assertIn('error', self.feed(status_code=410, since=1))
+        self.assertEqual(self.feed(since=latest)['cursor'], str(latest))
+
+    def test_bad_parameters(self):
+        self.feed(status_code=400, since=self.cursor, streams='packages,parcels')
+        self.feed(status_code=400, since='abc')
+        self.feed(status_code=400, since=self.cursor, limit=0)
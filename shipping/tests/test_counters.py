@@ -0,0 +1,121 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.counters import fold_counters, get_count
+from shipping.models import CarrierProfile, CounterShard, OutboxMessage, SenderProfile
+from shipping.outbox import claim, count_deliveries, process
+
+from .factories import make_carrier, make_journey, make_package, make_sender
+
+
+class DeliveryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier = make_carrier()
+        self.sender = make_sender()
+        self.package = make_package(self.sender, make_journey(self.carrier), status='APPROVED')
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+        OutboxMessage.objects.all().delete()
+
+    def update_status(self, new_status):
+        codes = {'IN_TRANSIT': self.package.pickup_code, 'DELIVERED': self.package.delivery_code}
+        return self.client.post(
+            reverse('package-update-status', args=[self.package.pk]),
+            {'status': new_status, 'code': codes.get(new_status)}, format='json'
+        )
+
+    def deliveries(self):
+        process(*claim(100))
+        return (
+            CarrierProfile.objects.get(pk=self.carrier.pk).total_deliveries,
+            SenderProfile.objects.get(pk=self.sender.pk).total_packages,
+        )
+
+    def test_delivered_is_final(self):
+        self.assertEqual(self.update_status('IN_TRANSIT').status_code, 200)
+        self.assertEqual(self.update_status('DELIVERED').status_code, 200)
+        self.assertEqual(self.deliveries(), (1, 1))
+
+        for new_status in ('IN_TRANSIT', 'PENDING', 'CANCELLED'):
+            with self.subTest(status=new_status):
+                self.assertEqual(self.update_status(new_status).status_code, 400)
+        self.assertEqual(self.update_status('DELIVERED').status_code, 200)
+        self.assertEqual(self.deliveries(), (1, 1))
+
+    def test_pending_cannot_skip_to_delivered(self):
+        self.package.status = 'PENDING'
+        self.package.save()
+        self.assertEqual(self.update_status('DELIVERED').status_code, 400)
+        self.assertEqual(self.deliveries(), (0, 0))
+
+
+@override_settings(COUNTER_SHARDS=4)
+class ConcurrentCounterTests(TransactionTestCase):
+    """Deliveries counted from many threads through the shards, folded concurrently."""
+    threads = 8
+    deliveries = 250
+
+    def retry(self, apply):
+        # SQLite's shared in-memory test database fails on locked tables
+        # instead of waiting; the transaction rolled back, so run it again.
+        while True:
+            try:
+                with transaction.atomic():
+                    return apply()
+            except OperationalError:
+                time.sleep(0.001)
+
+    def test_concurrent_deliveries_are_all_counted(self):
+        carrier = make_carrier()
+        senders = [make_sender() for _ in range(self.threads)]
+        barrier = threading.Barrier(self.threads + 1)
+        done = threading.Event()
+        errors = []
+
+        def deliver(sender):
+            message = OutboxMessage(payload={'carrier': carrier.pk, 'senders': [sender.pk]})
+            try:
+                barrier.wait()
+                for _ in range(self.deliveries):
+                    self.retry(lambda: count_deliveries([message]))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        def fold():
+            try:
+                barrier.wait()
+                while not done.wait(0.01):
+                    self.retry(lambda: fold_counters(batch_size=10))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=deliver, args=(sender,)) for sender in senders]
+        folder = threading.Thread(target=fold)
+        for worker in workers + [folder]:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        done.set()
+        folder.join()
+
+        self.assertEqual(errors, [])
+        total = self.threads * self.deliveries
+        carrier = CarrierProfile.objects.get(pk=carrier.pk)
+        self.assertEqual(get_count(carrier, 'total_deliveries'), total)
+        fold_counters()
+        self.assertEqual(CarrierProfile.objects.get(pk=carrier.pk).total_deliveries, total)
+        self.assertEqual(
+            list(SenderProfile.objects.filter(pk__in=[s.pk for s in senders])
+                 .values_list('total_packages', flat=True)),
+            [self.deliveries] * self.threads
+        )
+        self.assertFalse(CounterShard.objects.exclude(value=0).exists())
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .factories import make_carrier, make_journey, make_package, make_review, make_sender
+
+LIST_ENDPOINTS = ('journey-list', 'package-list', 'review-list', 'vehicle-list')
+
+
+class ListQueryCountTests(TestCase):
+    """
+    List endpoints run the same number of queries for N and 2N rows, on
+    both the serializer path and the fast read path.
+    """
+    rows = 3
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(make_sender().user_profile.user)
+
+    def add_rows(self, count):
+        # Distinct carriers and senders, so every row joins different
+        # related objects.
+        for _ in range(count):
+            journey = make_journey(make_carrier())
+            make_review(make_package(make_sender(), journey))
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for fast_read in (False, True):
+            for name in LIST_ENDPOINTS:
+                with self.subTest(endpoint=name, fast_read=fast_read), \
+                        override_settings(FAST_READ_SERIALIZERS=fast_read), \
+                        transaction.atomic():
+                    url = reverse(name)
+                    self.add_rows(self.rows)
+                    expected, response = self.count_queries(url)
+                    self.assertEqual(len(response.data['results']), self.rows)
+                    self.add_rows(self.rows)
+                    cache.clear()
+                    with self.assertNumQueries(expected):
+                        response = self.client.get(url)
+                    self.assertEqual(len(response.data['results']), 2 * self.rows)
+                    transaction.set_rollback(True)
+
+    def test_nested_relations_are_rendered(self):
+        self.add_rows(2)
+        _, response = self.count_queries(reverse('package-list'))
+        package = response.data['results'][0]
+        self.assertEqual(len(package['journey']['stop_points']), 2)
+        self.assertIn('user', package['journey']['carrier'])
+        self.assertIn('user', package['sender'])
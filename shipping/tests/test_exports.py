@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .factories import make_carrier, make_journey, make_package, make_sender
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier, self.other_carrier = make_carrier(), make_carrier()
+        self.sender, self.other_sender = make_sender(), make_sender()
+        self.journey = make_journey(self.carrier)
+        self.other_journey = make_journey(self.other_carrier)
+        lyon = self.journey.stop_points.get(city='Lyon')
+        self.own = make_package(self.sender, self.journey, origin_stop=lyon)
+        self.on_other_journey = make_package(self.sender, self.other_journey)
+        self.others = make_package(self.other_sender, self.journey)
+
+    def export(self, user, url_name='package-export', status_code=200, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, status_code)
+        if status_code != 200:
+            return response
+        return b''.join(response.streaming_content).decode()
+
+    def csv_rows(self, user, **params):
+        return list(csv.DictReader(io.StringIO(self.export(user, **params))))
+
+    def numbers(self, user, **params):
+        return sorted(row['tracking_number'] for row in self.csv_rows(user, **params))
+
+    def test_senders_export_their_own_packages(self):
+        user = self.sender.user_profile.user
+        self.assertEqual(self.numbers(user), sorted([
+            self.own.tracking_number, self.on_other_journey.tracking_number
+        ]))
+        row = next(row for row in self.csv_rows(user) if row['tracking_number'] == self.own.tracking_number)
+        self.assertEqual((row['origin_city'], row['destination_city']), ('Lyon', 'Dakar'))
+
+        # Filters apply on top of the scope.
+        self.assertEqual(self.numbers(user, journey=self.journey.pk), [self.own.tracking_number])
+
+    def test_carriers_export_the_packages_on_their_journeys(self):
+        self.assertEqual(self.numbers(self.carrier.user_profile.user), sorted([
+            self.own.tracking_number, self.others.tracking_number
+        ]))
+        self.assertEqual(self.numbers(self.other_carrier.user_profile.user),
+                         [self.on_other_journey.tracking_number])
+        self.assertEqual(len(self.numbers(User.objects.create_user('staff', is_staff=True))), 3)
+
+    def test_journey_exports_are_for_carriers(self):
+        lines = self.export(self.carrier.user_profile.user, 'journey-export', file_format='ndjson')
+        rows = [json.loads(line) for line in lines.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.journey.pk])
+        self.export(self.sender.user_profile.user, 'journey-export', status_code=403)
+
+    def test_formats(self):
+        user = self.other_sender.user_profile.user
+        response = self.export(user, status_code=200, file_format='ndjson')
+        self.assertEqual(json.loads(response)['tracking_number'], self.others.tracking_number)
+        self.export(user, status_code=400, file_format='xlsx')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(reverse('package-export'))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="packages-', response['Content-Disposition'])
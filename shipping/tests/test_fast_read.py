@@ -0,0 +1,109 @@
+import sys
+import threading
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.fast_read import compile_serializer
+from shipping.models import Journey, UserProfile
+from shipping.serializers import (
+    CarrierProfileSerializer, JourneySerializer, PackageSerializer, ReviewSerializer,
+    SenderProfileSerializer
+)
+
+from .factories import make_carrier, make_journey, make_package, make_review, make_sender
+
+
+class FastReadOutputTests(TestCase):
+    """The compiled plans render byte for byte what the serializers render."""
+    queries = {
+        'carrierprofile-list': ('', '?flat=true', '?fields=id,user,phone,rating'),
+        'senderprofile-list': ('', '?fields=id,user.username,profile_image'),
+        'journey-list': (
+            '', '?flat=true', '?expand=stop_points', '?fields=id,departure_date,carrier.user',
+        ),
+        'package-list': ('', '?flat=true', '?expand=journey.stop_points', '?fields=id,created_at'),
+        'review-list': ('', '?flat=true', '?fields=id,rating,reviewer.username'),
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.sender = make_sender()
+        UserProfile.objects.filter(pk=self.sender.user_profile_id).update(
+            profile_image='profiles/sender.jpg'
+        )
+        for stops in (('Lyon', 'Madrid'), (), ('Rabat',)):
+            journey = make_journey(make_carrier(), stops=stops)
+            make_review(make_package(self.sender, journey))
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+
+    def get(self, url, fast_read):
+        cache.clear()
+        with override_settings(FAST_READ_SERIALIZERS=fast_read):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_plans_compile(self):
+        for serializer_class in (
+            CarrierProfileSerializer, SenderProfileSerializer, JourneySerializer,
+            PackageSerializer, ReviewSerializer,
+        ):
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertIsNotNone(compile_serializer(serializer_class))
+
+    def test_output_matches_the_serializers(self):
+        for name, queries in self.queries.items():
+            for query in queries:
+                url = reverse(name) + query
+                with self.subTest(url=url):
+                    fast = self.get(url, True)
+                    self.assertIn(b'"results":[{', fast)
+                    self.assertEqual(fast, self.get(url, False))
+
+
+class FastReadConcurrencyTests(TransactionTestCase):
+    """A plan is shared by every thread; each batch keeps its own relations."""
+    threads = 4
+    rounds = 200
+
+    def setUp(self):
+        # Switch threads often enough for batches to interleave.
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+    def test_parallel_batches_keep_their_own_relations(self):
+        carrier = make_carrier()
+        for count in range(1, self.threads + 1):
+            make_journey(carrier, stops=[f'Stop {n}' for n in range(count)])
+        plan = compile_serializer(JourneySerializer)
+        batches = [
+            list(Journey.objects.filter(pk=journey.pk).values(*plan.columns))
+            for journey in Journey.objects.order_by('pk')
+        ]
+        expected = [plan.render_many(rows, None) for rows in batches]
+        barrier = threading.Barrier(self.threads)
+        mismatches = []
+
+        def render(index):
+            try:
+                barrier.wait()
+                for _ in range(self.rounds):
+                    if plan.render_many(batches[index], None) != expected[index]:
+                        mismatches.append(index)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=render, args=(index,)) for index in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual([len(data[0]['stop_points']) for data in expected], [1, 2, 3, 4])
+        self.assertEqual(mismatches, [])
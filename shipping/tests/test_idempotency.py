@@ -0,0 +1,91 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.test import APIClient
+
+from shipping.models import IdempotencyKey, Journey, Package
+from shipping.views import PackageViewSet
+
+from .factories import BOOKING, make_carrier, make_journey, make_sender
+
+
+class Unavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.journey = make_journey(make_carrier(), capacity=100)
+        self.sender = make_sender()
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+
+    def book(self, key, weight=20, client=None):
+        return (client or self.client).post(
+            reverse('package-list'),
+            {**BOOKING, 'journey': self.journey.pk, 'weight': weight},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def capacity(self):
+        return Journey.objects.get(pk=self.journey.pk).available_capacity
+
+    def test_retries_replay_the_stored_response(self):
+        first = self.book('key-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        retry = self.book('key-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Package.objects.count(), 1)
+        self.assertEqual(self.capacity(), 80)
+
+        # Keys belong to a user.
+        other = APIClient()
+        other.force_authenticate(make_sender().user_profile.user)
+        self.assertNotIn('Idempotent-Replayed', self.book('key-1', client=other))
+        self.assertEqual(Package.objects.count(), 2)
+
+    def test_reusing_a_key_for_another_request_is_rejected(self):
+        self.book('key-1')
+        response = self.book('key-1', weight=30)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Package.objects.count(), 1)
+        self.assertEqual(self.capacity(), 80)
+
+        self.assertEqual(self.book('').status_code, 400)
+        self.assertEqual(self.book('k' * 256).status_code, 400)
+
+    def test_server_errors_roll_back_and_free_the_key(self):
+        perform_create = PackageViewSet.perform_create
+
+        def create_then_fail(view, serializer):
+            perform_create(view, serializer)
+            raise Unavailable()
+
+        with mock.patch.object(PackageViewSet, 'perform_create', create_then_fail):
+            self.assertEqual(self.book('key-1').status_code, 503)
+        self.assertFalse(Package.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.capacity(), 100)
+
+        response = self.book('key-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(self.capacity(), 80)
+
+    def test_expired_keys_run_again(self):
+        self.book('key-1')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=25))
+        response = self.book('key-1', weight=30)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Package.objects.count(), 2)
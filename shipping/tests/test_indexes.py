@@ -0,0 +1,40 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from shipping.management.commands import explain_queries
+from shipping.models import StopPoint
+
+from .factories import make_carrier, make_journey, make_package, make_review, make_sender
+
+
+class QueryPlanTests(TestCase):
+    """Every query shape of explain_queries is served from an index."""
+    # With a handful of rows, ANALYZE tells SQLite that scanning the table
+    # is cheapest; twenty journeys give the ids queried realistic selectivity.
+    rows = 20
+
+    def setUp(self):
+        for _ in range(self.rows):
+            make_review(make_package(make_sender(), make_journey(make_carrier())))
+
+    def explain(self):
+        out = StringIO()
+        try:
+            call_command('explain_queries', analyze=True, stdout=out)
+        except CommandError as error:
+            raise AssertionError(f'{error}\n{out.getvalue()}')
+        return out.getvalue()
+
+    def test_hot_queries_use_an_index(self):
+        self.assertIn('query shapes use an index', self.explain())
+
+    def test_a_full_scan_fails(self):
+        shapes = explain_queries.QUERY_SHAPES + [
+            ('stop points by address', lambda: StopPoint.objects.filter(address='Depot')),
+        ]
+        with mock.patch.object(explain_queries, 'QUERY_SHAPES', shapes), \
+                self.assertRaisesMessage(AssertionError, 'FULL SCAN  stop points by address'):
+            self.explain()
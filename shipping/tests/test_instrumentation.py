@@ -0,0 +1,79 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .factories import make_carrier, make_journey, make_package, make_sender
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True, REQUEST_INSTRUMENTATION_HEADERS=False)
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = make_sender()
+        self.package = make_package(self.sender, make_journey(make_carrier()))
+
+    def get(self, url, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_public_tracking_gets_no_timings(self):
+        response = self.get(reverse('tracking', args=[self.package.tracking_number]))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_regular_users_get_no_timings(self):
+        response = self.get(reverse('journey-list'), self.sender.user_profile.user)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_staff_get_timings(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        response = self.get(reverse('journey-list'), staff)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    @override_settings(REQUEST_INSTRUMENTATION_HEADERS=True)
+    def test_setting_sends_timings_to_everyone(self):
+        response = self.get(reverse('tracking', args=[self.package.tracking_number]))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True, FAST_READ_SERIALIZERS=False)
+class RequestLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = make_sender()
+        journey = make_journey(make_carrier())
+        for _ in range(3):
+            make_package(self.sender, journey)
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+
+    def logged(self, url, consume=False):
+        with self.assertLogs('shiplink.instrumentation', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+                if consume:
+                    b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(logs.records), 1)
+        return json.loads(logs.records[0].getMessage()), len(queries)
+
+    def test_serializer_time_is_reported(self):
+        entry, queries = self.logged(reverse('package-list'))
+        self.assertEqual(entry['route'], 'GET package-list')
+        self.assertEqual(entry['queries'], queries)
+        self.assertIn('serialize_ms', entry)
+
+    def test_streamed_exports_count_their_queries(self):
+        entry, queries = self.logged(reverse('package-export'), consume=True)
+        self.assertEqual(entry['route'], 'GET package-export')
+        self.assertEqual(entry['queries'], queries)
+        self.assertGreater(entry['total_ms'], 0)
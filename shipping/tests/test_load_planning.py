@@ -0,0 +1,103 @@
+import random
+from itertools import combinations
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.load_planning import Candidate, plan_load
+
+from .factories import make_carrier, make_journey, make_package, make_sender
+
+
+def leg_loads(legs, candidates):
+    loads = [0] * legs
+    for candidate in candidates:
+        for leg in range(candidate.start, candidate.end):
+            loads[leg] += candidate.amount
+    return loads
+
+
+class PlanLoadTests(SimpleTestCase):
+    def test_plans_respect_every_leg_capacity(self):
+        rng = random.Random(7)
+        for case in range(30):
+            legs = rng.randint(1, 5)
+            capacities = [rng.randint(0, 60) for _ in range(legs)]
+            candidates = []
+            for n in range(rng.randint(0, 10)):
+                start = rng.randrange(legs)
+                end = rng.randint(start + 1, legs)
+                amount = rng.randint(1, 30)
+                candidates.append(Candidate(n, start, end, amount, amount * rng.uniform(1, 10)))
+            with self.subTest(case=case):
+                plan = plan_load(capacities, candidates, time_budget=0.01, seed=case)
+                chosen = [candidate for candidate in candidates if candidate.package_id in plan.selected]
+                loads = leg_loads(legs, chosen)
+                self.assertEqual(plan.loads, loads)
+                self.assertTrue(all(load <= capacity for load, capacity in zip(loads, capacities)))
+
+                best = max(
+                    sum(candidate.value for candidate in subset)
+                    for size in range(len(candidates) + 1)
+                    for subset in combinations(candidates, size)
+                    if all(load <= capacity for load, capacity in
+                           zip(leg_loads(legs, subset), capacities))
+                )
+                self.assertAlmostEqual(plan.revenue, sum(candidate.value for candidate in chosen))
+                self.assertLessEqual(plan.revenue, best + 1e-6)
+                self.assertLessEqual(best, plan.bound + 1e-6)
+
+    def test_short_trips_beat_one_long_trip_over_the_same_legs(self):
+        candidates = [
+            Candidate(1, 0, 2, 10, 100.0),
+            Candidate(2, 0, 1, 10, 60.0),
+            Candidate(3, 1, 2, 10, 60.0),
+        ]
+        plan = plan_load([10, 10], candidates, time_budget=0.01)
+        self.assertEqual(plan.selected, [2, 3])
+        self.assertEqual(plan.loads, [10, 10])
+
+
+class LoadPlanEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier = make_carrier()
+        self.journey = make_journey(self.carrier, capacity=50)
+        lyon, madrid = self.journey.stop_points.order_by('collection_date')
+        sender = make_sender()
+        # 20 kg already committed from Lyon on.
+        make_package(sender, self.journey, weight=20, status='APPROVED', origin_stop=lyon)
+        self.pending = [
+            make_package(sender, self.journey, weight=weight, origin_stop=origin,
+                         destination_stop=destination).pk
+            for weight, origin, destination in [
+                (30, None, None), (25, None, lyon), (25, lyon, madrid), (10, madrid, None),
+            ]
+        ]
+        self.url = reverse('journey-load-plan', args=[self.journey.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.carrier.user_profile.user)
+
+    def test_the_plan_fits_the_remaining_capacity(self):
+        response = self.client.get(self.url, {'time_budget_ms': 50})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual([leg['capacity'] for leg in data['legs']], [50, 30, 30])
+        for leg in data['legs']:
+            self.assertLessEqual(leg['planned_load'], leg['capacity'])
+        self.assertEqual(sorted(data['approve'] + data['leave_pending']), sorted(self.pending))
+        self.assertLessEqual(float(data['revenue']), float(data['upper_bound']))
+
+        data = self.client.get(self.url, {'capacity': 10}).data
+        self.assertEqual([leg['capacity'] for leg in data['legs']], [10, 0, 0])
+        self.assertEqual([leg['planned_load'] for leg in data['legs']], [0, 0, 0])
+        self.assertEqual(data['approve'], [])
+
+    def test_only_the_journey_carrier_plans_its_load(self):
+        other = APIClient()
+        other.force_authenticate(make_carrier().user_profile.user)
+        self.assertEqual(other.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {'capacity': -1}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'capacity': 'big'}).status_code, 400)
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.models import CarrierProfile
+
+from .factories import make_carrier, make_journey, make_sender
+
+
+class MatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.journeys = {}
+        with self.captureOnCommitCallbacks(execute=True):
+            for n, (price, rating, days, capacity) in enumerate([
+                ('4.00', '5.00', 1, 200), ('6.00', '4.00', 2, 100), ('9.00', '2.00', 6, 60),
+                ('5.00', '3.50', 3, 150), ('12.00', '1.00', 9, 40), ('7.00', '4.50', 1, 80),
+            ]):
+                carrier = make_carrier()
+                carrier.rating = Decimal(rating)
+                carrier.save()
+                journey = make_journey(carrier, capacity=capacity, days=days,
+                                       price_per_kg=Decimal(price))
+                self.journeys[n] = journey.pk
+        self.client = APIClient()
+        self.client.force_authenticate(make_sender().user_profile.user)
+
+    def match(self, status_code=200, **params):
+        response = self.client.get(reverse('journey-match'), {
+            'origin': 'Paris', 'destination': 'Dakar', 'weight': 30, **params
+        })
+        self.assertEqual(response.status_code, status_code)
+        return response.data
+
+    def test_top_k_is_the_head_of_the_full_ranking(self):
+        ranking = self.match(k=50)['results']
+        scores = [row['score'] for row in ranking]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(ranking[0]['journey'], self.journeys[0])
+        self.assertEqual(ranking[-1]['journey'], self.journeys[4])
+
+        top = self.match(k=3)['results']
+        self.assertEqual(top, ranking[:3])
+
+    def test_candidates_need_room_for_the_package(self):
+        ranking = self.match(k=50, weight=90)['results']
+        self.assertEqual(
+            {row['journey'] for row in ranking},
+            {self.journeys[n] for n in (0, 1, 3)}
+        )
+        self.assertEqual(self.match(weight=500)['results'], [])
+
+    def test_verification_reorders_and_filters(self):
+        second = self.match(k=50)['results'][1]
+        self.assertEqual(self.match(verified='true')['results'], [])
+
+        carrier = CarrierProfile.objects.get(pk=second['carrier'])
+        carrier.verified = True
+        with self.captureOnCommitCallbacks(execute=True):
+            carrier.save()
+
+        verified = self.match(verified='true')['results']
+        self.assertEqual([row['journey'] for row in verified], [second['journey']])
+        self.assertTrue(verified[0]['carrier_verified'])
+        self.assertGreater(verified[0]['score'], second['score'])
+
+    def test_bad_parameters(self):
+        self.match(status_code=400, weight=0)
+        self.match(status_code=400, date='tomorrow')
+        self.assertEqual(
+            self.client.get(reverse('journey-match'), {'origin': 'Paris'}).status_code, 400
+        )
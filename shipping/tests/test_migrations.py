@@ -0,0 +1,13 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class MigrationTests(TestCase):
+    def test_models_match_the_migrations(self):
+        out = StringIO()
+        try:
+            call_command('makemigrations', 'shipping', check=True, dry_run=True, stdout=out)
+        except SystemExit:
+            self.fail(f'Model changes without a migration:\n{out.getvalue()}')
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shipping.models import Journey
+
+from .factories import make_carrier, make_journey, make_sender
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier = make_carrier()
+        self.departure = timezone.now() + timedelta(days=3)
+        # Two departures shared by several journeys each, so pages split ties.
+        for n in range(23):
+            make_journey(self.carrier, stops=(), departure_date=self.departure + timedelta(days=n % 2),
+                         price_per_kg=Decimal(n % 3))
+        self.client = APIClient()
+        self.client.force_authenticate(make_sender().user_profile.user)
+
+    def get(self, status_code=200, **params):
+        response = self.client.get(reverse('journey-list'), params)
+        self.assertEqual(response.status_code, status_code)
+        return response.data
+
+    def walk(self, **params):
+        ids, data = [], self.get(fields='id', **params)
+        pages = [data]
+        ids += [row['id'] for row in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).data
+            pages.append(data)
+            ids += [row['id'] for row in data['results']]
+        return ids, pages
+
+    def test_pages_follow_the_ordering_with_id_tie_breaks(self):
+        ids, pages = self.walk()
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 3])
+        self.assertEqual(ids, list(
+            Journey.objects.order_by('departure_date', 'id').values_list('id', flat=True)
+        ))
+
+        ids, _ = self.walk(ordering='-price_per_kg')
+        self.assertEqual(ids, list(
+            Journey.objects.order_by('-price_per_kg', '-id').values_list('id', flat=True)
+        ))
+
+    def test_cursors_are_stable_under_writes(self):
+        first = self.get(fields='id')
+        expected = list(
+            Journey.objects.order_by('departure_date', 'id').values_list('id', flat=True)
+        )[10:]
+        # Rows added or removed before the cursor neither shift nor repeat
+        # the next pages.
+        make_journey(self.carrier, stops=(), departure_date=self.departure - timedelta(days=1))
+        Journey.objects.filter(pk=first['results'][0]['id']).delete()
+
+        ids, data = [], self.client.get(first['next']).data
+        ids += [row['id'] for row in data['results']]
+        ids += [row['id'] for row in self.client.get(data['next']).data['results']]
+        self.assertEqual(ids, expected)
+
+    def test_count_is_opt_in(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get()
+        self.assertNotIn('count', data)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper()])
+
+        self.assertEqual(self.get(count='true')['count'], 23)
+        self.assertNotIn('count', self.get(count='false'))
+
+    def test_bad_cursors(self):
+        self.get(status_code=404, cursor='not-a-cursor')
+        cursor = self.get()['next'].split('cursor=')[1].split('&')[0]
+        self.get(status_code=404, cursor=cursor, ordering='price_per_kg')
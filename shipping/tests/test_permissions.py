@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shipping.models import Journey, Vehicle
+
+from .factories import make_carrier, make_journey
+
+
+class CarrierOwnershipTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_carrier()
+        self.journey = make_journey(self.owner)
+        self.vehicle = self.journey.vehicle
+
+    def client_for(self, carrier):
+        client = APIClient()
+        client.force_authenticate(carrier.user_profile.user)
+        return client
+
+    def test_another_carrier_cannot_change_or_delete(self):
+        client = self.client_for(make_carrier())
+        for name, obj in (('vehicle-detail', self.vehicle), ('journey-detail', self.journey)):
+            url = reverse(name, args=[obj.pk])
+            with self.subTest(endpoint=name):
+                response = client.patch(url, {'brand': 'X', 'price_per_kg': '1.00'}, format='json')
+                self.assertEqual(response.status_code, 403)
+                self.assertEqual(client.delete(url).status_code, 403)
+                self.assertEqual(client.get(url).status_code, 200)
+        self.assertTrue(Vehicle.objects.filter(pk=self.vehicle.pk, brand='Renault').exists())
+        self.assertTrue(Journey.objects.filter(pk=self.journey.pk).exists())
+
+    def test_owner_can_change(self):
+        client = self.client_for(self.owner)
+        response = client.patch(
+            reverse('vehicle-detail', args=[self.vehicle.pk]), {'brand': 'Iveco'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = client.patch(
+            reverse('journey-detail', args=[self.journey.pk]), {'price_per_kg': '6.00'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_journey_needs_a_vehicle_of_the_carrier(self):
+        departure = timezone.now() + timedelta(days=3)
+        data = {
+            'vehicle': self.vehicle.pk,
+            'departure_city': 'Paris',
+            'arrival_city': 'Dakar',
+            'departure_date': departure.isoformat(),
+            'collection_date': (departure - timedelta(hours=2)).isoformat(),
+            'collection_address': 'Depot',
+            'price_per_kg': '5.00',
+        }
+        response = self.client_for(make_carrier()).post(reverse('journey-list'), data, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client_for(self.owner).post(reverse('journey-list'), data, format='json')
+        self.assertEqual(response.status_code, 201)
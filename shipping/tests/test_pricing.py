@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.pricing import compile_rate_card
+
+from .factories import make_carrier, make_journey, make_sender
+
+SPECIAL_RATES = {
+    'weight_brackets': [{'min_weight': 50, 'multiplier': 0.9}, {'min_weight': 'x'}],
+    'sizes': {'large': 15, 'MEDIUM': -1},
+    'routes': {'Paris -> Dakar': 4, 'Nowhere': 2},
+    'preferred_route_multiplier': 0.95,
+    'minimum_charge': 25,
+    'Electronics': 2.0,
+    'Fragile': 'lots',
+}
+
+
+class RateCardTests(SimpleTestCase):
+    def test_rules_are_compiled_and_malformed_entries_ignored(self):
+        card = compile_rate_card(SPECIAL_RATES, ['Lyon - Dakar', 'Aix-en-Provence', 42])
+        self.assertEqual(card.bracket_weights, [50])
+        self.assertEqual(card.bracket_multipliers, [Decimal('0.9')])
+        self.assertEqual(card.sizes, {'LARGE': 15})
+        self.assertEqual(card.routes, {('paris', 'dakar'): 4})
+        self.assertEqual(card.preferred_routes, {('lyon', 'dakar')})
+        self.assertEqual(card.preferred_multiplier, Decimal('0.95'))
+        self.assertEqual(card.categories, {'electronics': 2})
+        self.assertEqual(card.minimum_charge, 25)
+
+    def test_anything_but_a_dict_means_no_rules(self):
+        card = compile_rate_card(['not', 'rules'], None)
+        self.assertEqual((card.routes, card.categories, card.minimum_charge), ({}, {}, 0))
+        self.assertEqual(card.preferred_multiplier, 1)
+
+
+class QuoteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.plain = make_carrier()
+        self.special = make_carrier()
+        self.special.special_rates = SPECIAL_RATES
+        self.special.preferred_routes = ['Lyon - Dakar']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.special.save()
+            self.plain_journey = make_journey(self.plain, days=1)
+            self.special_journey = make_journey(self.special, days=2)
+        self.client = APIClient()
+        self.client.force_authenticate(make_sender().user_profile.user)
+
+    def quote(self, status_code=200, **params):
+        response = self.client.get(reverse('journey-quote'), {
+            'origin': 'Paris', 'destination': 'Dakar', 'weight': 60, 'size': 'LARGE', **params
+        })
+        self.assertEqual(response.status_code, status_code)
+        return response.data
+
+    def prices(self, **params):
+        return [
+            (row['journey'], row['price_per_kg'], row['total_price'])
+            for row in self.quote(**params)['results']
+        ]
+
+    def test_quotes_apply_each_carriers_rates_cheapest_first(self):
+        # 60 kg * 0.9 bracket * 4.00 route rate + 15 LARGE surcharge.
+        self.assertEqual(self.prices(), [
+            (self.special_journey.pk, '4.00', '231.00'),
+            (self.plain_journey.pk, '5.00', '300.00'),
+        ])
+        self.assertEqual(self.prices(contents='electronics, books'), [
+            (self.plain_journey.pk, '5.00', '300.00'),
+            (self.special_journey.pk, '4.00', '447.00'),
+        ])
+        # Preferred route: 5.00 * 0.95 per kg.
+        self.assertEqual(self.prices(origin='lyon')[0], (self.special_journey.pk, '4.75', '271.50'))
+        self.assertEqual(self.prices(weight=1, size='SMALL'), [
+            (self.plain_journey.pk, '5.00', '5.00'),
+            (self.special_journey.pk, '4.00', '25.00'),
+        ])
+        self.assertEqual(self.quote(limit=1)['count'], 2)
+        self.assertEqual(len(self.quote(limit=1)['results']), 1)
+
+    def test_saved_rates_apply_to_the_next_quote(self):
+        self.prices()
+        self.special.special_rates = {}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.special.save()
+        self.assertEqual(
+            dict((journey, total) for journey, _, total in self.prices()),
+            {self.plain_journey.pk: '300.00', self.special_journey.pk: '300.00'}
+        )
+
+    def test_bad_parameters(self):
+        self.quote(status_code=400, size='HUGE')
+        self.quote(status_code=400, weight='-3')
+        self.quote(status_code=400, destination='')
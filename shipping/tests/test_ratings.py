@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.models import CarrierProfile, OutboxMessage, Package, Review
+from shipping.outbox import claim, process
+from shipping.ratings import change_review_rating, find_drift, record_review
+
+from .factories import make_carrier, make_journey, make_package, make_review, make_sender
+
+
+class RatingDeltaTests(TestCase):
+    def setUp(self):
+        self.carrier = make_carrier()
+        self.journey = make_journey(self.carrier)
+        OutboxMessage.objects.all().delete()
+
+    def review(self, rating):
+        review = make_review(make_package(make_sender(), self.journey), rating=rating)
+        record_review(review)
+        return review
+
+    def drain(self):
+        token, messages = claim(100)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(process(token, messages), {'DONE': len(messages)})
+        # Deltas are applied without reading the profile's reviews.
+        self.assertFalse([query for query in queries if 'shipping_review' in query['sql']])
+        return CarrierProfile.objects.get(pk=self.carrier.pk)
+
+    def assertAggregates(self, profile, rating_sum, review_count, rating):
+        self.assertEqual(
+            (profile.rating_sum, profile.review_count, profile.rating),
+            (rating_sum, review_count, Decimal(rating))
+        )
+        self.assertEqual(find_drift('CARRIER'), [])
+
+    def test_review_writes_apply_deltas(self):
+        first, second = self.review(4), self.review(3)
+        self.assertAggregates(self.drain(), 7, 2, '3.50')
+
+        old_rating, second.rating = second.rating, 5
+        second.save()
+        change_review_rating(second, old_rating)
+        self.assertAggregates(self.drain(), 9, 2, '4.50')
+
+        first.delete()
+        self.assertAggregates(self.drain(), 5, 1, '5.00')
+
+        second.delete()
+        self.assertAggregates(self.drain(), 0, 0, '5.00')
+
+    def test_unchanged_rating_enqueues_nothing(self):
+        review = self.review(4)
+        self.drain()
+        change_review_rating(review, 4)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_cascaded_review_deletes_apply_deltas(self):
+        kept = self.review(5)
+        package_review, journey_review, reviewer_review = self.review(3), self.review(2), self.review(1)
+        self.assertAggregates(self.drain(), 11, 4, '2.75')
+
+        client = APIClient()
+        client.force_authenticate(package_review.reviewer.user)
+        self.assertEqual(
+            client.delete(reverse('package-detail', args=[package_review.package_id])).status_code, 204
+        )
+        self.assertAggregates(self.drain(), 8, 3, '2.67')
+
+        other_journey = make_journey(self.carrier)
+        Package.objects.filter(pk=journey_review.package_id).update(journey=other_journey)
+        other_journey.delete()
+        self.assertAggregates(self.drain(), 6, 2, '3.00')
+
+        reviewer_review.reviewer.delete()
+        self.assertAggregates(self.drain(), 5, 1, '5.00')
+        self.assertTrue(Review.objects.filter(pk=kept.pk).exists())
@@ -0,0 +1,191 @@
+import threading
+
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.models import Journey, OutboxMessage, Package, StopPoint
+from shipping.tracking import lookup
+
+from .factories import BOOKING, book, make_carrier, make_journey, make_sender
+
+
+class ReservationTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.journey = make_journey(make_carrier(), capacity=100)
+        self.stops = list(self.journey.stop_points.all())
+        self.sender = make_sender()
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+
+    def legs(self):
+        """Remaining capacity of every leg, departure leg first."""
+        return [Journey.objects.get(pk=self.journey.pk).available_capacity] + list(
+            StopPoint.objects.filter(journey=self.journey).values_list('available_capacity', flat=True)
+        )
+
+
+class PackageReservationTests(ReservationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        response = book(self.client, self.journey, 20)
+        self.assertEqual(response.status_code, 201)
+        self.package = Package.objects.get()
+        self.url = reverse('package-detail', args=[self.package.pk])
+
+    def test_booking_reserves_every_leg(self):
+        self.assertEqual(self.legs(), [80, 80, 80])
+
+    def test_weight_change_moves_the_reservation(self):
+        response = self.client.patch(self.url, {'weight': 90}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.legs(), [10, 10, 10])
+
+        response = self.client.post(
+            reverse('package-update-status', args=[self.package.pk]),
+            {'status': 'CANCELLED'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.legs(), [100, 100, 100])
+
+    def test_weight_change_that_does_not_fit_keeps_the_old_reservation(self):
+        response = self.client.patch(self.url, {'weight': 120}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.legs(), [80, 80, 80])
+        self.assertEqual(Package.objects.get().weight, 20)
+
+    def test_stop_change_moves_the_reservation(self):
+        response = self.client.patch(self.url, {'origin_stop': self.stops[0].pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.legs(), [100, 80, 80])
+
+        response = self.client.patch(self.url, {'destination_stop': self.stops[1].pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.legs(), [100, 80, 100])
+
+    def test_stop_of_another_journey_is_rejected(self):
+        other = make_journey(make_carrier())
+        response = self.client.patch(
+            self.url, {'origin_stop': other.stop_points.first().pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.legs(), [80, 80, 80])
+
+    def test_delete_releases_the_reservation(self):
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(self.legs(), [100, 100, 100])
+
+    def test_delete_of_a_cancelled_package_releases_nothing_more(self):
+        self.client.post(
+            reverse('package-update-status', args=[self.package.pk]),
+            {'status': 'CANCELLED'}, format='json'
+        )
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(self.legs(), [100, 100, 100])
+
+
+class BulkBookingTests(ReservationTestMixin, TestCase):
+    url = reverse('package-list') + 'bulk/'
+
+    def item(self, weight=20, journey=None, **fields):
+        return {**BOOKING, 'journey': (journey or self.journey).pk, 'weight': weight, **fields}
+
+    def bulk(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, items, format='json')
+
+    def test_bookings_reserve_and_run_the_single_booking_side_effects(self):
+        response = self.bulk([self.item(), self.item(30, origin_stop=self.stops[0].pk)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.legs(), [80, 50, 50])
+
+        numbers = [result['tracking_number'] for result in response.data['results']]
+        with self.assertNumQueries(0):
+            tracked = lookup(numbers)
+        self.assertEqual([tracked[number]['status'] for number in numbers], ['PENDING', 'PENDING'])
+        self.assertEqual(
+            sorted(OutboxMessage.objects.filter(topic='package.status').values_list('payload', flat=True),
+                   key=lambda payload: payload['package']),
+            [{'package': result['id'], 'status': 'PENDING'} for result in response.data['results']]
+        )
+
+    def test_invalid_items_are_reported_by_index(self):
+        other = make_journey(make_carrier())
+        response = self.bulk([
+            self.item(),
+            'not a package',
+            self.item(10),
+            {**self.item(), 'journey': 'abc'},
+            self.item(origin_stop=other.stop_points.first().pk),
+            self.item(200),
+        ])
+        self.assertEqual(response.status_code, 207)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['created'] + ['error'] * 5)
+        self.assertIn('weight', results[2]['errors'])
+        self.assertIn('journey', results[3]['errors'])
+        self.assertEqual(results[4]['errors'], ['Stop point does not belong to this journey'])
+        self.assertEqual(results[5]['errors'], ['Package weight exceeds available capacity'])
+        self.assertEqual(self.legs(), [80, 80, 80])
+
+    def test_only_scheduled_journeys_take_bookings(self):
+        Journey.objects.filter(pk=self.journey.pk).update(status='IN_PROGRESS')
+        response = self.bulk([self.item()])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][0]['errors'], ['Journey is not open for booking'])
+        self.assertEqual(Package.objects.count(), 0)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        journey = make_journey(make_carrier(), capacity=1000)
+        stop = journey.stop_points.first().pk
+        counts = []
+        for size in (1, 2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.bulk([
+                    self.item(15, journey=journey, origin_stop=stop) for _ in range(size)
+                ])
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        # The first request also warms the identity cache.
+        self.assertEqual(counts[1], counts[2])
+
+
+class ConcurrentBookingTests(ReservationTestMixin, TransactionTestCase):
+    threads = 8
+    weight = 30
+
+    def test_parallel_bookings_never_overbook(self):
+        barrier = threading.Barrier(self.threads)
+        outcomes = []
+
+        def attempt():
+            client = APIClient()
+            client.force_authenticate(self.sender.user_profile.user)
+            try:
+                barrier.wait()
+                outcomes.append(book(client, self.journey, self.weight).status_code)
+            except OperationalError:
+                # SQLite's shared in-memory test database locks whole tables
+                # instead of waiting for them.
+                outcomes.append('locked')
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=attempt) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        booked = Package.objects.count()
+        self.assertEqual(len(outcomes), self.threads)
+        self.assertLessEqual(booked * self.weight, 100)
+        self.assertEqual(self.legs(), [100 - booked * self.weight] * 3)
+        if connection.features.has_select_for_update:
+            # Row-locking databases make every request wait its turn.
+            fits = 100 // self.weight
+            self.assertEqual(sorted(outcomes), [201] * fits + [400] * (self.threads - fits))
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.models import RouteSegment
+from shipping.routes import rebuild_index
+
+from .factories import book, make_carrier, make_journey, make_sender
+
+
+class RouteIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.journey = make_journey(make_carrier(), capacity=100)
+        self.lyon, self.madrid = self.journey.stop_points.order_by('collection_date')
+        self.client = APIClient()
+        self.client.force_authenticate(make_sender().user_profile.user)
+
+    def segments(self):
+        return list(
+            RouteSegment.objects.filter(journey=self.journey).order_by('id')
+            .values_list('origin_city', 'destination_city', 'remaining_capacity')
+        )
+
+    def search(self, status_code=200, **params):
+        response = self.client.get(reverse('journey-routes'), params)
+        self.assertEqual(response.status_code, status_code)
+        return response.data
+
+    def test_every_ordered_pair_of_points_is_indexed(self):
+        self.assertEqual(self.segments(), [
+            ('Paris', 'Lyon', 100), ('Paris', 'Madrid', 100), ('Paris', 'Dakar', 100),
+            ('Lyon', 'Madrid', 100), ('Lyon', 'Dakar', 100), ('Madrid', 'Dakar', 100),
+        ])
+        segment = RouteSegment.objects.get(journey=self.journey, origin_city='Lyon',
+                                           destination_city='Dakar')
+        self.assertEqual(segment.origin_stop_id, self.lyon.pk)
+        self.assertIsNone(segment.destination_stop_id)
+        self.assertEqual(segment.departure_date, self.lyon.collection_date)
+
+    def test_reservations_and_status_changes_reindex_the_journey(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = book(self.client, self.journey, 30, origin_stop=self.lyon.pk,
+                            destination_stop=self.madrid.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([capacity for *_, capacity in self.segments()], [100, 70, 70, 70, 70, 100])
+
+        self.journey.status = 'CANCELLED'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.journey.save()
+        self.assertEqual(self.segments(), [])
+
+    def test_search_matches_normalized_cities(self):
+        make_journey(make_carrier(), stops=('Rabat',))
+        data = self.search(origin='  lyon ', destination='DAKAR')
+        self.assertEqual([row['journey'] for row in data['results']], [self.journey.pk])
+        self.assertEqual(data['results'][0]['origin_stop'], self.lyon.pk)
+
+    def test_search_filters(self):
+        self.assertEqual(self.search(origin='Lyon', destination='Dakar', min_capacity=101)['results'], [])
+        after = (self.lyon.collection_date + timedelta(days=1)).date()
+        self.assertEqual(self.search(origin='Lyon', destination='Dakar',
+                                     departure_date_after=after)['results'], [])
+        before = self.lyon.collection_date.date()
+        self.assertEqual(len(self.search(origin='Lyon', destination='Dakar',
+                                         departure_date_before=before)['results']), 1)
+
+        self.assertIn('error', self.search(status_code=400, origin='Lyon'))
+        self.search(status_code=400, origin='Lyon', destination='Dakar', min_capacity='x')
+
+    def test_rebuild_replaces_the_index(self):
+        RouteSegment.objects.filter(journey=self.journey).update(remaining_capacity=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_journey(make_carrier())
+        rebuild_index(batch_size=1)
+        self.assertEqual(len(self.segments()), 6)
+        self.assertEqual({capacity for *_, capacity in self.segments()}, {100})
+        self.assertEqual(RouteSegment.objects.count(), 12)
+
+    def test_failed_rebuild_keeps_the_old_index(self):
+        with mock.patch('shipping.routes.build_segments', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                rebuild_index()
+        self.assertEqual(len(self.segments()), 6)
@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.serializers import PackageSerializer
+
+from .factories import BOOKING, make_carrier, make_journey, make_package, make_sender
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier = make_carrier()
+        self.journey = make_journey(self.carrier)
+        self.sender = make_sender()
+        self.package = make_package(self.sender, self.journey)
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.user_profile.user)
+
+    def get(self, url_name, query, *args):
+        response = self.client.get(f'{reverse(url_name, args=args)}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def read_package(self, query):
+        return self.get('package-detail', query, self.package.pk)
+
+    def test_fields_keep_only_the_listed_paths(self):
+        self.assertEqual(self.read_package('fields=status,id'), {'id': self.package.pk, 'status': 'PENDING'})
+        self.assertEqual(
+            self.read_package('fields=id,journey.departure_city,journey.carrier.company_name'),
+            {'id': self.package.pk, 'journey': {
+                'departure_city': 'Paris', 'carrier': {'company_name': self.carrier.company_name}
+            }}
+        )
+        # Unknown names are ignored.
+        self.assertEqual(self.read_package('fields=id,nope'), {'id': self.package.pk})
+
+    def test_flat_and_expand(self):
+        data = self.read_package('flat=true')
+        self.assertEqual((data['journey'], data['sender']), (self.journey.pk, self.sender.pk))
+
+        data = self.read_package('expand=journey')
+        self.assertEqual(data['sender'], self.sender.pk)
+        self.assertEqual(data['journey']['id'], self.journey.pk)
+        self.assertEqual(data['journey']['carrier'], self.carrier.pk)
+        self.assertEqual(len(data['journey']['stop_points']), 2)
+        self.assertTrue(all(isinstance(pk, int) for pk in data['journey']['stop_points']))
+
+        data = self.read_package('expand=journey.carrier')
+        self.assertEqual(data['journey']['carrier']['id'], self.carrier.pk)
+        self.assertEqual(data['journey']['vehicle'], self.journey.vehicle_id)
+
+    def test_lists_follow_the_spec(self):
+        for fast_read in (True, False):
+            with self.subTest(fast_read=fast_read), override_settings(FAST_READ_SERIALIZERS=fast_read):
+                cache.clear()
+                results = self.get('journey-list', 'fields=id,carrier.company_name')['results']
+                self.assertEqual(results, [
+                    {'id': self.journey.pk, 'carrier': {'company_name': self.carrier.company_name}}
+                ])
+                # Cached pages are keyed on the spec.
+                results = self.get('journey-list', 'flat=true&fields=id,carrier')['results']
+                self.assertEqual(results, [{'id': self.journey.pk, 'carrier': self.carrier.pk}])
+
+    def test_writes_and_default_reads_are_unchanged(self):
+        full = self.read_package('')
+        self.assertEqual(full['journey']['carrier']['user']['username'],
+                         self.carrier.user_profile.user.username)
+        self.assertEqual(set(full), set(PackageSerializer(self.package).data))
+
+        # Writes always answer with the full representation.
+        response = self.client.post(
+            f"{reverse('package-list')}?fields=id",
+            {**BOOKING, 'journey': self.journey.pk, 'weight': 20}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('tracking_number', response.data)
+        self.assertIsInstance(response.data['journey'], dict)
+
+    def test_specs_can_come_from_the_context(self):
+        data = PackageSerializer(self.package, context={'field_spec': ('id,journey', '', True)}).data
+        self.assertEqual(dict(data), {'id': self.package.pk, 'journey': self.journey.pk})
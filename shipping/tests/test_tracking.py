@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shipping.archive import archive_package_batch
+from shipping.models import ArchivedPackage, Package
+from shipping.tracking import lookup
+
+from .factories import make_carrier, make_journey, make_package, make_sender
+
+
+class TrackingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.journey = make_journey(make_carrier())
+        self.lyon = self.journey.stop_points.get(city='Lyon')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package = make_package(make_sender(), self.journey, origin_stop=self.lyon)
+        self.number = self.package.tracking_number
+        self.client = APIClient()
+
+    def track(self, number, status_code=200, **headers):
+        response = self.client.get(reverse('tracking', args=[number]), **headers)
+        self.assertEqual(response.status_code, status_code)
+        return response
+
+    def test_status_changes_are_written_through(self):
+        with self.assertNumQueries(0):
+            projection = lookup([self.number])[self.number]
+        self.assertEqual(projection['status'], 'PENDING')
+        self.assertEqual((projection['origin_city'], projection['destination_city']), ('Lyon', 'Dakar'))
+
+        self.package.status = 'APPROVED'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.track(self.number).data['status'], 'APPROVED')
+
+    def test_route_changes_refill_from_the_database(self):
+        self.journey.arrival_city = 'Bamako'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.journey.save()
+        self.assertEqual(self.track(self.number).data['destination_city'], 'Bamako')
+        with self.assertNumQueries(0):
+            lookup([self.number])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Package.objects.get(pk=self.package.pk).delete()
+        self.track(self.number, status_code=404)
+
+    def test_archived_packages_are_still_tracked(self):
+        Package.objects.filter(pk=self.package.pk).update(status='DELIVERED')
+        self.assertEqual(archive_package_batch(timezone.now() + timedelta(days=1), 10), 1)
+        self.assertTrue(ArchivedPackage.objects.filter(tracking_number=self.number).exists())
+        cache.clear()
+
+        data = self.track(f' {self.number.lower()} ').data
+        self.assertEqual(data['status'], 'DELIVERED')
+        self.assertEqual((data['origin_city'], data['destination_city']), ('Lyon', 'Dakar'))
+        with self.assertNumQueries(0):
+            lookup([self.number])
+
+    def test_unchanged_projections_are_not_resent(self):
+        etag = self.track(self.number)['ETag']
+        self.track(self.number, status_code=304, HTTP_IF_NONE_MATCH=etag)
+        self.track('NOPE', status_code=404)
+        self.track('not a number!', status_code=404)
+
+    def test_batch_lookup(self):
+        response = self.client.post(
+            reverse('tracking-batch'),
+            {'tracking_numbers': [self.number, 'NOPE', 42]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual(results[0]['status'], 'PENDING')
+        self.assertEqual(results[1], {'tracking_number': 'NOPE', 'error': 'Unknown tracking number'})
+        self.assertEqual(results[2]['error'], 'Unknown tracking number')
+
+        for numbers in ([], 'TN1', ['TN1'] * 101):
+            response = self.client.post(
+                reverse('tracking-batch'), {'tracking_numbers': numbers}, format='json'
+            )
+            self.assertEqual(response.status_code, 400)
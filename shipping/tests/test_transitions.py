@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shipping.models import Journey, OutboxMessage, Package
+
+from .factories import make_carrier, make_journey, make_package, make_sender
+
+
+class JourneyStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier = make_carrier()
+        self.journey = make_journey(self.carrier)
+        self.package = make_package(make_sender(), self.journey, status='APPROVED')
+        self.url = reverse('journey-update-status', args=[self.journey.pk])
+
+    def post_status(self, carrier, new_status):
+        client = APIClient()
+        client.force_authenticate(carrier.user_profile.user)
+        return client.post(self.url, {'status': new_status}, format='json')
+
+    def test_another_carrier_cannot_change_the_status(self):
+        response = self.post_status(make_carrier(), 'CANCELLED')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Journey.objects.get(pk=self.journey.pk).status, 'SCHEDULED')
+        self.assertEqual(Package.objects.get(pk=self.package.pk).status, 'APPROVED')
+
+    def test_the_journey_carrier_cascades_to_packages(self):
+        response = self.post_status(self.carrier, 'CANCELLED')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['packages_updated'], 1)
+        self.assertEqual(Package.objects.get(pk=self.package.pk).status, 'CANCELLED')
+
+
+class ScanNotificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier = make_carrier()
+        self.journey = make_journey(self.carrier)
+        self.package = make_package(make_sender(), self.journey, status='APPROVED')
+        self.client = APIClient()
+        self.client.force_authenticate(self.carrier.user_profile.user)
+        OutboxMessage.objects.all().delete()
+
+    def scan(self, *statuses):
+        codes = {'IN_TRANSIT': self.package.pickup_code, 'DELIVERED': self.package.delivery_code}
+        return self.client.post(
+            reverse('journey-scan', args=[self.journey.pk]),
+            {'scans': [
+                {'tracking_number': self.package.tracking_number, 'status': new_status,
+                 'code': codes[new_status]}
+                for new_status in statuses
+            ]},
+            format='json'
+        )
+
+    def notified(self):
+        return [
+            message.payload['status'] for message in
+            OutboxMessage.objects.filter(topic='package.status').order_by('id')
+        ]
+
+    def test_every_status_of_a_batch_is_notified(self):
+        response = self.scan('IN_TRANSIT', 'DELIVERED')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Package.objects.get(pk=self.package.pk).status, 'DELIVERED')
+        self.assertEqual(self.notified(), ['IN_TRANSIT', 'DELIVERED'])
+
+    def test_repeated_scans_notify_once(self):
+        self.scan('IN_TRANSIT', 'IN_TRANSIT', 'DELIVERED', 'DELIVERED')
+        self.assertEqual(self.notified(), ['IN_TRANSIT', 'DELIVERED'])
+
+
+class ScanTransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier = make_carrier()
+        self.journey = make_journey(self.carrier)
+        self.client = APIClient()
+        self.client.force_authenticate(self.carrier.user_profile.user)
+
+    def scan(self, *scans):
+        response = self.client.post(
+            reverse('journey-scan', args=[self.journey.pk]), {'scans': list(scans)}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def scan_of(self, package, new_status):
+        code = package.pickup_code if new_status == 'IN_TRANSIT' else package.delivery_code
+        return {'tracking_number': package.tracking_number, 'status': new_status, 'code': code}
+
+    def test_transitions_outside_the_map_are_rejected(self):
+        cases = [('PENDING', 'DELIVERED'), ('PENDING', 'IN_TRANSIT'), ('DELIVERED', 'IN_TRANSIT')]
+        for old_status, new_status in cases:
+            package = make_package(make_sender(), self.journey, status=old_status)
+            with self.subTest(old=old_status, new=new_status):
+                [result] = self.scan(self.scan_of(package, new_status))
+                self.assertEqual(
+                    result['error'], f'Cannot change status from {old_status} to {new_status}'
+                )
+                self.assertEqual(Package.objects.get(pk=package.pk).status, old_status)
+
+    def test_malformed_scans_are_reported(self):
+        package = make_package(make_sender(), self.journey, status='APPROVED')
+        results = self.scan(
+            {'tracking_number': [package.tracking_number], 'status': 'IN_TRANSIT', 'code': 'x'},
+            {'tracking_number': {'a': 1}, 'status': 'IN_TRANSIT', 'code': 'x'},
+            {'tracking_number': package.tracking_number, 'status': 'IN_TRANSIT'},
+            self.scan_of(package, 'IN_TRANSIT'),
+        )
+        self.assertEqual([result['status'] for result in results], ['error'] * 3 + ['updated'])
+        self.assertEqual(Package.objects.get(pk=package.pk).status, 'IN_TRANSIT')
@@ -0,0 +1,123 @@
+"""
+Public parcel tracking by tracking number.
+
+A lookup returns a small projection of the package (status, the cities it
+travels between and when it last changed), read from a write-through
+cache: code that changes a package's status refreshes its entry on commit,
+journey and stop point saves drop the entries of their packages, and
+misses are filled from a covering index on Package, so the package row
+itself is never read, and then from ArchivedPackage.
+"""
+import re
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from .caching import PREFIX, get_cache
+from .models import ArchivedPackage, Package
+
+TRACKING_NUMBER = re.compile(r'^[A-Z0-9_-]{1,50}$')
+
+PROJECTION = (
+    'tracking_number', 'status', 'updated_at',
+    'journey__departure_city', 'journey__arrival_city',
+    'origin_stop__city', 'destination_stop__city',
+)
+ARCHIVED_PROJECTION = ('tracking_number', 'status', 'updated_at', 'origin_city', 'destination_city')
+
+_datetime = serializers.DateTimeField()
+
+
+def _key(number):
+    return f'{PREFIX}:track:{number}'
+
+
+def _timeout():
+    return getattr(settings, 'TRACKING_CACHE_TTL', 86400)
+
+
+def normalize(number):
+    """The canonical form of a tracking number typed by a user, or None."""
+    if not isinstance(number, str):
+        return None
+    number = number.strip().upper()
+    return number if TRACKING_NUMBER.match(number) else None
+
+
+def _projection(number, status, updated_at, origin_city, destination_city):
+    return {
+        'tracking_number': number,
+        'status': status,
+        'origin_city': origin_city,
+        'destination_city': destination_city,
+        'updated_at': _datetime.to_representation(updated_at),
+    }
+
+
+def _project(row):
+    number, status, updated_at, departure_city, arrival_city, origin_city, destination_city = row
+    return _projection(
+        number, status, updated_at, origin_city or departure_city, destination_city or arrival_city
+    )
+
+
+def _fetch(queryset):
+    return {row[0]: _project(row) for row in queryset.values_list(*PROJECTION)}
+
+
+def _fetch_archived(numbers):
+    return {
+        row[0]: _projection(*row) for row in
+        ArchivedPackage.objects.filter(tracking_number__in=numbers).values_list(*ARCHIVED_PROJECTION)
+    }
+
+
+def lookup(numbers):
+    """Return ``{tracking_number: projection}`` for the known ``numbers``."""
+    cache = get_cache()
+    cached = cache.get_many([_key(number) for number in numbers])
+    found = {number: cached[_key(number)] for number in numbers if _key(number) in cached}
+
+    missing = [number for number in numbers if number not in found]
+    if missing:
+        fetched = _fetch(Package.objects.filter(tracking_number__in=missing))
+        archived = [number for number in missing if number not in fetched]
+        if archived:
+            fetched.update(_fetch_archived(archived))
+        for number, projection in fetched.items():
+            # add(): a write-through refresh that got there first is newer.
+            cache.add(_key(number), projection, timeout=_timeout())
+        found.update(fetched)
+    return found
+
+
+def refresh_tracking(package_ids):
+    """Write the packages' current projections to the cache once the transaction commits."""
+    package_ids = list(package_ids)
+
+    def apply():
+        fetched = _fetch(Package.objects.filter(pk__in=package_ids))
+        get_cache().set_many(
+            {_key(number): projection for number, projection in fetched.items()},
+            timeout=_timeout()
+        )
+
+    if package_ids:
+        transaction.on_commit(apply)
+
+
+def forget_tracking(numbers=(), journey_id=None):
+    """Drop cached projections by number, or for every package of ``journey_id``."""
+    numbers = list(numbers)
+
+    def apply():
+        keys = [_key(number) for number in numbers]
+        if journey_id is not None:
+            keys += [
+                _key(number) for number in
+                Package.objects.filter(journey_id=journey_id).values_list('tracking_number', flat=True)
+            ]
+        get_cache().delete_many(keys)
+
+    transaction.on_commit(apply)
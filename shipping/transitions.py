@@ -0,0 +1,170 @@
+"""
+Set-based package status transitions.
+
+Carrier scans at a collection or drop-off point are checked against the
+pickup/delivery codes in one query and applied with one UPDATE, and journey
+status changes cascade to their packages the same way. Notifications and
+delivery counters are left to the outbox worker.
+
+PACKAGE_TRANSITIONS lists the statuses a package may move to. DELIVERED is
+final, so a delivery is counted once however the package is scanned or
+updated afterwards.
+"""
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from .changes import record_changes
+from .models import Package
+from .outbox import enqueue, enqueue_many
+from .reservations import release_many
+from .tracking import refresh_tracking
+
+SCAN_FIELDS = ('tracking_number', 'status', 'code')
+
+SCAN_CODES = {
+    'IN_TRANSIT': ('pickup_code', 'Invalid pickup code'),
+    'DELIVERED': ('delivery_code', 'Invalid delivery code'),
+}
+
+# Package status -> statuses it may move to
+PACKAGE_TRANSITIONS = {
+    'PENDING': ('APPROVED', 'CANCELLED'),
+    'APPROVED': ('PENDING', 'IN_TRANSIT', 'CANCELLED'),
+    'IN_TRANSIT': ('DELIVERED',),
+    'DELIVERED': (),
+    'CANCELLED': ('PENDING', 'APPROVED'),
+}
+
+# Journey status -> (package statuses affected, new package status)
+JOURNEY_CASCADES = {
+    'IN_PROGRESS': (['APPROVED'], 'IN_TRANSIT'),
+    'CANCELLED': (['PENDING', 'APPROVED'], 'CANCELLED'),
+}
+
+
+def can_transition(old_status, new_status):
+    return new_status in PACKAGE_TRANSITIONS.get(old_status, ())
+
+
+def notify_statuses(transitions):
+    """
+    Enqueue the sender and recipient notifications of ``(package_id, status)``
+    transitions, once per package and status, in order.
+    """
+    enqueue_many('package.status', [
+        {'package': package_id, 'status': new_status}
+        for package_id, new_status in dict.fromkeys(transitions)
+    ])
+
+
+def set_statuses(targets, transitions=None):
+    """
+    Apply ``{package_id: status}`` with a single UPDATE. ``transitions``
+    lists every ``(package_id, status)`` step to notify when a package went
+    through several statuses in one batch; it defaults to the final ones.
+    """
+    by_status = {}
+    for package_id, new_status in targets.items():
+        by_status.setdefault(new_status, []).append(package_id)
+    if not by_status:
+        return 0
+    record_changes(Package, targets)
+    notify_statuses(targets.items() if transitions is None else transitions)
+    refresh_tracking(targets)
+    return Package.objects.filter(pk__in=targets).update(
+        status=Case(*[
+            When(pk__in=package_ids, then=Value(new_status))
+            for new_status, package_ids in by_status.items()
+        ]),
+        updated_at=timezone.now()
+    )
+
+
+def record_deliveries(carrier_id, sender_ids):
+    """Enqueue the profile counter updates for packages just delivered."""
+    if sender_ids:
+        enqueue('profile.deliveries', {'carrier': carrier_id, 'senders': list(sender_ids)})
+
+
+def is_valid_scan(scan):
+    return isinstance(scan, dict) and all(isinstance(scan.get(name), str) for name in SCAN_FIELDS)
+
+
+def apply_scans(journey, scans):
+    """
+    Apply a list of ``{'tracking_number', 'code', 'status'}`` scans to the
+    packages of ``journey`` and return one result per scan.
+    """
+    numbers = {scan['tracking_number'] for scan in scans if is_valid_scan(scan)}
+    results = []
+
+    with transaction.atomic():
+        packages = {
+            row['tracking_number']: row
+            for row in Package.objects.select_for_update()
+            .filter(journey=journey, tracking_number__in=numbers)
+            .values('id', 'tracking_number', 'status', 'pickup_code',
+                    'delivery_code', 'sender_id')
+        }
+        original = {row['id']: row['status'] for row in packages.values()}
+        targets = {}
+        transitions = []
+
+        for scan in scans:
+            if not is_valid_scan(scan):
+                results.append({
+                    'tracking_number': None, 'status': 'error',
+                    'error': 'tracking_number, status and code must be strings'
+                })
+                continue
+            tracking_number = scan['tracking_number']
+            new_status = scan['status']
+            row = packages.get(tracking_number)
+            result = {'tracking_number': tracking_number, 'status': 'error'}
+
+            if row is None:
+                result['error'] = 'Unknown tracking number for this journey'
+            elif new_status not in SCAN_CODES:
+                result['error'] = 'Invalid status'
+            elif scan['code'] != row[SCAN_CODES[new_status][0]]:
+                result['error'] = SCAN_CODES[new_status][1]
+            elif row['status'] == new_status:
+                result['status'] = 'unchanged'
+            elif row['status'] == 'CANCELLED':
+                result['error'] = 'Package is cancelled'
+            elif not can_transition(row['status'], new_status):
+                result['error'] = f'Cannot change status from {row["status"]} to {new_status}'
+            else:
+                # Later scans in the same batch see this one applied.
+                row['status'] = targets[row['id']] = new_status
+                transitions.append((row['id'], new_status))
+                result['status'] = 'updated'
+            results.append(result)
+
+        set_statuses(targets, transitions)
+        record_deliveries(journey.carrier_id, [
+            row['sender_id'] for row in packages.values()
+            if targets.get(row['id']) == 'DELIVERED' and original[row['id']] != 'DELIVERED'
+        ])
+
+    return results
+
+
+def cascade_journey_status(journey, new_status):
+    """Move the journey's packages along with it; returns the number moved."""
+    cascade = JOURNEY_CASCADES.get(new_status)
+    if cascade is None:
+        return 0
+    from_statuses, package_status = cascade
+
+    with transaction.atomic():
+        packages = list(
+            Package.objects.select_for_update()
+            .filter(journey=journey, status__in=from_statuses)
+            .only('id', 'journey_id', 'weight', 'origin_stop_id', 'destination_stop_id')
+        )
+        set_statuses({package.id: package_status for package in packages})
+        if package_status == 'CANCELLED':
+            release_many(packages)
+    return len(packages)
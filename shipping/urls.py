@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
-router.register(r'profiles', views.UserProfileViewSet)
+router.register(r'carriers', views.CarrierProfileViewSet)
+router.register(r'senders', views.SenderProfileViewSet)
 router.register(r'vehicles', views.VehicleViewSet)
 router.register(r'journeys', views.JourneyViewSet)
 router.register(r'packages', views.PackageViewSet)
@@ -11,4 +12,8 @@ router.register(r'reviews', views.ReviewViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path('changes/', views.ChangesView.as_view(), name='changes'),
+    path('tracking/', views.TrackingView.as_view(), name='tracking-batch'),
+    path('tracking/<str:tracking_number>/', views.TrackingView.as_view(), name='tracking'),
 ]
\ No newline at end of file
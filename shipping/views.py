@@ -1,37 +1,87 @@
-from rest_framework import viewsets, permissions, filters, status
+from rest_framework import viewsets, permissions, filters, serializers, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import (
     UserProfile, CarrierProfile, SenderProfile, Vehicle,
-    Journey, Package, Review
+    Journey, Package, Review, RouteSegment, ArchivedJourney, ArchivedPackage
 )
 from .serializers import (
     CarrierProfileSerializer, SenderProfileSerializer, VehicleSerializer,
-    JourneySerializer, PackageSerializer, ReviewSerializer
+    JourneySerializer, PackageSerializer, BulkPackageSerializer, ReviewSerializer,
+    RouteSegmentSerializer
 )
-from .permissions import IsCarrierOrReadOnly, IsOwnerOrReadOnly
+from .filters import JourneyFilter, OwnerFilterBackend, PackageFilter, RouteSegmentFilter
+from .permissions import (
+    IsCarrierOrReadOnly, IsOwnerOrReadOnly, get_request_identity,
+    require_carrier_id, require_sender_id, scope_packages
+)
+from shiplink.instrumentation import InstrumentedViewMixin
+from .eager_loading import EagerLoadingMixin
+from .exports import ExportMixin, JOURNEY_COLUMNS, PACKAGE_COLUMNS
+from .fast_read import FastReadMixin
+from .archive import ArchiveFallbackMixin
+from .idempotency import IdempotentWriteMixin
+from .pricing import quote_segments
+from .matching import top_matches
+from .load_planning import describe_legs, load_journey_problem, plan_load, to_money
+from .caching import CachedResponseMixin, compute_etag, get_stats, journey_versions
+from .changes import (
+    STREAMS, CursorExpired, current_cursor, read_changes, record_changes,
+    serialize_upserts
+)
+from .pagination import KeysetPagination
+from .tracking import lookup, normalize, refresh_tracking
+from .ratings import change_review_rating, record_review
+from .transitions import (
+    apply_scans, can_transition, cascade_journey_status, notify_statuses, record_deliveries
+)
+from .reservations import (
+    ReservationError, reserve_capacity, reserve_many, cancel_package,
+    restore_package, change_reservation, delete_package
+)
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 import uuid
 import random
 import string
 
-class CarrierProfileViewSet(viewsets.ModelViewSet):
+class CarrierProfileViewSet(InstrumentedViewMixin, CachedResponseMixin, FastReadMixin,
+                            viewsets.ModelViewSet):
     queryset = CarrierProfile.objects.all()
     serializer_class = CarrierProfileSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [OwnerFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = [
         'user_profile__user__username',
         'user_profile__user__email',
         'company_name'
     ]
+    ordering_fields = ['rating', 'review_count', 'total_deliveries']
+    cache_list_version = 'carriers'
+    cache_extra_params = CachedResponseMixin.cache_extra_params + ('verified', 'min_rating')
+
+    def get_object_cache_versions(self, pk):
+        return [f'carrier:{pk}']
 
     def get_queryset(self):
         queryset = CarrierProfile.objects.all()
         verified = self.request.query_params.get('verified', None)
         if verified is not None:
             queryset = queryset.filter(verified=verified.lower() == 'true')
+        min_rating = self.request.query_params.get('min_rating', None)
+        if min_rating is not None:
+            try:
+                queryset = queryset.filter(rating__gte=Decimal(min_rating))
+            except InvalidOperation:
+                pass
         return queryset
 
     @action(detail=True, methods=['post'])
@@ -46,11 +96,11 @@ class CarrierProfileViewSet(viewsets.ModelViewSet):
             status=status.HTTP_403_FORBIDDEN
         )
 
-class SenderProfileViewSet(viewsets.ModelViewSet):
+class SenderProfileViewSet(InstrumentedViewMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = SenderProfile.objects.all()
     serializer_class = SenderProfileSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [OwnerFilterBackend, filters.SearchFilter]
     search_fields = [
         'user_profile__user__username',
         'user_profile__user__email'
@@ -71,70 +121,357 @@ class SenderProfileViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(InstrumentedViewMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
     permission_classes = [permissions.IsAuthenticated, IsCarrierOrReadOnly]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [OwnerFilterBackend, DjangoFilterBackend]
     filterset_fields = ['carrier', 'type', 'active']
 
     def perform_create(self, serializer):
-        carrier = get_object_or_404(
-            CarrierProfile,
-            user_profile__user=self.request.user
-        )
-        serializer.save(carrier=carrier)
+        serializer.save(carrier_id=require_carrier_id(self.request))
 
-class JourneyViewSet(viewsets.ModelViewSet):
+class JourneyViewSet(InstrumentedViewMixin, IdempotentWriteMixin, ArchiveFallbackMixin,
+                     CachedResponseMixin, EagerLoadingMixin, FastReadMixin, ExportMixin,
+                     viewsets.ModelViewSet):
     queryset = Journey.objects.all()
     serializer_class = JourneySerializer
     permission_classes = [permissions.IsAuthenticated, IsCarrierOrReadOnly]
     filter_backends = [
+        OwnerFilterBackend,
         DjangoFilterBackend,
         filters.SearchFilter,
         filters.OrderingFilter
     ]
-    filterset_fields = [
-        'carrier',
-        'departure_city',
-        'arrival_city',
-        'status'
-    ]
+    filterset_class = JourneyFilter
     search_fields = ['departure_city', 'arrival_city']
-    ordering_fields = ['departure_date', 'price_per_kg']
+    ordering_fields = ['departure_date', 'price_per_kg', 'carrier__rating']
+    ordering = ['departure_date']
+    pagination_class = KeysetPagination
+    scan_batch_limit = 500
+    quote_candidate_limit = 500
+    quote_result_limit = 20
+    match_result_limit = 10
+    load_plan_time_budget_ms = 200
+    load_plan_max_time_budget_ms = 2000
+    cache_list_version = 'journeys'
+    archive_model = ArchivedJourney
+    export_columns = JOURNEY_COLUMNS
+    export_filename = 'journeys'
+
+    def get_object_cache_versions(self, pk):
+        return journey_versions(pk)
+
+    def get_export_queryset(self, queryset):
+        if self.request.user.is_staff:
+            return queryset
+        carrier_id = get_request_identity(self.request).carrier_id
+        if carrier_id is None:
+            raise PermissionDenied('Only carriers and staff can export journeys')
+        return queryset.filter(carrier_id=carrier_id)
 
     def perform_create(self, serializer):
-        carrier = get_object_or_404(
-            CarrierProfile,
-            user_profile__user=self.request.user
-        )
-        vehicle = get_object_or_404(Vehicle, id=self.request.data.get('vehicle'))
+        carrier_id = require_carrier_id(self.request)
+        vehicle = get_object_or_404(Vehicle, id=self.request.data.get('vehicle'), carrier_id=carrier_id)
         serializer.save(
-            carrier=carrier,
+            carrier_id=carrier_id,
             vehicle=vehicle,
             available_capacity=vehicle.capacity
         )
 
+    @action(detail=False, methods=['get'])
+    def routes(self, request):
+        if not (request.query_params.get('origin') and
+                request.query_params.get('destination')):
+            return Response(
+                {'error': 'origin and destination are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filterset = RouteSegmentFilter(
+            request.query_params,
+            queryset=RouteSegment.objects.order_by('departure_date', 'id'),
+            request=request
+        )
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        page = self.paginate_queryset(filterset.qs)
+        serializer = RouteSegmentSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def quote(self, request):
+        """
+        Rank the journeys serving ``origin`` -> ``destination`` by the total
+        price of a package of ``weight`` and ``size`` under each carrier's
+        rates. ``contents`` (comma separated) applies contents multipliers.
+        Only the ``quote_candidate_limit`` earliest departures are priced.
+        """
+        params = request.query_params
+        if not (params.get('origin') and params.get('destination')):
+            return Response(
+                {'error': 'origin and destination are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        weight = self.get_requested_weight()
+        if weight is None:
+            return Response(
+                {'error': 'weight must be a positive number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        size = params.get('size', '').upper()
+        if size not in dict(Package.SIZE_CHOICES):
+            return Response(
+                {'error': f'size must be one of: {", ".join(dict(Package.SIZE_CHOICES))}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(params.get('limit', self.quote_result_limit)), 100)
+        except ValueError:
+            limit = self.quote_result_limit
+
+        filterset = RouteSegmentFilter(
+            params,
+            queryset=RouteSegment.objects.filter(remaining_capacity__gte=weight),
+            request=request
+        )
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        segments = list(
+            filterset.qs.order_by('departure_date', 'id').values_list(
+                'carrier_id', 'origin_key', 'destination_key', 'price_per_kg',
+                'journey_id', 'journey__carrier__company_name', 'origin_city',
+                'destination_city', 'departure_date', 'remaining_capacity'
+            )[:self.quote_candidate_limit]
+        )
+        contents = [name for name in params.get('contents', '').split(',') if name.strip()]
+        quotes = quote_segments(segments, weight, size, contents)
+        quotes.sort(key=lambda quote: (quote[0], quote[2][8], quote[2][4]))
+
+        return Response({
+            'count': len(quotes),
+            'results': [
+                {
+                    'journey': segment[4],
+                    'carrier': segment[0],
+                    'company_name': segment[5],
+                    'origin_city': segment[6],
+                    'destination_city': segment[7],
+                    'departure_date': segment[8],
+                    'remaining_capacity': segment[9],
+                    'price_per_kg': str(price_per_kg),
+                    'total_price': str(total),
+                }
+                for total, price_per_kg, segment in quotes[:max(limit, 0)]
+            ]
+        })
+
+    @action(detail=False, methods=['get'])
+    def match(self, request):
+        """
+        The ``k`` journeys best matching a package of ``weight`` from
+        ``origin`` to ``destination``, scored on price, carrier rating and
+        verification, closeness to ``date`` (default: the start of the
+        window) and spare capacity. The window defaults to upcoming
+        departures; ``verified=true`` keeps verified carriers only.
+        """
+        params = request.query_params
+        if not (params.get('origin') and params.get('destination')):
+            return Response(
+                {'error': 'origin and destination are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        weight = self.get_requested_weight()
+        if weight is None:
+            return Response(
+                {'error': 'weight must be a positive number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            k = max(1, min(int(params.get('k', self.match_result_limit)), 50))
+        except ValueError:
+            k = self.match_result_limit
+
+        candidates = RouteSegment.objects.filter(remaining_capacity__gte=weight)
+        if not params.get('departure_date_after'):
+            candidates = candidates.filter(departure_date__gte=timezone.now())
+        if params.get('verified', '').lower() in ('true', '1'):
+            candidates = candidates.filter(carrier_verified=True)
+        filterset = RouteSegmentFilter(params, queryset=candidates, request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        target_date = timezone.now()
+        if params.get('date') or params.get('departure_date_after'):
+            try:
+                day = parse_date(params.get('date') or params.get('departure_date_after'))
+            except ValueError:
+                day = None
+            if day is None:
+                return Response(
+                    {'error': 'date must be formatted YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            target_date = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+        matches = top_matches(filterset.qs, weight, target_date, k)
+        company_names = dict(CarrierProfile.objects.filter(
+            pk__in={row[1] for _, row in matches}
+        ).values_list('id', 'company_name')) if matches else {}
+
+        return Response({
+            'results': [
+                {
+                    'journey': journey_id,
+                    'carrier': carrier_id,
+                    'company_name': company_names.get(carrier_id, ''),
+                    'origin_city': origin_city,
+                    'destination_city': destination_city,
+                    'departure_date': departure_date,
+                    'remaining_capacity': remaining_capacity,
+                    'price_per_kg': str(price_per_kg),
+                    'carrier_rating': str(carrier_rating),
+                    'carrier_verified': carrier_verified,
+                    'score': round(score, 4),
+                }
+                for score, (
+                    journey_id, carrier_id, origin_city, destination_city, departure_date,
+                    remaining_capacity, price_per_kg, carrier_rating, carrier_verified
+                ) in matches
+            ]
+        })
+
+    def get_requested_weight(self):
+        try:
+            weight = Decimal(self.request.query_params.get('weight', ''))
+        except InvalidOperation:
+            return None
+        return weight if weight.is_finite() and weight > 0 else None
+
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         journey = self.get_object()
-        status = request.data.get('status')
-        if status in dict(Journey.status.field.choices):
-            journey.status = status
-            journey.save()
-            return Response({'status': 'updated'})
+        if journey.carrier_id != get_request_identity(request).carrier_id:
+            return Response(
+                {'error': 'Only the journey carrier can change its status'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        new_status = request.data.get('status')
+        if new_status in dict(Journey.status.field.choices):
+            with transaction.atomic():
+                journey.status = new_status
+                journey.save()
+                cascaded = cascade_journey_status(journey, new_status)
+            return Response({'status': 'updated', 'packages_updated': cascaded})
         return Response(
             {'error': 'Invalid status'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-class PackageViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'])
+    def scan(self, request, pk=None):
+        journey = self.get_object()
+        if journey.carrier_id != get_request_identity(request).carrier_id:
+            return Response(
+                {'error': 'Only the journey carrier can scan its packages'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        scans = request.data
+        if isinstance(scans, dict):
+            scans = scans.get('scans')
+        if (not isinstance(scans, list) or not scans or
+                not all(isinstance(scan, dict) for scan in scans)):
+            return Response(
+                {'error': 'A non-empty list of scans is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(scans) > self.scan_batch_limit:
+            return Response(
+                {'error': f'At most {self.scan_batch_limit} scans per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({'results': apply_scans(journey, scans)})
+
+    @action(detail=True, methods=['get'], url_path='load-plan')
+    def load_plan(self, request, pk=None):
+        """
+        Which pending packages the carrier should approve for the most
+        revenue without overloading any leg. ``capacity`` plans against
+        another vehicle capacity; ``time_budget_ms`` trades latency for
+        revenue. Nothing is approved: the plan is a suggestion.
+        """
+        journey = self.get_object()
+        if not request.user.is_staff and journey.carrier_id != get_request_identity(request).carrier_id:
+            return Response(
+                {'error': 'Only the journey carrier can plan its load'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        params = request.query_params
+        try:
+            budget_ms = int(params.get('time_budget_ms', self.load_plan_time_budget_ms))
+            capacity = int(params['capacity']) if params.get('capacity') else None
+        except ValueError:
+            return Response(
+                {'error': 'time_budget_ms and capacity must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if capacity is not None and capacity < 0:
+            return Response(
+                {'error': 'capacity must not be negative'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        budget_ms = max(1, min(budget_ms, self.load_plan_max_time_budget_ms))
+
+        stops, capacities, candidates = load_journey_problem(journey, capacity)
+        plan = plan_load(capacities, candidates, budget_ms / 1000)
+        approved = set(plan.selected)
+        return Response({
+            'journey': journey.pk,
+            'approve': plan.selected,
+            'leave_pending': sorted(
+                candidate.package_id for candidate in candidates
+                if candidate.package_id not in approved
+            ),
+            'revenue': str(to_money(plan.revenue)),
+            'pending_revenue': str(to_money(sum(candidate.value for candidate in candidates))),
+            'upper_bound': str(to_money(plan.bound)),
+            'legs': [
+                {
+                    'from': origin,
+                    'to': destination,
+                    'capacity': leg_capacity,
+                    'planned_load': load,
+                }
+                for (origin, destination), leg_capacity, load in zip(
+                    describe_legs(journey, stops), capacities, plan.loads
+                )
+            ],
+            'rounds': plan.rounds,
+        })
+
+class PackageViewSet(InstrumentedViewMixin, IdempotentWriteMixin, ArchiveFallbackMixin,
+                     EagerLoadingMixin, FastReadMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Package.objects.all()
     serializer_class = PackageSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['sender', 'journey', 'status', 'size']
+    filter_backends = [OwnerFilterBackend, DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = PackageFilter
     ordering_fields = ['created_at', 'weight']
+    ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    bulk_booking_limit = 500
+    archive_model = ArchivedPackage
+    export_columns = PACKAGE_COLUMNS
+    export_filename = 'packages'
+
+    def get_export_queryset(self, queryset):
+        return scope_packages(queryset, self.request)
 
     def generate_codes(self):
         return (
@@ -142,28 +479,151 @@ class PackageViewSet(viewsets.ModelViewSet):
             ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
         )
 
+    def generate_tracking_numbers(self, count):
+        numbers = set()
+        while len(numbers) < count:
+            numbers.add(uuid.uuid4().hex[:10].upper())
+        # One lookup covers the whole batch; a clash with an existing package
+        # is vanishingly rare and only that number is drawn again.
+        taken = set(Package.objects.filter(
+            tracking_number__in=numbers
+        ).values_list('tracking_number', flat=True))
+        taken |= set(ArchivedPackage.objects.filter(
+            tracking_number__in=numbers
+        ).values_list('tracking_number', flat=True))
+        numbers -= taken
+        while len(numbers) < count:
+            number = uuid.uuid4().hex[:10].upper()
+            if number not in taken:
+                numbers.add(number)
+        return list(numbers)
+
     def perform_create(self, serializer):
-        sender = get_object_or_404(
-            SenderProfile,
-            user_profile__user=self.request.user
-        )
+        sender_id = require_sender_id(self.request)
         journey = get_object_or_404(Journey, id=self.request.data.get('journey'))
-        
-        if journey.available_capacity < float(self.request.data.get('weight', 0)):
-            raise serializers.ValidationError(
-                'Package weight exceeds available capacity'
-            )
+        data = serializer.validated_data
 
-        tracking_number = str(uuid.uuid4().hex[:10].upper())
+        tracking_number = self.generate_tracking_numbers(1)[0]
         pickup_code, delivery_code = self.generate_codes()
-        
-        serializer.save(
-            sender=sender,
-            journey=journey,
-            tracking_number=tracking_number,
-            pickup_code=pickup_code,
-            delivery_code=delivery_code
-        )
+
+        with transaction.atomic():
+            try:
+                reserve_capacity(
+                    journey.id,
+                    data['weight'],
+                    data.get('origin_stop'),
+                    data.get('destination_stop')
+                )
+            except ReservationError as exc:
+                raise serializers.ValidationError(str(exc))
+
+            serializer.save(
+                sender_id=sender_id,
+                journey=journey,
+                tracking_number=tracking_number,
+                pickup_code=pickup_code,
+                delivery_code=delivery_code
+            )
+            notify_statuses([(serializer.instance.pk, 'PENDING')])
+
+    def perform_update(self, serializer):
+        package = serializer.instance
+        data = serializer.validated_data
+        with transaction.atomic():
+            try:
+                change_reservation(
+                    package,
+                    data.get('weight', package.weight),
+                    data['origin_stop'] if 'origin_stop' in data else package.origin_stop_id,
+                    data['destination_stop'] if 'destination_stop' in data else package.destination_stop_id
+                )
+            except ReservationError as exc:
+                raise serializers.ValidationError(str(exc))
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        delete_package(instance)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_book(self, request):
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('packages')
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'A non-empty list of packages is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.bulk_booking_limit:
+            return Response(
+                {'error': f'At most {self.bulk_booking_limit} packages per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        sender_id = require_sender_id(request)
+        # Items are checked without queries; their journeys and stops are
+        # checked for the whole batch by reserve_many.
+        serializer = BulkPackageSerializer(context=self.get_serializer_context())
+        results = [None] * len(items)
+        bookings = []
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise serializers.ValidationError('Expected a package object')
+                data = serializer.run_validation(item)
+            except serializers.ValidationError as exc:
+                results[index] = {'index': index, 'status': 'error', 'errors': exc.detail}
+                continue
+            data['journey_id'] = data.pop('journey')
+            data['origin_stop_id'] = data.pop('origin_stop', None)
+            data['destination_stop_id'] = data.pop('destination_stop', None)
+            bookings.append((index, data))
+
+        with transaction.atomic():
+            errors = reserve_many([
+                (data['journey_id'], data['weight'], data['origin_stop_id'], data['destination_stop_id'])
+                for _, data in bookings
+            ])
+            accepted = []
+            for (index, data), error in zip(bookings, errors):
+                if error:
+                    results[index] = {'index': index, 'status': 'error', 'errors': [error]}
+                else:
+                    accepted.append((index, data))
+
+            tracking_numbers = self.generate_tracking_numbers(len(accepted))
+            packages = []
+            for (index, data), tracking_number in zip(accepted, tracking_numbers):
+                pickup_code, delivery_code = self.generate_codes()
+                packages.append(Package(
+                    sender_id=sender_id,
+                    tracking_number=tracking_number,
+                    pickup_code=pickup_code,
+                    delivery_code=delivery_code,
+                    **data
+                ))
+            Package.objects.bulk_create(packages)
+            # bulk_create skips the post_save receivers of a single booking.
+            package_ids = [package.pk for package in packages]
+            record_changes(Package, package_ids)
+            refresh_tracking(package_ids)
+            notify_statuses([(package_id, 'PENDING') for package_id in package_ids])
+
+        for (index, _), package in zip(accepted, packages):
+            results[index] = {
+                'index': index,
+                'status': 'created',
+                'id': package.id,
+                'tracking_number': package.tracking_number,
+            }
+
+        if len(packages) == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif packages:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'results': results}, status=response_status)
 
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
@@ -189,42 +649,200 @@ class PackageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        package.status = new_status
-        package.save()
+        old_status = package.status
+        if new_status != old_status and not can_transition(old_status, new_status):
+            return Response(
+                {'error': f'Cannot change status from {old_status} to {new_status}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                if new_status == 'CANCELLED':
+                    cancel_package(package)
+                elif package.status == 'CANCELLED':
+                    restore_package(package, new_status)
+                else:
+                    package.status = new_status
+                    package.save()
 
-        if new_status == 'DELIVERED':
-            package.sender.total_packages += 1
-            package.sender.save()
-            package.journey.carrier.total_deliveries += 1
-            package.journey.carrier.save()
+                if new_status != old_status:
+                    notify_statuses([(package.pk, new_status)])
+                if new_status == 'DELIVERED' and old_status != 'DELIVERED':
+                    record_deliveries(package.journey.carrier_id, [package.sender_id])
+        except ReservationError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         return Response({'status': 'updated'})
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(InstrumentedViewMixin, IdempotentWriteMixin, EagerLoadingMixin,
+                    FastReadMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [OwnerFilterBackend, DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['reviewer', 'reviewed', 'package', 'review_type']
     ordering_fields = ['created_at', 'rating']
+    ordering = ['-created_at']
+    pagination_class = KeysetPagination
 
     def perform_create(self, serializer):
-        package = get_object_or_404(Package, id=self.request.data.get('package'))
-        reviewer = get_object_or_404(
-            UserProfile,
-            user=self.request.user
+        package = get_object_or_404(
+            Package.objects.select_related('sender', 'journey__carrier'),
+            id=self.request.data.get('package')
         )
-        
+        reviewer = get_request_identity(self.request)
+        if reviewer.profile_id is None:
+            raise NotFound('No profile for this user')
+
         if reviewer.type == 'CARRIER':
-            reviewed = package.sender.user_profile
+            reviewed_id = package.sender.user_profile_id
             review_type = 'SENDER'
         else:
-            reviewed = package.journey.carrier.user_profile
+            reviewed_id = package.journey.carrier.user_profile_id
             review_type = 'CARRIER'
 
-        serializer.save(
-            reviewer=reviewer,
-            reviewed=reviewed,
-            package=package,
-            review_type=review_type
-        )
\ No newline at end of file
+        with transaction.atomic():
+            review = serializer.save(
+                reviewer_id=reviewer.profile_id,
+                reviewed_id=reviewed_id,
+                package=package,
+                review_type=review_type
+            )
+            record_review(review)
+
+    def perform_update(self, serializer):
+        old_rating = serializer.instance.rating
+        with transaction.atomic():
+            review = serializer.save()
+            change_review_rating(review, old_rating)
+
+    def perform_destroy(self, instance):
+        # Review's post_delete receiver takes the rating out of the aggregates.
+        instance.delete()
+
+class CacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+class ChangesView(APIView):
+    """
+    Delta sync feed: ``GET changes/?since=<cursor>[&streams=packages,journeys]``
+    returns the rows created or updated, the ids deleted and the ids moved to
+    the archive since the cursor, plus the cursor to send next time. Archived
+    rows can still be retrieved by id; clients keep them as final. Without ``since`` only the current
+    cursor is returned; clients take it *before* their initial full fetch.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 500
+    max_page_size = 1000
+
+    def get(self, request):
+        streams = [
+            name.strip() for name in
+            request.query_params.get('streams', ','.join(STREAMS)).split(',')
+            if name.strip()
+        ]
+        unknown = [name for name in streams if name not in STREAMS]
+        if unknown:
+            return Response(
+                {'error': f'Unknown streams: {", ".join(unknown)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        since = request.query_params.get('since')
+        if not since:
+            return Response({
+                'cursor': str(current_cursor()),
+                'has_more': False,
+                'changes': {},
+                'deleted': {},
+                'archived': {},
+            })
+
+        try:
+            since = int(since)
+            limit = min(int(request.query_params.get('limit', self.page_size)), self.max_page_size)
+            if since < 0 or limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'since and limit must be positive integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            cursor, has_more, upserts, deletes, archived = read_changes(since, limit, streams)
+        except CursorExpired:
+            return Response(
+                {'error': 'Cursor expired, fetch everything again'},
+                status=status.HTTP_410_GONE
+            )
+
+        return Response({
+            'cursor': str(cursor),
+            'has_more': has_more,
+            'changes': serialize_upserts(
+                upserts,
+                {'packages': lambda queryset: scope_packages(queryset, request)},
+                {'request': request}
+            ),
+            'deleted': deletes,
+            'archived': archived,
+        })
+
+class TrackingView(APIView):
+    """
+    Public parcel tracking: ``GET tracking/<number>/`` returns the status,
+    the cities the package travels between and its last update;
+    ``POST tracking/`` with ``{"tracking_numbers": [...]}`` looks up to
+    ``batch_limit`` packages at once. No authentication, throttled per
+    client under the 'tracking' scope.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'tracking'
+    batch_limit = 100
+
+    def get(self, request, tracking_number):
+        number = normalize(tracking_number)
+        projection = lookup([number]).get(number) if number else None
+        if projection is None:
+            return Response({'error': 'Unknown tracking number'}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = compute_etag(projection)
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(projection)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def post(self, request):
+        numbers = request.data.get('tracking_numbers') if isinstance(request.data, dict) else None
+        if not isinstance(numbers, list) or not numbers:
+            return Response(
+                {'error': 'A non-empty list of tracking_numbers is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(numbers) > self.batch_limit:
+            return Response(
+                {'error': f'At most {self.batch_limit} tracking numbers per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        normalized = [normalize(number) for number in numbers]
+        found = lookup(list({number for number in normalized if number}))
+        return Response({
+            'results': [
+                found.get(number) or {'tracking_number': original, 'error': 'Unknown tracking number'}
+                for original, number in zip(numbers, normalized)
+            ]
+        })